@@ -1,22 +1,27 @@
 import os
 from flask import Flask, render_template
 from flask_login import LoginManager
+from dotenv import load_dotenv
 
 from .config import Config
 from .extensions import db, migrate, mail
-
-# -----------------------------
-# BLUEPRINTS
-# -----------------------------
-from .routes.student_routes import student_bp
-from .routes.admin_routes import admin_bp
-from .routes.chatbot.chatbot_routes import chatbot_bp
-from .routes.general_routes import general as general_bp
+from .commands import register_commands
+from .utils.template_cache import init_template_cache
+from .utils.assets import init_assets
+from .utils.profiling import init_profiling
+from .utils.slow_queries import init_slow_query_log
+from .utils.sessions import init_sessions
+from .utils.rate_limit import init_rate_limiting
+from .utils.idempotency import init_idempotency
+from .utils.admission import init_admission_control
+from .utils.single_flight import init_single_flight
+from .utils.slip_batch import init_slip_batch
 
 # -----------------------------
 # MODELS (IMPORTANT FIX)
 # -----------------------------
 from .models import User
+from .utils.identity import load_session_user, init_identity
 
 # 👉 THIS IS THE CRITICAL FIX (ACADEMIC MODELS)
 from .models_academics import (
@@ -40,13 +45,17 @@ login_manager.login_message_category = "info"
 
 @login_manager.user_loader
 def load_user(user_id):
-    return User.query.get(int(user_id))
+    # Served from the signed session snapshot; no query while it is fresh
+    return load_session_user(int(user_id))
 
 
 # -----------------------------
 # APP FACTORY
 # -----------------------------
 def create_app(config_class=Config):
+    # Load .env once per app, not as a side effect of importing a blueprint
+    load_dotenv()
+
     app = Flask(__name__)
     app.config.from_object(config_class)
 
@@ -66,12 +75,47 @@ def create_app(config_class=Config):
     mail.init_app(app)
     login_manager.init_app(app)
 
-    # Register blueprints
+    # Server-side sessions (SESSION_BACKEND)
+    init_sessions(app)
+    # Login snapshots + the shared record of credential changes
+    init_identity(app)
+
+    # Template bytecode + fragment caching
+    init_template_cache(app)
+
+    # gzip/brotli responses, hashed static URLs, WebP/precompressed statics
+    init_assets(app)
+
+    # Register blueprints (imported here so `import app` stays cheap for
+    # CLI scripts, migrations and slip worker processes)
+    from .routes.student_routes import student_bp
+    from .routes.admin_routes import admin_bp
+    from .routes.chatbot.chatbot_routes import chatbot_bp
+    from .routes.general_routes import general as general_bp
+
     app.register_blueprint(student_bp, url_prefix="/student")
     app.register_blueprint(admin_bp, url_prefix="/admin")
     app.register_blueprint(chatbot_bp, url_prefix="/chatbot")
     app.register_blueprint(general_bp)
 
+    # Opt-in request timing, /metrics and ?_profile=1 (PROFILING_ENABLED)
+    init_profiling(app)
+    init_slow_query_log(app)
+
+    # Throttle logins, uploads, chatbot and password resets (RATE_LIMITS)
+    init_rate_limiting(app)
+    # Optional waiting room in front of registration (ADMISSION_ENABLED)
+    init_admission_control(app)
+    # Replay retried payment/registration POSTs (Idempotency-Key header)
+    init_idempotency(app)
+    # Render concurrent identical PDFs once
+    init_single_flight(app)
+    # Admin batch slip jobs: progress visible to every worker
+    init_slip_batch(app)
+
+    # CLI commands (flask slips ...)
+    register_commands(app)
+
     # -----------------------------
     # DEFAULT ROUTES
     # -----------------------------
@@ -0,0 +1,123 @@
+# app/commands.py
+import sys
+import click
+from flask.cli import AppGroup
+
+slips_cli = AppGroup('slips', help='Registration slip maintenance.')
+templates_cli = AppGroup('templates', help='Template cache maintenance.')
+assets_cli = AppGroup('assets', help='Static asset build.')
+chatbot_cli = AppGroup('chatbot', help='Chatbot knowledge base maintenance.')
+students_cli = AppGroup('students', help='Student record maintenance.')
+
+
+@slips_cli.command('generate')
+@click.option('--program-id', type=int, help='Only students registered on this program.')
+@click.option('--year', 'year_level', type=int, help='Year of study (1, 2, ...).')
+@click.option('--semester', 'semester_type', type=click.Choice(['SEM1', 'SEM2', 'SUMMER', 'INDUSTRIAL']),
+              help='Semester type.')
+@click.option('--academic-year', help='Academic year id or name, e.g. 2025/2026.')
+@click.option('--status', 'payment_status', default='approved', show_default=True,
+              help="Registration payment status to include, or 'any'.")
+@click.option('--workers', type=int, help='Render processes (default: SLIP_BATCH_WORKERS or CPU count).')
+@click.option('--refresh-details', is_flag=True,
+              help='Re-sync program/faculty/year/semester on existing slips from the registration.')
+@click.option('--missing-only', is_flag=True, help='Only students whose slip PDF is not on disk yet.')
+def generate_slips_command(program_id, year_level, semester_type, academic_year,
+                           payment_status, workers, refresh_details, missing_only):
+    """Generate or regenerate registration slip PDFs for a filtered intake."""
+    from app.utils.slip_batch import generate_slips
+
+    def progress(done, total):
+        click.echo(f"\r  rendered {done}/{total}", nl=(done == total))
+
+    summary = generate_slips(
+        workers=workers,
+        progress=progress,
+        created_by='cli',
+        refresh_details=refresh_details,
+        missing_only=missing_only,
+        program_id=program_id,
+        year_level=year_level,
+        semester_type=semester_type,
+        academic_year=academic_year,
+        payment_status=None if payment_status == 'any' else payment_status,
+    )
+
+    click.echo(f"✅ Selected {summary['selected']}, rendered {summary['rendered']}, failed {summary['failed']}")
+    for slip_id, error in summary['errors']:
+        click.echo(f"   slip {slip_id}: {error}", err=True)
+
+    if summary['failed']:
+        sys.exit(1)
+
+
+@templates_cli.command('compile')
+def compile_templates_command():
+    """Precompile all templates into the Jinja bytecode cache."""
+    from flask import current_app
+    from app.utils.template_cache import precompile_templates
+
+    compiled, failed = precompile_templates(current_app)
+    click.echo(f"✅ Compiled {compiled} templates")
+    for name, error in failed:
+        click.echo(f"   {name}: {error}", err=True)
+
+    if failed:
+        sys.exit(1)
+
+
+@assets_cli.command('build')
+def build_assets_command():
+    """Write resized/WebP images and precompressed text assets to STATIC_BUILD_FOLDER."""
+    from flask import current_app
+    from app.utils.assets import build_assets
+
+    manifest = build_assets(
+        current_app.static_folder,
+        current_app.config['STATIC_BUILD_FOLDER'],
+        widths=current_app.config.get('STATIC_IMAGE_WIDTHS', (192, 640, 1280)),
+        echo=click.echo,
+    )
+    current_app.extensions['asset_manifest'].load()
+    click.echo(f"✅ Built {len(manifest['webp'])} WebP images and "
+               f"{len(manifest['encodings'])} precompressed files")
+
+
+@chatbot_cli.command('check')
+@click.option('--path', help='Knowledge base file (default: CHATBOT_KB_PATH).')
+def check_knowledge_base_command(path):
+    """Compile the chatbot knowledge base and report overlapping or shadowed patterns."""
+    from flask import current_app
+    from app.utils.knowledge_base import load_knowledge_base
+
+    path = path or current_app.config['CHATBOT_KB_PATH']
+    try:
+        kb = load_knowledge_base(path)
+    except (OSError, ValueError) as e:
+        click.echo(f"❌ {path}: {e}", err=True)
+        sys.exit(1)
+
+    click.echo(f"✅ {len(kb.categories)} categories, {len(kb.issues)} issues")
+    for issue in kb.issues:
+        if issue.kind == 'unreachable':
+            click.echo(f"   unreachable: '{issue.category}' never matches by pattern")
+        else:
+            click.echo(f"   {issue.kind}: '{issue.category}' {issue.pattern!r} "
+                       f"<- '{issue.other_category}' {issue.other_pattern!r}")
+
+
+@students_cli.command('rebuild-status')
+def rebuild_student_status_command():
+    """Recompute every student's dashboard status summary row."""
+    from app.utils.student_status import rebuild_all_statuses
+
+    count = rebuild_all_statuses()
+    click.echo(f"✅ Rebuilt status for {count} students")
+
+
+def register_commands(app):
+    app.cli.add_command(slips_cli)
+    app.cli.add_command(templates_cli)
+    app.cli.add_command(assets_cli)
+    app.cli.add_command(chatbot_cli)
+    app.cli.add_command(students_cli)
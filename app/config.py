@@ -7,6 +7,10 @@ class Config:
 
     BASE_DIR = os.path.abspath(os.path.dirname(__file__))
 
+    # Default home of the per-host side stores below (each *_SQLITE_PATH /
+    # SINGLE_FLIGHT_DIR can still be set on its own)
+    VAR_DIR = os.environ.get('VAR_DIR', os.path.join(BASE_DIR, 'var'))
+
     SQLALCHEMY_DATABASE_URI = os.environ.get(
         'DATABASE_URL',
         f"sqlite:///{os.path.join(BASE_DIR, 'cavendish_registration.db')}"
@@ -15,17 +19,11 @@ class Config:
 
     # Folder to store uploaded payment slips
     UPLOAD_FOLDER = os.path.join(BASE_DIR, "uploads")
-    
-    # Create uploads folder if it doesn't exist
-    if not os.path.exists(UPLOAD_FOLDER):
-        os.makedirs(UPLOAD_FOLDER)
 
     # Folder to store registration slip PDFs
     REGISTRATION_SLIP_FOLDER = os.path.join(BASE_DIR, "registration_slips")
-    
-    # Create registration_slips folder if it doesn't exist
-    if not os.path.exists(REGISTRATION_SLIP_FOLDER):
-        os.makedirs(REGISTRATION_SLIP_FOLDER)
+
+    # Both folders are created by create_app(), not when this module is imported
 
     # Email Configuration for cPanel
     MAIL_SERVER = "mail.tukakula.com"
@@ -45,13 +43,186 @@ class Config:
     # Allowed file extensions
     ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'pdf'}
 
+    # Processes used by batch slip generation (None = CPU count)
+    SLIP_BATCH_WORKERS = int(os.environ.get('SLIP_BATCH_WORKERS', 0)) or None
+    # multiprocessing start method for those processes (None = platform default)
+    SLIP_BATCH_START_METHOD = os.environ.get('SLIP_BATCH_START_METHOD') or None
+    # Progress of admin-started batch jobs, readable from every worker
+    SLIP_BATCH_JOB_BACKEND = os.environ.get('SLIP_BATCH_JOB_BACKEND', 'sqlite')  # or "memory" (per worker)
+    SLIP_BATCH_JOB_SQLITE_PATH = os.environ.get('SLIP_BATCH_JOB_SQLITE_PATH',
+                                                os.path.join(VAR_DIR, 'slip_batch_jobs.db'))
+
+    # Jinja: compiled-template bytecode cache shared by all workers
+    JINJA_BYTECODE_CACHE = True
+    JINJA_BYTECODE_CACHE_DIR = os.environ.get('JINJA_BYTECODE_CACHE_DIR')  # None = system temp dir
+
+    # {% cache %} fragments (per worker process; invalidations reach every worker)
+    TEMPLATE_FRAGMENT_CACHE = True
+    TEMPLATE_FRAGMENT_CACHE_TIMEOUT = 300
+    TEMPLATE_FRAGMENT_BACKEND = os.environ.get('TEMPLATE_FRAGMENT_BACKEND', 'sqlite')  # or "memory" (per worker)
+    TEMPLATE_FRAGMENT_SQLITE_PATH = os.environ.get('TEMPLATE_FRAGMENT_SQLITE_PATH',
+                                                   os.path.join(VAR_DIR, 'fragments.db'))
+
     # Base URL for the application
     BASE_URL = os.environ.get('BASE_URL', 'http://localhost:5000')
 
+    # File downloads: "direct" streams through the worker, "x-accel" (nginx)
+    # or "x-sendfile" (Apache/lighttpd) hand the transfer to the front proxy
+    FILE_SERVING_MODE = os.environ.get('FILE_SERVING_MODE', 'direct')
+
+    # nginx `internal` locations that alias the protected folders, e.g.
+    #   location /protected/uploads/ { internal; alias /srv/app/uploads/; }
+    X_ACCEL_REDIRECT_LOCATIONS = {
+        'UPLOAD_FOLDER': os.environ.get('X_ACCEL_UPLOADS_LOCATION', '/protected/uploads/'),
+        'REGISTRATION_SLIP_FOLDER': os.environ.get('X_ACCEL_SLIPS_LOCATION', '/protected/registration_slips/'),
+    }
+
+    # Session storage: "cookie" (Flask default), "memory", "sqlite" (shared
+    # by the workers on one host) or "redis" (shared across nodes)
+    SESSION_BACKEND = os.environ.get('SESSION_BACKEND', 'sqlite')
+    SESSION_SQLITE_PATH = os.environ.get('SESSION_SQLITE_PATH', os.path.join(VAR_DIR, 'sessions.db'))
+    SESSION_REDIS_URL = os.environ.get('SESSION_REDIS_URL', 'local://')
+    # Sliding expiry: idle sessions expire after this many seconds
+    SESSION_IDLE_TIMEOUT = int(os.environ.get('SESSION_IDLE_TIMEOUT', 2 * 60 * 60))
+    SESSION_TOUCH_INTERVAL = 60
+
+    # Token-bucket rate limits: endpoint or blueprint -> (requests, per seconds),
+    # counted per account (see app/utils/rate_limit.py); per IP only for
+    # anonymous requests
+    RATE_LIMIT_ENABLED = True
+    RATE_LIMIT_BACKEND = os.environ.get('RATE_LIMIT_BACKEND', 'sqlite')  # or "memory" (per worker)
+    RATE_LIMIT_SQLITE_PATH = os.environ.get('RATE_LIMIT_SQLITE_PATH', os.path.join(VAR_DIR, 'rate_limits.db'))
+    RATE_LIMIT_METHODS = ('POST',)
+    # Number of reverse proxies in front of the app that append the client
+    # address to X-Forwarded-For (nginx alone = 1). 0 uses REMOTE_ADDR; never
+    # set it higher than the real number of proxies, or clients can spoof
+    # their IP with their own X-Forwarded-For header.
+    RATE_LIMIT_TRUST_PROXY = int(os.environ.get('RATE_LIMIT_TRUST_PROXY', 0))
+    # These count attempts against the account typed into the form, not the session
+    RATE_LIMIT_FORM_ACCOUNT_ENDPOINTS = (
+        'student.student_login',
+        'admin.admin_login',
+        'general.forgot_password',
+    )
+    RATE_LIMITS = {
+        'chatbot.ask_bot': (20, 60),
+        'student.student_login': (10, 300),
+        'admin.admin_login': (10, 300),
+        'general.forgot_password': (5, 900),
+        'student.upload_payment': (10, 300),
+        'student.upload_payment_ajax': (10, 300),
+        'student.submit_registration_with_payment': (10, 300),
+        'student': (120, 60),
+    }
+    # Extra per-IP bucket: high enough for a campus behind one NAT address,
+    # low enough to stop one address cycling through accounts
+    RATE_LIMIT_IP_CEILINGS = {
+        'student.student_login': (300, 300),
+        'admin.admin_login': (50, 300),
+        'general.forgot_password': (50, 900),
+        'chatbot.ask_bot': (600, 60),
+    }
+    # Per-worker cap on requests inside these endpoints; extra requests get a 503
+    MAX_CONCURRENT_REQUESTS = int(os.environ.get('MAX_CONCURRENT_REQUESTS', 8))
+    LOAD_SHED_ENDPOINTS = (
+        'chatbot.ask_bot',
+        'student.student_login',
+        'admin.admin_login',
+        'general.forgot_password',
+        'student.upload_payment',
+        'student.upload_payment_ajax',
+        'student.submit_registration_with_payment',
+    )
+
+    # Waiting room for registration opening day (off unless ADMISSION_ENABLED).
+    # Set the rate to the sustained throughput measured by the
+    # registration-week benchmark.
+    ADMISSION_ENABLED = os.environ.get('ADMISSION_ENABLED', '').lower() in ('1', 'true', 'yes')
+    ADMISSION_BACKEND = os.environ.get('ADMISSION_BACKEND', 'sqlite')  # or "memory" (per worker)
+    ADMISSION_SQLITE_PATH = os.environ.get('ADMISSION_SQLITE_PATH', os.path.join(VAR_DIR, 'admission.db'))
+    ADMISSION_MAX_ACTIVE = int(os.environ.get('ADMISSION_MAX_ACTIVE', 200))
+    ADMISSION_RATE_PER_MINUTE = int(os.environ.get('ADMISSION_RATE_PER_MINUTE', 60))
+    ADMISSION_BURST = int(os.environ.get('ADMISSION_BURST', 10))
+    ADMISSION_SESSION_SECONDS = 15 * 60  # idle time before an active slot is freed
+    ADMISSION_TICKET_SECONDS = 60        # waiting tickets not polled for this long are dropped
+    ADMISSION_POLL_SECONDS = 5
+    ADMISSION_ENDPOINTS = (
+        'student.student_dashboard',
+        'student.get_programs',
+        'student.get_semesters',
+        'student.get_available_courses',
+        'student.get_approved_courses',
+        'student.upload_payment',
+        'student.upload_payment_ajax',
+        'student.submit_registration',
+        'student.submit_registration_with_payment',
+    )
+
+    # Admin payment review queue: claims expire after the lease unless renewed
+    REVIEW_LEASE_SECONDS = int(os.environ.get('REVIEW_LEASE_SECONDS', 5 * 60))
+    REVIEW_CLAIM_SIZE = 10
+    REVIEW_CLAIM_MAX = 50
+
+    # Coalesce concurrent identical PDF renders: "process", "file" (shares
+    # results between the workers on one host) or "db" (PostgreSQL advisory lock)
+    SINGLE_FLIGHT_BACKEND = os.environ.get('SINGLE_FLIGHT_BACKEND', 'process')
+    SINGLE_FLIGHT_DIR = os.environ.get('SINGLE_FLIGHT_DIR', os.path.join(VAR_DIR, 'single_flight'))
+
+    # Idempotency-Key replay store for payment uploads and registration submits
+    IDEMPOTENCY_BACKEND = os.environ.get('IDEMPOTENCY_BACKEND', 'sqlite')  # or "memory" (per worker)
+    IDEMPOTENCY_SQLITE_PATH = os.environ.get('IDEMPOTENCY_SQLITE_PATH', os.path.join(VAR_DIR, 'idempotency.db'))
+    IDEMPOTENCY_TTL = int(os.environ.get('IDEMPOTENCY_TTL', 24 * 60 * 60))
+    # How long a request still running holds its key; keep it above the worker timeout
+    IDEMPOTENCY_LEASE = int(os.environ.get('IDEMPOTENCY_LEASE', 60))
+
+    # Compress HTML/JSON responses at least this big (gzip, or brotli if installed)
+    COMPRESS_ENABLED = True
+    COMPRESS_MIN_SIZE = 1024
+    COMPRESS_LEVEL = 6
+    # `flask assets build` output (must live under app/static); versioned
+    # static URLs (?v=<hash>) are cached for a year as immutable
+    STATIC_BUILD_FOLDER = os.path.join(BASE_DIR, 'static', 'dist')
+    STATIC_IMAGE_WIDTHS = (192, 640, 1280)
+    STATIC_IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+
+    # Chatbot fuzzy retrieval: minimum cosine similarity to answer, and how
+    # often each worker pulls newly answered questions into its index
+    CHATBOT_RETRIEVAL_THRESHOLD = 0.35
+    CHATBOT_INDEX_SYNC_SECONDS = 30
+    # Knowledge base file (edited from /admin/chatbot/knowledge); workers check
+    # its mtime at most this often and swap in the new version
+    CHATBOT_KB_PATH = os.environ.get('CHATBOT_KB_PATH', os.path.join(BASE_DIR, 'data', 'chatbot_knowledge.json'))
+    CHATBOT_KB_CHECK_SECONDS = 5
+
+    # Seconds a signed login snapshot (id, name, number, role) is trusted
+    # before it is re-read from the database; see app/utils/identity.py
+    IDENTITY_SNAPSHOT_TTL = int(os.environ.get('IDENTITY_SNAPSHOT_TTL', 300))
+    # Where committed password/role/name changes are recorded for every worker to see
+    IDENTITY_BACKEND = os.environ.get('IDENTITY_BACKEND', 'sqlite')  # or "memory" (per worker)
+    IDENTITY_SQLITE_PATH = os.environ.get('IDENTITY_SQLITE_PATH', os.path.join(VAR_DIR, 'identity.db'))
+    # Seconds between a worker's reads of that store
+    IDENTITY_CHECK_INTERVAL = float(os.environ.get('IDENTITY_CHECK_INTERVAL', 2))
+
+    # Per-request timing + /metrics (see app/utils/profiling.py); off by default
+    PROFILING_ENABLED = os.environ.get('PROFILING_ENABLED', '').lower() in ('1', 'true', 'yes')
+    # Lets a Prometheus scraper read /metrics without an admin session
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+
+    # Slow-query log (app/utils/slow_queries.py); 0 disables it
+    SLOW_QUERY_THRESHOLD_MS = float(os.environ.get('SLOW_QUERY_THRESHOLD_MS', 200))
+    SLOW_QUERY_LOG_FILE = os.environ.get('SLOW_QUERY_LOG_FILE', os.path.join(BASE_DIR, 'logs', 'slow_queries.log'))
+    SLOW_QUERY_LOG_MAX_BYTES = 5 * 1024 * 1024
+    SLOW_QUERY_LOG_BACKUPS = 5
+    # Also send each slow query to the app logger
+    SLOW_QUERY_APP_LOG = os.environ.get('SLOW_QUERY_APP_LOG', '').lower() in ('1', 'true', 'yes')
+    # EXPLAIN each distinct filtered SELECT once and report full table scans
+    SLOW_QUERY_SCAN_CHECK = os.environ.get('SLOW_QUERY_SCAN_CHECK', '').lower() in ('1', 'true', 'yes')
+
 
 class DevelopmentConfig(Config):
     DEBUG = True
     TESTING = False
+    TEMPLATE_FRAGMENT_CACHE = False  # see template edits immediately
 
 
 class ProductionConfig(Config):
@@ -63,6 +234,13 @@ class TestingConfig(Config):
     TESTING = True
     DEBUG = True
     MAIL_SUPPRESS_SEND = True  # Don't send emails during tests
+    SESSION_BACKEND = 'memory'
+    RATE_LIMIT_ENABLED = False
+    IDEMPOTENCY_BACKEND = 'memory'
+    SINGLE_FLIGHT_BACKEND = 'process'
+    SLIP_BATCH_JOB_BACKEND = 'memory'
+    IDENTITY_BACKEND = 'memory'
+    TEMPLATE_FRAGMENT_CACHE = False
 
 
 # Dictionary to easily switch between configurations
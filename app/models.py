@@ -83,6 +83,46 @@ class Student(db.Model):
         return f"<Student {self.student_number} - {self.name}>"
 
 
+# --------------------
+# STUDENT STATUS SUMMARY
+# --------------------
+class StudentStatus(db.Model):
+    """
+    One row per student summarising what the dashboard shows. Derived from
+    payments, registrations and slips by app/utils/student_status.py, which
+    their write paths call before committing.
+    """
+    __tablename__ = "student_status"
+
+    student_id = db.Column(db.Integer, db.ForeignKey("student.id"), primary_key=True)
+
+    # Latest academic registration
+    registration_id = db.Column(db.Integer, nullable=True)
+    program_name = db.Column(db.String(100), nullable=True)
+    year_level = db.Column(db.Integer, nullable=True)
+    semester_type = db.Column(db.String(50), nullable=True)
+    registration_status = db.Column(db.String(20), nullable=True)
+    total_credits = db.Column(db.Integer, nullable=False, default=0)
+
+    # Payments: "none", "pending", "approved" or "rejected"
+    payment_state = db.Column(db.String(20), nullable=False, default="none")
+    payment_count = db.Column(db.Integer, nullable=False, default=0)
+    pending_since = db.Column(db.DateTime, nullable=True)
+    approved_at = db.Column(db.DateTime, nullable=True)
+
+    # Registration slip, if one was issued
+    slip_id = db.Column(db.Integer, nullable=True)
+
+    updated_at = db.Column(db.DateTime, nullable=True)
+
+    @property
+    def slip_available(self):
+        return self.slip_id is not None
+
+    def __repr__(self):
+        return f"<StudentStatus {self.student_id} - {self.payment_state}>"
+
+
 # --------------------
 # PAYMENT MODEL
 # --------------------
@@ -103,9 +143,23 @@ class Payment(db.Model):
     reference = db.Column(db.String(100), nullable=True, unique=True)
     receipt_image = db.Column(db.String(255), nullable=True)
 
+    # Review queue: the admin holding the lease and until when, then who decided
+    claimed_by = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=True)
+    claimed_until = db.Column(db.DateTime, nullable=True)
+    reviewed_by = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=True)
+
+    # Optimistic locking: UPDATEs check and bump this, so a concurrent
+    # change raises StaleDataError instead of being overwritten
+    version_id = db.Column(db.Integer, nullable=False, default=1, server_default="1")
+
     # Relationships
     student = db.relationship("Student", back_populates="payments")
 
+    __table_args__ = (
+        db.Index("ix_payment_review_queue", "status", "claimed_until"),
+    )
+    __mapper_args__ = {"version_id_col": version_id}
+
     def __repr__(self):
         return f"<Payment {self.id} - {self.status} - {self.reference}>"
 
@@ -130,13 +184,49 @@ class RegistrationSlip(db.Model):
     program_name = db.Column(db.String(100), nullable=True)
     faculty_name = db.Column(db.String(100), nullable=True)
 
+    # What the slip showed when the payment was last approved
+    snapshot_id = db.Column(db.Integer, db.ForeignKey("registration_snapshot.id"), nullable=True)
+
+    # Optimistic locking (see Payment.version_id)
+    version_id = db.Column(db.Integer, nullable=False, default=1, server_default="1")
+
     # Relationships
     student = db.relationship("Student", back_populates="registration_slips")
+    snapshot = db.relationship("RegistrationSnapshot")
+
+    __mapper_args__ = {"version_id_col": version_id}
 
     def __repr__(self):
         return f"<RegistrationSlip {self.slip_number} - {self.student.name}>"
 
 
+# --------------------
+# REGISTRATION SNAPSHOT MODEL
+# --------------------
+class RegistrationSnapshot(db.Model):
+    """
+    Everything a registration slip shows, frozen when the payment is approved
+    (see app/utils/slip_snapshot.py). Rows are only ever inserted, so the
+    slip stays as issued even if courses or programs change later.
+    """
+    __tablename__ = "registration_snapshot"
+
+    id = db.Column(db.Integer, primary_key=True)
+    student_id = db.Column(db.Integer, db.ForeignKey("student.id"), nullable=False)
+    registration_id = db.Column(db.Integer, db.ForeignKey("student_registration.id"), nullable=True)
+    payment_id = db.Column(db.Integer, db.ForeignKey("payment.id"), nullable=True)
+    created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+    data = db.Column(db.JSON, nullable=False)
+
+    __table_args__ = (
+        # Latest snapshot per student in one index seek
+        db.Index("ix_registration_snapshot_student", "student_id", "id"),
+    )
+
+    def __repr__(self):
+        return f"<RegistrationSnapshot {self.id} - student {self.student_id}>"
+
+
 # --------------------
 # CHATBOT MESSAGE MODEL
 # --------------------
@@ -167,15 +167,16 @@ class ProgramCourse(db.Model):
 
     is_mandatory = db.Column(db.Boolean, default=True)
 
+    # Lazy: queries that need these opt in (app/utils/loading_profiles.py)
     program = db.relationship(
         "Program",
         back_populates="courses",
-        lazy="joined"
+        lazy=True
     )
     
     course = db.relationship(
         "Course",
-        lazy="joined"
+        lazy=True
     )
 
     def __repr__(self):
@@ -187,6 +188,17 @@ class ProgramCourse(db.Model):
 # =========================================================
 class StudentRegistration(db.Model):
     __tablename__ = "student_registration"
+    __table_args__ = (
+        # One application per student per program/year/semester
+        db.Index(
+            "uq_student_registration_term",
+            "student_id",
+            "program_id",
+            "year_level",
+            "semester_type",
+            unique=True
+        ),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
 
@@ -224,6 +236,16 @@ class StudentRegistration(db.Model):
         default="pending"
     )
 
+    # Optimistic locking (see Payment.version_id)
+    version_id = db.Column(
+        db.Integer,
+        nullable=False,
+        default=1,
+        server_default="1"
+    )
+
+    __mapper_args__ = {"version_id_col": version_id}
+
     # =========================================================
     # RELATIONSHIPS (FIXED)
     # =========================================================
@@ -252,7 +274,7 @@ class StudentRegistration(db.Model):
         "RegisteredCourse",
         back_populates="registration",
         cascade="all, delete-orphan",
-        lazy="joined"
+        lazy=True
     )
 
     def __repr__(self):
@@ -2,12 +2,24 @@
 import os
 from flask import (
     Blueprint, render_template, redirect, url_for, flash, 
-    send_from_directory, current_app, session, request
+    current_app, session, request, jsonify, Response,
+    get_flashed_messages
 )
 from functools import wraps
 from werkzeug.security import check_password_hash
 from datetime import datetime
-from app.models import db, User, Student, Payment, Registration, RegistrationSlip
+from app.models import db, User, Student, Payment, Registration, RegistrationSlip, RegistrationSnapshot
+from app.utils.file_serving import send_protected_file, stream_zip
+from app.utils.template_cache import invalidate_fragments
+from app.utils.identity import current_identity, remember_identity, forget_identity
+from app.utils.sessions import revoke_sessions
+from app.utils.versioning import check_version, stale_guard, VersionConflict
+from app.utils.student_status import refresh_student_status, refresh_student_statuses, program_student_ids
+from app.utils.loading_profiles import profiled
+from app.utils.review_queue import (
+    claim_payments, check_claim, release_claim, mark_reviewed,
+    reviewer_throughput, queue_depth, ClaimConflict
+)
 
 # IMPORTANT: Add this import - this was causing NameError
 from app.models_academics import (
@@ -17,8 +29,7 @@ from app.models_academics import (
     ProgramCourse,
     ProgramStructure,
     AcademicYear,
-    StudentRegistration,      # ADDED - fixes NameError
-    RegisteredCourse          # ADDED - for future use
+    StudentRegistration       # ADDED - fixes NameError
 )
 
 admin_bp = Blueprint('admin', __name__, template_folder='../templates/admin')
@@ -29,7 +40,7 @@ admin_bp = Blueprint('admin', __name__, template_folder='../templates/admin')
 def admin_required(f):
     @wraps(f)
     def decorated_function(*args, **kwargs):
-        if 'user_id' not in session or session.get('role') != 'admin':
+        if not current_identity('admin'):
             flash("Please log in as admin to access this page.", "warning")
             return redirect(url_for('admin.admin_login'))
         return f(*args, **kwargs)
@@ -40,7 +51,7 @@ def admin_required(f):
 # -----------------
 @admin_bp.route('/login', methods=['GET', 'POST'])
 def admin_login():
-    if 'user_id' in session and session.get('role') == 'admin':
+    if current_identity('admin'):
         return redirect(url_for('admin.dashboard'))
 
     if request.method == 'POST':
@@ -49,8 +60,7 @@ def admin_login():
 
         user = User.query.filter_by(username=username, role='admin').first()
         if user and check_password_hash(user.password_hash, password):
-            session['user_id'] = user.id
-            session['role'] = user.role
+            remember_identity('admin', user)
             flash("Admin login successful!", "success")
             return redirect(url_for('admin.dashboard'))
         else:
@@ -60,8 +70,7 @@ def admin_login():
 
 @admin_bp.route('/logout')
 def admin_logout():
-    session.pop('user_id', None)
-    session.pop('role', None)
+    forget_identity('admin')
     flash("You have been logged out.", "info")
     return redirect(url_for('admin.admin_login'))
 
@@ -98,6 +107,22 @@ def manage_payment(payment_id, action):
     """Approve or reject payments with full registration sync and email notifications"""
     
     payment = Payment.query.get_or_404(payment_id)
+    try:
+        check_claim(payment, session.get('user_id'))
+        check_version(payment, 'This payment')
+        with stale_guard('This payment'):
+            _apply_payment_decision(payment, action)
+    except ClaimConflict as e:
+        flash(str(e), 'warning')
+    except VersionConflict as e:
+        # Drop the messages of the decision that was rolled back
+        get_flashed_messages()
+        flash(str(e), 'warning')
+    return redirect(url_for('admin.dashboard'))
+
+
+def _apply_payment_decision(payment, action):
+    """Approve/reject payment, sync its registration, commit and email. False for an unknown action."""
     student = Student.query.get(payment.student_id)
     
     # =========================
@@ -106,6 +131,7 @@ def manage_payment(payment_id, action):
     if action == 'approve':
         payment.status = 'approved'
         payment.approved_date = datetime.utcnow()
+        mark_reviewed(payment, session.get('user_id'))
         
         student_id = payment.student_id
         
@@ -167,19 +193,31 @@ def manage_payment(payment_id, action):
             db.session.add(registration_slip)
             db.session.flush()
             
-            # Generate PDF
+            # The PDF itself is written after the commit
+            from app.utils.helpers import registration_slip_pdf_filename
+            registration_slip.pdf_filename = registration_slip_pdf_filename(registration_slip)
+        else:
+            registration_slip = existing_slip
+
+        # -------------------------------------------------
+        # 3. FREEZE WHAT THE SLIP SHOWS (slip views read this)
+        # -------------------------------------------------
+        from app.utils.slip_snapshot import capture_snapshot
+        snapshot = capture_snapshot(student_id, registration, payment)
+        registration_slip.snapshot_id = snapshot.id
+        refresh_student_status(student_id)
+
+        db.session.commit()
+
+        if existing_slip:
+            flash(f'Payment approved for {payment.student.name}', 'success')
+        else:
+            # Generate PDF from the committed slip
             from app.utils.helpers import generate_registration_slip_pdf
-            success = generate_registration_slip_pdf(registration_slip)
-            
-            if success:
+            if generate_registration_slip_pdf(registration_slip):
                 flash(f'Payment approved & registration completed for {payment.student.name}', 'success')
             else:
                 flash(f'Payment approved but slip PDF generation failed for {payment.student.name}', 'warning')
-        else:
-            registration_slip = existing_slip
-            flash(f'Payment approved for {payment.student.name}', 'success')
-        
-        db.session.commit()
         
         # ==========================================
         # SEND PAYMENT APPROVAL EMAIL
@@ -197,6 +235,7 @@ def manage_payment(payment_id, action):
     elif action == 'reject':
         payment.status = 'rejected'
         payment.approved_date = datetime.utcnow()
+        mark_reviewed(payment, session.get('user_id'))
         
         # Optionally update registration status if exists
         registration = StudentRegistration.query.filter_by(
@@ -206,6 +245,7 @@ def manage_payment(payment_id, action):
         
         if registration:
             registration.payment_status = 'rejected'
+        refresh_student_status(payment.student_id)
         
         db.session.commit()
         flash(f'Payment for {payment.student.name} rejected.', 'warning')
@@ -222,8 +262,9 @@ def manage_payment(payment_id, action):
     
     else:
         flash("Invalid action.", "danger")
-    
-    return redirect(url_for('admin.dashboard'))
+        return False
+
+    return True
 
 # -----------------
 # Payment Preview
@@ -235,6 +276,101 @@ def preview_payment(payment_id):
     payment = Payment.query.get_or_404(payment_id)
     return render_template('admin/payment_preview.html', payment=payment)
 
+# -----------------
+# Payment Review Queue (claim work with a lease)
+# -----------------
+def _queue_item(payment):
+    return {
+        'id': payment.id,
+        'student_name': payment.student.name if payment.student else None,
+        'student_number': payment.student.student_number if payment.student else None,
+        'submitted_date': payment.submitted_date.isoformat() if payment.submitted_date else None,
+        'claimed_until': payment.claimed_until.isoformat() if payment.claimed_until else None,
+        'version': payment.version_id,
+        'slip_url': url_for('admin.serve_uploaded_file', filename=payment.slip_filename),
+        'preview_url': url_for('admin.preview_payment', payment_id=payment.id),
+    }
+
+
+@admin_bp.route('/review-queue')
+@admin_required
+def review_queue():
+    """Page that claims payments and decides them one by one over the API"""
+    return render_template(
+        'admin/review_queue.html',
+        lease_seconds=current_app.config['REVIEW_LEASE_SECONDS'],
+        claim_size=current_app.config['REVIEW_CLAIM_SIZE']
+    )
+
+
+@admin_bp.route('/review-queue/claim', methods=['POST'])
+@admin_required
+def claim_review_batch():
+    """Claim (and renew) up to `limit` pending payments for this reviewer"""
+    config = current_app.config
+    try:
+        limit = int(request.values.get('limit', config['REVIEW_CLAIM_SIZE']))
+    except ValueError:
+        return jsonify({'success': False, 'error': 'Invalid limit'}), 400
+    limit = max(1, min(limit, config['REVIEW_CLAIM_MAX']))
+
+    payments = claim_payments(session.get('user_id'), limit, config['REVIEW_LEASE_SECONDS'])
+    pending, leased = queue_depth()
+    return jsonify({
+        'success': True,
+        'payments': [_queue_item(payment) for payment in payments],
+        'lease_seconds': config['REVIEW_LEASE_SECONDS'],
+        'pending': pending,
+        'leased': leased,
+    })
+
+
+@admin_bp.route('/review-queue/<int:payment_id>/release', methods=['POST'])
+@admin_required
+def release_review_item(payment_id):
+    released = release_claim(payment_id, session.get('user_id'))
+    return jsonify({'success': released})
+
+
+@admin_bp.route('/review-queue/<int:payment_id>/<action>', methods=['POST'])
+@admin_required
+def decide_review_item(payment_id, action):
+    """Approve/reject one claimed payment; answers JSON instead of re-rendering the dashboard"""
+    if action not in ('approve', 'reject'):
+        return jsonify({'success': False, 'error': 'Invalid action.'}), 400
+
+    payment = Payment.query.get_or_404(payment_id)
+    if payment.status != 'pending':
+        return jsonify({'success': False, 'error': f'Payment was already {payment.status}.'}), 409
+    try:
+        check_claim(payment, session.get('user_id'))
+        check_version(payment, 'This payment')
+        with stale_guard('This payment'):
+            _apply_payment_decision(payment, action)
+    except (ClaimConflict, VersionConflict) as e:
+        get_flashed_messages()
+        return jsonify({'success': False, 'error': str(e)}), 409
+
+    # The decision reports through flash(); hand those messages back here instead
+    messages = [message for _, message in get_flashed_messages(with_categories=True)]
+    return jsonify({'success': True, 'status': payment.status, 'version': payment.version_id, 'messages': messages})
+
+
+@admin_bp.route('/review-queue/stats')
+@admin_required
+def review_queue_stats():
+    try:
+        hours = max(1, min(int(request.args.get('hours', 8)), 24 * 7))
+    except ValueError:
+        hours = 8
+    pending, leased = queue_depth()
+    return jsonify({
+        'pending': pending,
+        'leased': leased,
+        'hours': hours,
+        'reviewers': reviewer_throughput(hours),
+    })
+
 # -----------------
 # Registration Slip Management
 # -----------------
@@ -272,12 +408,14 @@ def create_registration_slip_form():
             )
             
             db.session.add(registration_slip)
+            db.session.flush()
+            from app.utils.helpers import registration_slip_pdf_filename, generate_registration_slip_pdf
+            registration_slip.pdf_filename = registration_slip_pdf_filename(registration_slip)
+            refresh_student_status(student.id)
             db.session.commit()
             
-            # Generate PDF
-            from app.utils.helpers import generate_registration_slip_pdf
+            # Generate PDF from the committed slip
             if generate_registration_slip_pdf(registration_slip):
-                db.session.commit()
                 flash(f'Registration slip created for {student.name}!', 'success')
             else:
                 flash(f'Registration slip created but PDF generation failed for {student.name}.', 'warning')
@@ -304,7 +442,40 @@ def view_registration_slips():
     
     return render_template('admin/view_registration_slips.html', 
                          slips=registration_slips,
-                         today_count=today_count)
+                         today_count=today_count,
+                         programs=Program.query.order_by(Program.name).all(),
+                         academic_years=AcademicYear.query.order_by(AcademicYear.name.desc()).all())
+
+# -----------------batch generate registration slips for an intake-----------------
+@admin_bp.route('/registration_slips/batch', methods=['POST'])
+@admin_required
+def batch_generate_slips():
+    """Start background (re)generation of slips for a filtered set of students"""
+    from app.utils.slip_batch import start_background_batch
+
+    job_id = start_background_batch(
+        current_app._get_current_object(),
+        created_by=session.get('user_id', 'admin'),
+        refresh_details=bool(request.form.get('refresh_details')),
+        program_id=request.form.get('program_id', type=int),
+        year_level=request.form.get('year_level', type=int),
+        semester_type=request.form.get('semester_type') or None,
+        academic_year=request.form.get('academic_year_id', type=int),
+    )
+
+    flash(f'Batch slip generation started (job {job_id}).', 'info')
+    return redirect(url_for('admin.view_registration_slips', batch_job=job_id))
+
+@admin_bp.route('/registration_slips/batch/<job_id>')
+@admin_required
+def batch_generate_status(job_id):
+    """Progress of a batch slip generation job"""
+    from app.utils.slip_batch import batch_job_status
+
+    status = batch_job_status(job_id)
+    if not status:
+        return jsonify({'error': 'Unknown job'}), 404
+    return jsonify(status)
 
 #-------------------------------------------------------------------------
 # ----------------- EMAIL NOTIFICATIONS (FIXED - with proper sender format and error handling)
@@ -312,39 +483,45 @@ def view_registration_slips():
 @admin_bp.route('/edit_registration_slip/<int:slip_id>', methods=['GET', 'POST'])
 @admin_required
 def edit_registration_slip(slip_id):
-    """Edit an existing registration slip with live academic data"""
+    """Edit an existing registration slip, showing the registration it was approved with"""
+    from app.utils.slip_snapshot import slip_context
+
     slip = RegistrationSlip.query.get_or_404(slip_id)
     
-    # Get live academic registration data
-    academic_registration = StudentRegistration.query.filter_by(
-        student_id=slip.student_id
-    ).order_by(StudentRegistration.id.desc()).first()
-    
-    # Get registered courses
-    registered_courses = []
-    if academic_registration:
-        registered_courses = RegisteredCourse.query.filter_by(
-            registration_id=academic_registration.id
-        ).all()
+    # Snapshot from the approval by primary key (latest/live data for older slips)
+    snapshot = db.session.get(RegistrationSnapshot, slip.snapshot_id) if slip.snapshot_id else None
+    registration = slip_context(slip.student_id, snapshot)
     
     if request.method == 'POST':
         try:
-            # Update slip information
-            slip.program_name = request.form.get('program_name', slip.program_name)
-            slip.faculty_name = request.form.get('faculty_name', slip.faculty_name)
-            slip.academic_year = request.form.get('academic_year', slip.academic_year)
-            slip.semester = request.form.get('semester', slip.semester)
+            check_version(slip, 'This registration slip')
+        except VersionConflict as e:
+            flash(str(e), 'warning')
+            return redirect(url_for('admin.edit_registration_slip', slip_id=slip.id))
+
+        try:
+            from app.utils.helpers import registration_slip_pdf_filename, generate_registration_slip_pdf
+
+            with stale_guard('This registration slip'):
+                # Update slip information
+                slip.program_name = request.form.get('program_name', slip.program_name)
+                slip.faculty_name = request.form.get('faculty_name', slip.faculty_name)
+                slip.academic_year = request.form.get('academic_year', slip.academic_year)
+                slip.semester = request.form.get('semester', slip.semester)
+                slip.pdf_filename = registration_slip_pdf_filename(slip)
+                db.session.commit()
             
-            # Regenerate PDF with updated information
-            from app.utils.helpers import generate_registration_slip_pdf
+            # Regenerate PDF from what was committed; an edit that lost the race never gets here
             if generate_registration_slip_pdf(slip):
-                db.session.commit()
                 flash('Registration slip updated successfully!', 'success')
             else:
                 flash('Slip updated but PDF regeneration failed.', 'warning')
                 
             return redirect(url_for('admin.view_registration_slips'))
             
+        except VersionConflict as e:
+            flash(str(e), 'warning')
+            return redirect(url_for('admin.edit_registration_slip', slip_id=slip_id))
         except Exception as e:
             db.session.rollback()
             flash(f'Error updating registration slip: {str(e)}', 'danger')
@@ -352,8 +529,7 @@ def edit_registration_slip(slip_id):
     return render_template(
         'admin/edit_registration_slip.html', 
         slip=slip,
-        academic_registration=academic_registration,
-        registered_courses=registered_courses
+        registration=registration
     )
     
 # ----------------- EMAIL NOTIFICATIONS (FIXED - with proper sender format and error handling) -----------------   
@@ -364,9 +540,12 @@ def regenerate_slip_pdf(slip_id):
     slip = RegistrationSlip.query.get_or_404(slip_id)
     
     try:
-        from app.utils.helpers import generate_registration_slip_pdf
+        from app.utils.helpers import registration_slip_pdf_filename, generate_registration_slip_pdf
+        if slip.pdf_filename != registration_slip_pdf_filename(slip):
+            slip.pdf_filename = registration_slip_pdf_filename(slip)
+            with stale_guard('This registration slip'):
+                db.session.commit()
         if generate_registration_slip_pdf(slip):
-            db.session.commit()
             flash('PDF regenerated successfully!', 'success')
         else:
             flash('PDF regeneration failed.', 'warning')
@@ -391,6 +570,7 @@ def delete_registration_slip(slip_id):
                 os.remove(pdf_path)
         
         db.session.delete(slip)
+        refresh_student_status(slip.student_id)
         db.session.commit()
         flash(f'Registration slip for {student_name} deleted successfully!', 'success')
     except Exception as e:
@@ -399,15 +579,58 @@ def delete_registration_slip(slip_id):
     
     return redirect(url_for('admin.view_registration_slips'))
 
+# -----------------export all slips for a class as one download-----------------
+@admin_bp.route('/registration_slips/export')
+@admin_required
+def export_registration_slips():
+    """Download every slip for a program/year/semester as a streamed ZIP or a merged PDF"""
+    from app.utils.slip_batch import select_registrations, ensure_slip_files, booklet_contexts
+    from app.utils.pdf_generator import render_official_booklet
+
+    program_id = request.args.get('program_id', type=int)
+    year_level = request.args.get('year_level', type=int)
+    semester_type = request.args.get('semester_type') or None
+    academic_year = request.args.get('academic_year_id', type=int)
+    export_format = request.args.get('format', 'zip')
+
+    registrations = select_registrations(
+        program_id=program_id,
+        year_level=year_level,
+        semester_type=semester_type,
+        academic_year=academic_year,
+    )
+
+    if not registrations:
+        flash('No approved registrations match that selection.', 'warning')
+        return redirect(url_for('admin.view_registration_slips'))
+
+    name_parts = ['slips', f'P{program_id}' if program_id else 'all',
+                  f'Y{year_level}' if year_level else None, semester_type]
+    base_name = '_'.join(part for part in name_parts if part)
+
+    if export_format == 'pdf':
+        # One ReportLab document, one slip per page
+        response = Response(render_official_booklet(booklet_contexts(registrations)), mimetype='application/pdf')
+        response.headers['Content-Disposition'] = f'attachment; filename={base_name}.pdf'
+        return response
+
+    # Slips without a stored PDF are rendered now, in parallel
+    files, failed = ensure_slip_files(registrations)
+    if failed:
+        flash(f'{len(failed)} of {len(registrations)} slips could not be rendered; nothing was exported. '
+              f'See the error log.', 'danger')
+        return redirect(url_for('admin.view_registration_slips'))
+
+    # The ZIP is built from the stored PDFs while being sent
+    response = Response(stream_zip(files), mimetype='application/zip')
+    response.headers['Content-Disposition'] = f'attachment; filename={base_name}.zip'
+    return response
+
 @admin_bp.route('/registration_slips/<filename>')
 @admin_required
 def serve_registration_slip(filename):
     """Serve registration slip PDF files"""
-    return send_from_directory(
-        current_app.config['REGISTRATION_SLIP_FOLDER'],
-        filename,
-        as_attachment=False
-    )
+    return send_protected_file('REGISTRATION_SLIP_FOLDER', filename, as_attachment=False)
 
 # -----------------
 # Student Management
@@ -437,7 +660,8 @@ def view_student_details(student_id):
         student_id=student_id
     ).first()
 
-    registration = StudentRegistration.query.filter_by(
+    # Program, faculty, academic year and courses come with the registration
+    registration = profiled(StudentRegistration, 'slip').filter_by(
         student_id=student_id
     ).order_by(
         StudentRegistration.id.desc()
@@ -450,27 +674,13 @@ def view_student_details(student_id):
 
     if registration:
 
-        program = Program.query.get(
-            registration.program_id
-        )
-
-        if registration.academic_year_id:
-            academic_year = AcademicYear.query.get(
-                registration.academic_year_id
-            )
+        program = registration.program
+        academic_year = registration.academic_year
 
-        if program and program.faculty_id:
-            faculty = Faculty.query.get(
-                program.faculty_id
-            )
+        if program:
+            faculty = program.faculty
 
-        registered_courses = (
-            RegisteredCourse.query
-            .filter_by(
-                registration_id=registration.id
-            )
-            .all()
-        )
+        registered_courses = registration.courses
 
     return render_template(
         'admin/student_details.html',
@@ -560,6 +770,7 @@ def reset_admin_password(admin_id):
         # Update password
         admin_user.set_password(new_password)
         db.session.commit()
+        revoke_sessions(user_id=admin_user.id)
 
         flash(f"Password for {admin_user.username} has been reset successfully!", "success")
         return redirect(url_for('admin.manage_admins'))
@@ -579,6 +790,7 @@ def delete_admin(admin_id):
     
     db.session.delete(admin_user)
     db.session.commit()
+    revoke_sessions(user_id=admin_id)
 
     flash(f"Admin account for {username} has been deleted.", "success")
     return redirect(url_for('admin.manage_admins'))
@@ -593,11 +805,7 @@ def serve_uploaded_file(filename):
     if not os.path.exists(file_path):
         flash('File not found.', 'danger')
         return redirect(url_for('admin.dashboard'))
-    return send_from_directory(
-        directory=current_app.config['UPLOAD_FOLDER'],
-        path=filename,
-        as_attachment=False
-    )
+    return send_protected_file('UPLOAD_FOLDER', filename, as_attachment=False)
     
 # -----------------
 # Academic Management (Faculties, Programs, Courses)
@@ -652,6 +860,7 @@ def create_program():
                 db.session.add(structure)
 
         db.session.commit()
+        invalidate_fragments('programs')
 
         flash("Program created successfully!", "success")
         return redirect(url_for('admin.program_builder', program_id=program.id))
@@ -705,7 +914,10 @@ def edit_program(program_id):
 
             program.duration_years = new_duration
 
+        # Status rows show the program name
+        refresh_student_statuses(program_student_ids(program.id))
         db.session.commit()
+        invalidate_fragments('programs')
 
         flash("Program updated safely!", "success")
         return redirect(url_for('admin.view_programs'))
@@ -734,8 +946,12 @@ def delete_program(program_id):
         for s in program.program_structures:
             db.session.delete(s)
 
+    student_ids = program_student_ids(program.id)
     db.session.delete(program)
+    db.session.flush()
+    refresh_student_statuses(student_ids)
     db.session.commit()
+    invalidate_fragments('programs')
 
     flash("Program deleted successfully!", "success")
     return redirect(url_for('admin.view_programs'))
@@ -750,7 +966,7 @@ def program_builder(program_id):
 
     program = Program.query.get_or_404(program_id)
 
-    curriculum = ProgramCourse.query.filter_by(
+    curriculum = profiled(ProgramCourse, 'catalog').filter_by(
         program_id=program.id
     ).order_by(
         ProgramCourse.year_level,
@@ -933,7 +1149,7 @@ def remove_program_course(id):
 @admin_required
 def view_registrations():
     """View all student registrations"""
-    registrations = StudentRegistration.query.order_by(
+    registrations = profiled(StudentRegistration, 'admin_list').order_by(
         StudentRegistration.registration_date.desc()
     ).all()
     
@@ -953,9 +1169,15 @@ def update_registration_status(reg_id, status):
     registration = StudentRegistration.query.get_or_404(reg_id)
     
     if status in ['approved', 'pending', 'rejected']:
-        registration.payment_status = status
-        db.session.commit()
-        flash(f'Registration #{reg_id} status updated to {status}', 'success')
+        try:
+            check_version(registration, f'Registration #{reg_id}')
+            registration.payment_status = status
+            with stale_guard(f'Registration #{reg_id}'):
+                refresh_student_status(registration.student_id)
+                db.session.commit()
+            flash(f'Registration #{reg_id} status updated to {status}', 'success')
+        except VersionConflict as e:
+            flash(str(e), 'warning')
     else:
         flash('Invalid status', 'danger')
     
@@ -975,4 +1197,120 @@ def recent_programs():
             'faculty_name': p.faculty.name if p.faculty else None,
             'created_at': p.created_at.strftime('%Y-%m-%d') if p.created_at else None
         } for p in programs]
-    })
\ No newline at end of file
+    })
+
+# ==========================================
+# ADMIN: SLOW QUERY REPORT
+# ==========================================
+@admin_bp.route('/slow-queries', methods=['GET', 'POST'])
+@admin_required
+def slow_queries():
+    """Worst SQL statements seen by this worker, grouped by normalized statement"""
+    from app.utils.slow_queries import slow_query_stats
+
+    if request.method == 'POST':
+        slow_query_stats.reset()
+        flash("Slow query statistics cleared.", "success")
+        return redirect(url_for('admin.slow_queries'))
+
+    sort = request.args.get('sort', 'total_ms')
+    if sort not in ('total_ms', 'max_ms', 'avg_ms', 'count'):
+        sort = 'total_ms'
+
+    return render_template(
+        'admin/slow_queries.html',
+        statements=slow_query_stats.worst(order_by=sort),
+        sort=sort,
+        threshold_ms=current_app.config.get('SLOW_QUERY_THRESHOLD_MS'),
+        log_file=current_app.config.get('SLOW_QUERY_LOG_FILE')
+    )
+
+# ==========================================
+# ADMIN: CHATBOT KNOWLEDGE BASE
+# ==========================================
+def _save_knowledge(categories):
+    """Validate, write and hot-swap the knowledge base; flash the outcome. Returns True on success."""
+    from app.utils.knowledge_base import save_knowledge_base
+    from app.routes.chatbot.chatbot_routes import chatbot
+
+    try:
+        compiled = save_knowledge_base(current_app.config['CHATBOT_KB_PATH'], categories)
+    except ValueError as e:
+        flash(f"Knowledge base not saved: {e}", "danger")
+        return False
+    except OSError as e:
+        print(f"❌ Could not write chatbot knowledge base: {e}")
+        flash("Knowledge base could not be written. Check the server logs.", "danger")
+        return False
+
+    chatbot.kb_source.swap(compiled)
+    flash("Knowledge base saved. All workers pick it up within a few seconds.", "success")
+    if compiled.issues:
+        flash(f"{len(compiled.issues)} overlapping or shadowed patterns; see the report below.", "warning")
+    return True
+
+
+@admin_bp.route('/chatbot/knowledge')
+@admin_required
+def chatbot_knowledge():
+    """Knowledge base categories in matching order, with the overlap report"""
+    from app.utils.knowledge_base import load_knowledge_base
+
+    kb = load_knowledge_base(current_app.config['CHATBOT_KB_PATH'])
+    return render_template(
+        'admin/chatbot_knowledge.html',
+        categories=kb.categories,
+        issues=kb.issues,
+        kb_path=current_app.config['CHATBOT_KB_PATH']
+    )
+
+
+@admin_bp.route('/chatbot/knowledge/new', methods=['GET', 'POST'])
+@admin_bp.route('/chatbot/knowledge/<name>/edit', methods=['GET', 'POST'])
+@admin_required
+def edit_chatbot_knowledge(name=None):
+    """Create or edit one category; patterns are one regex per line"""
+    from app.utils.knowledge_base import read_categories
+
+    is_new = name is None
+    categories = read_categories(current_app.config['CHATBOT_KB_PATH'])
+    if not is_new and name not in categories:
+        flash("Category not found.", "danger")
+        return redirect(url_for('admin.chatbot_knowledge'))
+
+    entry = categories.get(name, {'patterns': [], 'response': ''})
+    if request.method == 'POST':
+        new_name = (request.form.get('name') or name or '').strip().lower()
+        entry = {
+            'patterns': [line.strip() for line in request.form.get('patterns', '').splitlines() if line.strip()],
+            'response': request.form.get('response', '').strip()
+        }
+
+        if new_name != name and new_name in categories:
+            flash(f"A category named '{new_name}' already exists.", "danger")
+        else:
+            # Keep the category's position (it decides which pattern wins); new ones go last
+            updated = {}
+            for key, value in categories.items():
+                updated[new_name if key == name else key] = entry if key == name else value
+            if is_new:
+                updated[new_name] = entry
+            if _save_knowledge(updated):
+                return redirect(url_for('admin.chatbot_knowledge'))
+        if is_new:
+            name = new_name
+
+    return render_template('admin/edit_chatbot_knowledge.html', name=name, entry=entry, is_new=is_new)
+
+
+@admin_bp.route('/chatbot/knowledge/<name>/delete', methods=['POST'])
+@admin_required
+def delete_chatbot_knowledge(name):
+    from app.utils.knowledge_base import read_categories
+
+    categories = read_categories(current_app.config['CHATBOT_KB_PATH'])
+    if categories.pop(name, None) is None:
+        flash("Category not found.", "danger")
+    else:
+        _save_knowledge(categories)
+    return redirect(url_for('admin.chatbot_knowledge'))
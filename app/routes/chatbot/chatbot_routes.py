@@ -1,20 +1,17 @@
 # ---- routes/chatbot/chatbot_routes.py ----
 from flask import Blueprint, render_template, request, jsonify, current_app
-from openai import OpenAI, APIError, RateLimitError, APIStatusError
-from httpx import Timeout
 from app.models import ChatbotMessage, db
 
 import os
 import logging
 import re
+import time
+import threading
 from datetime import datetime
-from dotenv import load_dotenv
 from sqlalchemy.exc import SQLAlchemyError
-from requests.exceptions import HTTPError
-from tenacity import retry, wait_random_exponential, stop_after_attempt, retry_if_exception_type
 
-# Load .env environment variables
-load_dotenv()
+from app.utils.faq_index import TfidfIndex, pattern_text, UNINDEXED_CATEGORIES
+from app.utils.knowledge_base import KnowledgeBaseSource, DEFAULT_KB_PATH
 
 # Initialize blueprint
 chatbot_bp = Blueprint('chatbot', __name__, url_prefix='/chatbot')
@@ -28,7 +25,7 @@ logger.setLevel(logging.INFO)
 # ----------------------------
 class CavendishChatbot:
     def __init__(self):
-        self.knowledge_base = self._build_knowledge_base()
+        self._kb_source = None
         self.greetings = [
             "hello", "hi", "hey", "good morning", "good afternoon", "good evening",
             "howdy", "greetings", "what's up", "yo", "hola", "hi there"
@@ -40,820 +37,28 @@ class CavendishChatbot:
         self.gratitude = [
             "thank", "thanks", "appreciate", "thank you", "thx", "ty", "much appreciated"
         ]
-
-    def _build_knowledge_base(self):
-        """
-        Comprehensive knowledge base for Cavendish University
-        """
-        return {
-            # =========================
-            # STUDENT REGISTRATION FAQ
-            # =========================
-            "new_student_registration": {
-                "patterns": [
-                    r"new.*student.*register",
-                    r"how.*register.*new student",
-                    r"first.*time.*register",
-                    r"student.*registration process"
-                ],
-                "response": """To register as a new student:
-
-1. Open the Student Registration Portal.
-2. Click Student Registration.
-3. Enter your Student Number and Full Name.
-4. Create a password.
-5. Verify your email address.
-6. Log into your account.
-7. Select your programme, year level and semester.
-8. Upload payment proof.
-9. Submit your registration for approval.
-
-Once approved, you can download your Registration Slip from your dashboard."""
-            },
-
-            "registration_approval": {
-                "patterns": [
-                    r"approval.*take",
-                    r"how long.*registration",
-                    r"registration.*approval",
-                    r"pending.*approval"
-                ],
-                "response": """Registration approval normally takes between 24 and 72 working hours after payment proof has been submitted.
-
-Approval time may vary depending on:
-• Verification of payment
-• Registration volume
-• Weekends and public holidays
-You will receive an email notification once your registration has been approved."""
-            },
-
-            "download_regslip": {
-                "patterns": [
-                    r"download.*registration slip",
-                    r"download.*reg slip",
-                    r"print.*registration slip",
-                    r"get.*registration slip"
-                ],
-                "response": """To download your Registration Slip:
-
-1. Log into the Student Portal.
-2. Open your Dashboard.
-3. Select your approved registration.
-4. Click Download Registration Slip.
-
-Your Registration Slip becomes available only after approval by the Registrar's Office."""
-            },
-
-            "registration_requirements": {
-                "patterns": [
-                    r"documents.*need",
-                    r"before.*register",
-                    r"what.*need.*register",
-                    r"registration.*requirements"
-                ],
-                "response": """Before registering, ensure you have:
-
-• Valid Student Number
-• Active Email Address
-• Programme Information
-• Year Level Information
-• Payment Proof
-• Stable Internet Connection
-
-Having these ready will make your registration process faster and easier."""
-            },
-
-            "registration_status": {
-                "patterns": [
-                    r"registration.*status",
-                    r"check.*registration",
-                    r"track.*registration",
-                    r"application.*status"
-                ],
-                "response": """To check your registration status:
-
-1. Log into the Student Portal.
-2. Go to Dashboard.
-3. View Registration Status.
-
-Possible statuses:
-• Pending Approval
-• Approved
-• Rejected
-• Payment Verification Pending"""
-            },
-
-            # =========================
-            # PAYMENTS & FINANCE
-            # =========================
-            "payment_upload_faq": {
-                "patterns": [
-                    r"upload.*payment",
-                    r"submit.*payment proof",
-                    r"payment.*receipt",
-                    r"upload.*receipt"
-                ],
-                "response": """To upload payment proof:
-
-1. Log into the portal.
-2. Open Registration.
-3. Click Upload Payment Proof.
-4. Select your receipt.
-5. Submit.
-
-Supported formats:
-• PDF
-• JPG
-• JPEG
-• PNG
-
-Ensure the receipt is clear and readable."""
-            },
-
-            "payment_methods_faq": {
-                "patterns": [
-                    r"payment.*methods",
-                    r"how.*pay",
-                    r"payment.*options"
-                ],
-                "response": """Available payment methods may include:
-
-• Bank Deposit
-• Bank Transfer
-• Mobile Money
-• Online Payment Systems
-
-Always use your Student Number as the payment reference."""
-            },
-
-            "payment_approval_faq": {
-                "patterns": [
-                    r"payment.*approval",
-                    r"payment.*verification",
-                    r"how long.*payment"
-                ],
-                "response": """Payment verification normally takes between 24 and 48 working hours.
-
-Once payment has been verified, your registration can proceed for approval."""
-            },
-
-            "payment_status_faq": {
-                "patterns": [
-                    r"payment.*status",
-                    r"check.*payment",
-                    r"verify.*payment"
-                ],
-                "response": """To check payment status:
-
-1. Log into your account.
-2. Open Dashboard.
-3. Navigate to Payment Status.
-
-Possible statuses:
-• Pending Verification
-• Verified
-• Rejected"""
-            },
-
-            # =========================
-            # TECHNICAL SUPPORT
-            # =========================
-            "reset_password_faq": {
-                "patterns": [
-                    r"reset.*password",
-                    r"forgot.*password",
-                    r"change.*password"
-                ],
-                "response": """To reset your password:
-
-1. Click Forgot Password on the login page.
-2. Enter your registered email address.
-3. Follow the instructions sent to your email.
-
-If you do not receive the email, contact IT Support."""
-            },
-
-            "login_issue_faq": {
-                "patterns": [
-                    r"can't.*login",
-                    r"cannot.*login",
-                    r"login.*problem",
-                    r"unable.*login"
-                ],
-                "response": """If you cannot log in:
-
-• Verify your Student Number.
-• Check your password carefully.
-• Reset your password if necessary.
-• Ensure your internet connection is stable.
-
-If the issue continues, contact IT Support."""
-            },
-
-            "portal_issue_faq": {
-                "patterns": [
-                    r"portal.*issue",
-                    r"portal.*down",
-                    r"cannot.*access.*portal",
-                    r"website.*problem"
-                ],
-                "response": """If the portal is not accessible:
-
-• Refresh the page.
-• Clear browser cache.
-• Try another browser.
-• Check your internet connection.
-
-If the problem persists, contact IT Support immediately."""
-            },
-
-            # =========================
-            # ACADEMIC SERVICES
-            # =========================
-            "graduation_faq": {
-                "patterns": [
-                    r"graduation.*requirements",
-                    r"graduate",
-                    r"graduation"
-                ],
-                "response": """Graduation requirements generally include:
-
-• Successful completion of all required courses.
-• Full payment of university fees.
-• Meeting programme credit requirements.
-• Clearance from relevant departments.
-
-Contact the Registrar's Office for programme-specific graduation requirements."""
-            },
-
-            "transcript_faq": {
-                "patterns": [
-                    r"transcript",
-                    r"academic record",
-                    r"results transcript"
-                ],
-                "response": """To request an academic transcript:
-
-1. Submit a transcript request through the Registrar's Office.
-2. Complete any required forms.
-3. Pay applicable processing fees.
-4. Wait for processing and collection instructions.
-
-Processing times may vary."""
-            },
-
-            "accommodation_faq": {
-                "patterns": [
-                    r"accommodation",
-                    r"hostel",
-                    r"housing",
-                    r"student residence"
-                ],
-                "response": """For accommodation information:
-
-• Contact Student Affairs.
-• Visit the accommodation office.
-• Review approved off-campus accommodation options.
-
-Availability may vary throughout the academic year."""
-            },
-
-            "scholarship_faq": {
-                "patterns": [
-                    r"scholarship",
-                    r"bursary",
-                    r"financial aid",
-                    r"sponsorship"
-                ],
-                "response": """Scholarship opportunities may be available through:
-
-• Cavendish University
-• Government bursary schemes
-• NGO sponsorship programs
-• Corporate scholarship initiatives
-
-Contact Admissions or Student Affairs for current opportunities."""
-            },
-
-            "industrial_attachment_faq": {
-                "patterns": [
-                    r"industrial attachment",
-                    r"internship",
-                    r"attachment placement",
-                    r"work placement"
-                ],
-                "response": """Industrial Attachment is a structured work-based learning programme that allows students to gain practical industry experience.
-
-Students should:
-
-• Meet programme eligibility requirements.
-• Obtain placement approval.
-• Submit required reports.
-• Complete assessment requirements.
-
-Contact your department coordinator for attachment guidelines."""
-            },
-
-            # =========================
-            # CONTACTS
-            # =========================
-            "admin_contact_faq": {
-                "patterns": [
-                    r"contact.*admin",
-                    r"contact.*registrar",
-                    r"administrator",
-                    r"who.*contact"
-                ],
-                "response": """For registration assistance:
-
-Registrar's Office
-Email: registrar@cavendish.ac.zm
-
-IT Support
-Email: itsupport@cavendish.ac.zm
-
-Finance Office
-Email: finance@cavendish.ac.zm
-
-General Enquiries
-Email: info@cavendish.ac.zm
-
-Location:
-Plot 15267 Chindo Road, Lusaka, Zambia"""
-            },
-
-            # =========================
-            # AUTHENTICATION & ACCESS
-            # =========================
-            "password": {
-                "patterns": [
-                    r"forgot.*password", r"reset.*password", r"can't.*login",
-                    r"password.*reset", r"lost.*password", r"change.*password"
-                ],
-                "response": """To reset your password, click the 'Forgot Password?' link on the login page. You'll receive an email with instructions to create a new password. If you don't receive the email, check your spam folder or contact IT support at itsupport@cavendish.edu.zm."""
-            },
-            
-            "login": {
-                "patterns": [
-                    r"can't.*log in", r"login.*problem", r"sign in.*issue",
-                    r"account.*locked", r"invalid.*credentials"
-                ],
-                "response": """If you're having trouble logging in, ensure you're using your correct student number (e.g., CUN-2022-001) and password. If the problem persists, use the 'Forgot Password' feature or contact IT support at itsupport@cavendish.edu.zm."""
-            },
-
-            # =========================
-            # REGISTRATION PROCESS
-            # =========================
-            "registration": {
-                "patterns": [
-                    r"how.*register", r"registration.*process", r"enroll.*course",
-                    r"sign up.*portal", r"create.*account"
-                ],
-                "response": """To register as a new student:
-1. Visit the registration portal
-2. Click 'Student Registration'
-3. Fill in your personal details
-4. Provide your academic information
-5. Create your account credentials
-6. Verify your email address
-7. Select your programme and semester
-8. Upload payment proof
-9. Submit registration
-10. Wait for approval
-11. Download Registration Slip
-
-You'll need your official student number and personal details ready."""
-            },
-
-            "approval": {
-                "patterns": [
-                    r"how long.*approval", r"when.*approved",
-                    r"registration.*approved", r"approval.*take",
-                    r"waiting.*approval", r"how long.*verified"
-                ],
-                "response": """Registration applications are normally reviewed within 24 to 72 working hours after payment proof has been uploaded successfully.
-
-Approval times may vary depending on:
-• Payment verification status
-• Registration volume
-• Public holidays and weekends
-
-You will receive an email notification once your registration has been approved. If your application remains pending for more than 72 hours, contact the Registrar's Office."""
-            },
-
-            "registration_slip": {
-                "patterns": [
-                    r"download.*registration slip", r"get.*registration slip",
-                    r"print.*registration slip", r"reg slip", r"proof.*registration"
-                ],
-                "response": """Once your registration has been approved:
-
-1. Log in to the Student Registration Portal
-2. Open your Dashboard
-3. Select the approved semester
-4. Click 'Download Registration Slip'
-
-The Registration Slip serves as proof of your semester registration and can be printed for official use. You can also access it anytime from your student dashboard."""
-            },
-
-            "requirements": {
-                "patterns": [
-                    r"before.*register", r"requirements.*register",
-                    r"need.*before.*registration", r"what.*need.*register",
-                    r"what do i need"
-                ],
-                "response": """Before starting registration, ensure you have:
-• A valid Student Number
-• An active email address
-• Your chosen academic programme
-• Payment proof (if applicable)
-• Stable internet connection
-• National ID/Passport
-• Academic certificates & transcripts
-
-You should also know:
-• Your academic year level
-• Current semester
-• Courses you intend to register for"""
-            },
-
-            "status": {
-                "patterns": [
-                    r"check.*status", r"registration.*status",
-                    r"track.*application", r"application.*status",
-                    r"status of my registration"
-                ],
-                "response": """To check your registration status:
-
-1. Log into the portal
-2. Go to your Dashboard
-3. View the Registration Status section
-
-Possible statuses:
-• Pending Approval - Your application is being reviewed
-• Approved - Your registration has been confirmed
-• Rejected - Your application needs corrections
-• Payment Verification Pending - Waiting for payment confirmation
-
-If your application remains pending for more than 72 hours, contact the Registrar's Office."""
-            },
-
-            "payment_upload": {
-                "patterns": [
-                    r"upload.*payment", r"submit.*payment",
-                    r"payment.*proof", r"payment.*receipt",
-                    r"bank.*receipt", r"upload.*receipt"
-                ],
-                "response": """To upload payment proof:
-
-1. Log into the portal
-2. Navigate to Registration
-3. Click Upload Payment Proof
-4. Select your receipt image or PDF
-5. Submit for verification
-
-Supported formats:
-• PDF
-• JPG
-• JPEG
-• PNG
-
-Ensure the receipt is clear and readable. Payment approvals typically take 24-48 hours."""
-            },
-
-            "course_selection": {
-                "patterns": [
-                    r"select.*courses", r"choose.*courses",
-                    r"register.*courses", r"course.*selection",
-                    r"add.*course", r"enroll.*courses"
-                ],
-                "response": """Course selection is completed during registration.
-
-Steps:
-1. Choose your programme
-2. Select year level
-3. Select semester
-4. Choose available courses from the list
-5. Submit registration
-
-Only approved courses for your programme and semester will be displayed. Mandatory courses are shown with credit hours."""
-            },
-
-            "registrar": {
-                "patterns": [
-                    r"contact.*registrar", r"registrar.*office",
-                    r"speak.*admin", r"contact.*admin",
-                    r"administrator", r"talk to someone"
-                ],
-                "response": """For registration assistance, contact:
-
-📧 Registrar's Office: registrar@cavendish.ac.zm
-📧 Admissions: admissions@cavendish.ac.zm
-📧 Finance: finance@cavendish.ac.zm
-📧 IT Support: itsupport@cavendish.ac.zm
-📧 Student Affairs: studentaffairs@cavendish.ac.zm
-
-📍 Physical Address: Plot 15267 Chindo Road, Lusaka, Zambia
-
-Office Hours: Monday - Friday, 08:00 AM to 05:00 PM"""
-            },
-
-            "rejected": {
-                "patterns": [
-                    r"registration.*rejected", r"application.*rejected",
-                    r"why.*rejected", r"rejection", r"was rejected"
-                ],
-                "response": """A registration application may be rejected because of:
-• Missing payment proof
-• Invalid or unclear payment proof
-• Incorrect programme selection
-• Missing required information
-• Administrative issues
-• Outstanding fees
-
-If your application is rejected, review the feedback provided, correct the issues, and submit a corrected application. Contact the Registrar's Office if you need clarification."""
-            },
-
-            "new_student": {
-                "patterns": [
-                    r"new.*student", r"first.*time.*register",
-                    r"freshman", r"first.*registration", r"new.*registration"
-                ],
-                "response": """Welcome to Cavendish University! 🎓
-
-For first-time registration:
-
-1. Create your student portal account
-2. Verify your email address
-3. Log into the portal
-4. Select programme and semester
-5. View available courses
-6. Upload payment proof
-7. Submit registration
-8. Wait for approval (24-72 hours)
-9. Download your Registration Slip
-
-The process normally takes a few minutes to complete, while approval may take up to 72 working hours. You'll receive email notifications at each step."""
-            },
-
-            "student_number": {
-                "patterns": [
-                    r"forgot.*student number", r"lost.*student number",
-                    r"don't know.*student number", r"find.*student number"
-                ],
-                "response": """If you have forgotten your Student Number:
-• Check previous admission documents
-• Check university admission emails
-• Contact Admissions or Registry
-• Look at your admission letter
-
-You will need your Student Number to access the registration portal. Contact admissions@cavendish.ac.zm for assistance."""
-            },
-
-            "portal_link": {
-                "patterns": [
-                    r"portal.*link", r"registration.*portal",
-                    r"portal.*website", r"where.*portal",
-                    r"portal.*url", r"access.*portal"
-                ],
-                "response": """You can access the Student Registration Portal through the Cavendish University website under 'Student Portal' or 'Registration'.
-
-If you are unable to access the portal, check your internet connection or contact IT Support for assistance at itsupport@cavendish.edu.zm."""
-            },
-
-            "admissions": {
-                "patterns": [
-                    r"admission", r"apply", r"application",
-                    r"entry requirements", r"how.*apply", r"joining"
-                ],
-                "response": """To apply to Cavendish University Zambia:
-
-1. Complete the online application form
-2. Submit certified academic documents
-3. Submit identification documents
-4. Pay the application fee
-5. Await admission decision
-
-Admissions Office:
-📧 admissions@cavendish.ac.zm
-📞 +260 211 387700
-
-Visit our website for specific programme requirements."""
-            },
-
-            "student_portal": {
-                "patterns": [
-                    r"student portal", r"portal login",
-                    r"dashboard", r"my account", r"portal features"
-                ],
-                "response": """The Student Portal allows you to:
-• Register courses
-• View results and transcripts
-• Download registration slips
-• Track payment history
-• Update profile information
-• Access academic calendar
-• View timetable
-
-Log in using your Student Number and password."""
-            },
-
-            "payment_approval_status": {
-                "patterns": [
-                    r"payment.*approved", r"approval.*payment",
-                    r"verify.*payment", r"payment.*verified"
-                ],
-                "response": """Payment approvals are usually completed within 24–48 hours after submission.
-
-If your payment remains pending after 48 hours, contact finance@cavendish.ac.zm with:
-• Student Number
-• Payment Receipt
-• Date of Payment
-• Bank Reference Number
-
-Our finance team will assist you promptly."""
-            },
-
-            "graduation_info": {
-                "patterns": [
-                    r"graduation", r"graduate",
-                    r"degree collection", r"certificate collection"
-                ],
-                "response": """Graduation information is published by the Registry Office.
-
-For graduation inquiries:
-📧 registry@cavendish.ac.zm
-
-Students must ensure:
-• All fees cleared
-• Results finalized
-• Graduation application submitted
-• Clearance obtained from all departments"""
-            },
-
-            "transcript_request": {
-                "patterns": [
-                    r"transcript", r"academic transcript",
-                    r"official transcript", r"results"
-                ],
-                "response": """Official transcripts may be requested through the Registry Office.
-
-Requirements:
-• Student Number
-• Clearance of outstanding balances
-• Transcript processing fee
-• Written request letter
-
-Processing takes 5-10 working days. Contact registry@cavendish.ac.zm for the transcript application form."""
-            },
-
-            "deferral_request": {
-                "patterns": [
-                    r"defer", r"deferment",
-                    r"postpone semester", r"pause studies"
-                ],
-                "response": """Students wishing to defer studies should submit a formal request to the Registry Office.
-
-Include:
-• Student Number
-• Reason for deferral
-• Supporting documentation
-• Expected return semester
-
-Deferral requests should be submitted before the semester begins. Contact registry@cavendish.ac.zm for the deferral form."""
-            },
-
-            "exams_info": {
-                "patterns": [
-                    r"exam", r"examination",
-                    r"supplementary", r"rewrite", r"exam timetable"
-                ],
-                "response": """Examination information includes:
-• Exam timetables
-• Supplementary exams
-• Exam venues
-• Special arrangements
-• Exam regulations
-
-Check your student portal regularly for updates. Contact your faculty for specific exam-related questions."""
-            },
-
-            "accommodation_info": {
-                "patterns": [
-                    r"hostel", r"accommodation",
-                    r"residence", r"housing", r"room"
-                ],
-                "response": """For accommodation inquiries:
-
-📧 studentaffairs@cavendish.ac.zm
-
-Student Affairs can assist with:
-• Hostel information and availability
-• Private accommodation referrals
-• Housing guidance
-• Lease agreements
-
-Accommodation applications open before each semester."""
-            },
-
-            "library_info": {
-                "patterns": [
-                    r"library", r"books",
-                    r"research materials", r"e-library", r"borrow"
-                ],
-                "response": """The University Library provides:
-• Physical books and textbooks
-• E-books and digital resources
-• Journals and periodicals
-• Research databases
-• Study spaces
-• Computer access
-
-Contact the Library Desk for assistance with borrowing and research."""
-            },
-
-            "scholarship_info": {
-                "patterns": [
-                    r"scholarship", r"bursary",
-                    r"financial aid", r"sponsorship"
-                ],
-                "response": """Scholarships and financial assistance opportunities may be available.
-
-Contact:
-📧 admissions@cavendish.ac.zm
-
-for current scholarship opportunities, eligibility requirements, and application deadlines. Scholarships are limited and awarded based on merit or need."""
-            },
-
-            "attachment_info": {
-                "patterns": [
-                    r"industrial attachment", r"internship",
-                    r"attachment letter", r"placement", r"work experience"
-                ],
-                "response": """Industrial attachment support is coordinated by your faculty.
-
-Students may request:
-• Introduction letters
-• Assessment forms
-• Placement guidance
-• Logbook templates
-
-Contact your department coordinator at least one month before the attachment period."""
-            },
-
-            "clearance_info": {
-                "patterns": [
-                    r"clearance", r"graduation clearance",
-                    r"student clearance", r"final clearance"
-                ],
-                "response": """Student clearance requires approval from:
-• Library - No outstanding books/fines
-• Finance - No outstanding fees
-• Academic - Results finalized
-• Registry - Graduation application submitted
-
-Contact Registry for final clearance processing at least two weeks before graduation."""
-            },
-
-            "payment_methods_info": {
-                "patterns": [
-                    r"payment methods", r"ways to pay",
-                    r"how to pay", r"fee payment options"
-                ],
-                "response": """Payment methods available:
-• Bank Transfer (Use student number as reference)
-• Online Payment Portal
-• Mobile Money (MTN/Airtel)
-• Cash at Finance Office
-• Credit/Debit Card
-
-Fee structures vary by programme. Log into your student portal to view your specific fee breakdown and payment deadlines."""
-            },
-
-            "semester_dates_info": {
-                "patterns": [
-                    r"semester dates", r"academic calendar",
-                    r"when does semester start", r"school calendar"
-                ],
-                "response": """Semester dates are published in the Academic Calendar available on the university website.
-
-Typical schedule:
-• Semester 1: January - May
-• Semester 2: August - December
-• Summer Semester: June - July
-
-Exact dates vary each year. Check the official Academic Calendar on the Cavendish University website."""
-            }
-        }
-
-    def _match_pattern(self, message, patterns):
-        """Check if message matches any of the patterns"""
-        for pattern in patterns:
-            if re.search(pattern, message, re.IGNORECASE):
-                return True
-        return False
-
-    def _extract_context(self, message):
+        # Fuzzy retrieval for questions no pattern matches (built on first use)
+        self.index = None
+        self._index_lock = threading.Lock()
+        self._indexed_kb = None
+        self._last_message_id = 0
+        self._last_sync = 0.0
+
+    @property
+    def kb_source(self):
+        """Compiled knowledge base from CHATBOT_KB_PATH, hot-reloaded when the file changes"""
+        if self._kb_source is None:
+            self._kb_source = KnowledgeBaseSource(
+                current_app.config.get('CHATBOT_KB_PATH') or DEFAULT_KB_PATH,
+                current_app.config.get('CHATBOT_KB_CHECK_SECONDS', 5)
+            )
+        return self._kb_source
+
+    @property
+    def knowledge_base(self):
+        return self.kb_source.get().categories
+
+    def _extract_context(self, message, kb=None):
         """Extract context and keywords from message"""
         message_lower = message.lower()
         
@@ -869,31 +74,126 @@ Exact dates vary each year. Check the official Academic Calendar on the Cavendis
         if any(grat in message_lower for grat in self.gratitude):
             return "gratitude"
         
-        # Check knowledge base categories
-        for category, data in self.knowledge_base.items():
-            if self._match_pattern(message_lower, data["patterns"]):
-                return category
-        
-        return "unknown"
-
-    def generate_response(self, message):
-        """
-        Generate intelligent response based on message content
-        """
+        # Check knowledge base categories (first match in file order wins)
+        return (kb or self.kb_source.get()).match(message_lower) or "unknown"
+
+    # ---------------- Retrieval ----------------
+    def _index_documents(self, kb):
+        """Knowledge-base patterns and responses, keyed by category"""
+        for category, data in kb.categories.items():
+            for pattern in data["patterns"]:
+                yield pattern_text(pattern), (category, None)
+            yield data["response"], (category, None)
+
+    def _answered_messages(self):
+        """Previously answered questions not yet in the index"""
+        return ChatbotMessage.query.filter(
+            ChatbotMessage.id > self._last_message_id,
+            ChatbotMessage.is_known_response == True,
+            ChatbotMessage.category.notin_(UNINDEXED_CATEGORIES)
+        ).order_by(ChatbotMessage.id).with_entities(
+            ChatbotMessage.id, ChatbotMessage.question, ChatbotMessage.category, ChatbotMessage.answer
+        ).all()
+
+    def _sync_index(self):
+        """Build the index once, then pull in answers stored by any worker since the last sync"""
+        sync_every = current_app.config.get('CHATBOT_INDEX_SYNC_SECONDS', 30)
+        kb = self.kb_source.get()
+        if kb is self._indexed_kb and time.monotonic() - self._last_sync < sync_every:
+            return
+        with self._index_lock:
+            if kb is self._indexed_kb and time.monotonic() - self._last_sync < sync_every:
+                return
+            if kb is not self._indexed_kb:
+                # New knowledge base: rebuild from scratch
+                self.index = None
+                self._last_message_id = 0
+            try:
+                rows = self._answered_messages()
+            except SQLAlchemyError as e:
+                logger.error(f"Could not load answered questions for the index: {str(e)}")
+                rows = []
+            last_id = rows[-1].id if rows else self._last_message_id
+            # Answers of categories since removed from the knowledge base are stale
+            rows = [row for row in rows if row.category in kb.categories]
+
+            if self.index is None:
+                index = TfidfIndex()
+                index.build(list(self._index_documents(kb)) +
+                            [(row.question, (row.category, row.answer)) for row in rows])
+                self.index = index
+                self._indexed_kb = kb
+            else:
+                for row in rows:
+                    self.index.add(row.question, (row.category, row.answer))
+            self._last_message_id = last_id
+            self._last_sync = time.monotonic()
+
+    def learn(self, message_id, question, category, answer):
+        """Index a newly answered question right away (this worker)"""
+        if self.index is None or category not in self._indexed_kb.categories:
+            return
+        with self._index_lock:
+            if message_id > self._last_message_id:
+                self.index.add(question, (category, answer))
+                self._last_message_id = message_id
+
+    def retrieve(self, message, kb=None):
+        """(category, response) of the most similar known question, or None below the threshold"""
+        kb = kb or self.kb_source.get()
+        self._sync_index()
+        score, payload = self.index.search(message)
+        if payload is None or score < current_app.config.get('CHATBOT_RETRIEVAL_THRESHOLD', 0.35):
+            return None
+        category, answer = payload
+        logger.info(f"🔎 Retrieved '{category}' with similarity {score:.2f}")
+        if category in kb.categories:
+            return category, kb.categories[category]["response"]
+        return category, answer
+
+    def answer(self, message):
+        """(category, response) for message; category is "unknown" for the fallback"""
         message_lower = message.lower().strip()
-        context = self._extract_context(message_lower)
+        # One knowledge-base version for the whole answer, even if it is swapped meanwhile
+        kb = self.kb_source.get()
+        context = self._extract_context(message_lower, kb)
 
         # Handle special cases
         if context == "greeting":
-            return self._get_greeting_response()
+            return context, self._get_greeting_response()
         elif context == "farewell":
-            return self._get_farewell_response()
+            return context, self._get_farewell_response()
         elif context == "gratitude":
-            return self._get_gratitude_response()
+            return context, self._get_gratitude_response()
         elif context != "unknown":
-            return self.knowledge_base[context]["response"]
-        else:
-            return self._get_fallback_response(message)
+            return context, kb.categories[context]["response"]
+
+        retrieved = self.retrieve(message_lower, kb)
+        if retrieved:
+            return retrieved
+        return "unknown", self._get_fallback_response(message)
+
+    def stored_answer(self, message, stored):
+        """
+        (category, response) for a repeated question, re-resolved against the
+        current knowledge base, or None if it has to be answered afresh.
+        The stored row only says which category answered last time; the
+        response text always comes from the knowledge base as it is now.
+        """
+        kb = self.kb_source.get()
+        context = self._extract_context(message.lower().strip(), kb)
+        if context in kb.categories:
+            return context, kb.categories[context]["response"]
+        if context == "unknown" and stored.category in kb.categories:
+            # Answered by retrieval last time and the category still exists
+            return stored.category, kb.categories[stored.category]["response"]
+        return None
+
+    def generate_response(self, message):
+        """
+        Generate intelligent response based on message content
+        """
+        return self.answer(message)[1]
 
     def _get_greeting_response(self):
         """Generate friendly greeting response"""
@@ -969,22 +269,19 @@ Your question has been recorded and will help improve our responses. Please try
 # Initialize chatbot
 chatbot = CavendishChatbot()
 
-# --- Retry wrapper for safe API/local response handling ---
-@retry(
-    wait=wait_random_exponential(min=1, max=10),
-    stop=stop_after_attempt(3),
-    retry=retry_if_exception_type((RateLimitError, APIError, APIStatusError, Timeout))
-)
+# --- Safe wrapper for local response handling ---
 def safe_get_response(prompt: str):
     """
-    Enhanced response generator with intelligent matching
+    Enhanced response generator with intelligent matching.
+    Returns (response, category).
     """
     try:
-        return chatbot.generate_response(prompt)
+        category, response = chatbot.answer(prompt)
+        return response, category
     except Exception as e:
         logger.error(f"Error while generating response: {str(e)}")
         # Fallback to simple response
-        return "I apologize, but I'm experiencing technical difficulties. Please try again in a moment or contact support directly at itsupport@cavendish.edu.zm."
+        return "I apologize, but I'm experiencing technical difficulties. Please try again in a moment or contact support directly at itsupport@cavendish.edu.zm.", "unknown"
 
 
 # ----------------------------
@@ -1017,32 +314,43 @@ def ask_bot():
         known = ChatbotMessage.query.filter(
             db.func.lower(ChatbotMessage.question) == user_message.lower()
         ).first()
-        
-        if known:
-            logger.info("✅ Found stored response in DB.")
-            return jsonify({
-                "response": known.answer, 
-                "known": True,
-                "category": "stored"
-            })
 
-        # Step 2 — Generate intelligent response
-        response = safe_get_response(user_message)
-        
-        # Determine if this was a known or unknown response
-        context = chatbot._extract_context(user_message.lower())
+        if known:
+            resolved = chatbot.stored_answer(user_message, known)
+            if resolved:
+                category, response = resolved
+                if (known.category, known.answer) != (category, response):
+                    # The knowledge base changed since this was stored
+                    known.category, known.answer, known.is_known_response = category, response, True
+                    db.session.commit()
+                logger.info("✅ Found stored response in DB.")
+                return jsonify({
+                    "response": response,
+                    "known": True,
+                    "category": "stored"
+                })
+
+        # Step 2 — Generate intelligent response (patterns, then fuzzy retrieval)
+        response, context = safe_get_response(user_message)
         is_known_response = context not in ["unknown"]
 
         # Step 3 — Save question and response to DB for learning
-        new_entry = ChatbotMessage(
-            question=user_message.lower(), 
-            answer=response,
-            category=context,
-            is_known_response=is_known_response,
-            created_at=datetime.utcnow()
-        )
-        db.session.add(new_entry)
+        if known:
+            # Asked before, but its stored answer no longer holds
+            entry = known
+            entry.answer, entry.category, entry.is_known_response = response, context, is_known_response
+        else:
+            entry = ChatbotMessage(
+                question=user_message.lower(),
+                answer=response,
+                category=context,
+                is_known_response=is_known_response,
+                created_at=datetime.utcnow()
+            )
+            db.session.add(entry)
         db.session.commit()
+        if is_known_response:
+            chatbot.learn(entry.id, entry.question, context, response)
 
         logger.info(f"💾 Saved chatbot message - Category: {context}, Known: {is_known_response}")
 
@@ -9,6 +9,7 @@ from datetime import datetime, timedelta
 
 # Import email helper function
 from app.utils.email import send_password_reset_email
+from app.utils.sessions import revoke_sessions
 
 general = Blueprint('general', __name__)
 
@@ -83,6 +84,9 @@ def reset_password(token):
 
         db.session.commit()
 
+        # Sign the account out everywhere; the new password is needed from here on
+        revoke_sessions(user_id=user.id, student_id=user.student_id)
+
         flash("Password updated successfully! You can now log in.", "success")
 
         if user.role == "admin":
@@ -0,0 +1,276 @@
+# app/utils/admission.py
+"""
+Virtual waiting room for registration opening day (ADMISSION_ENABLED).
+
+Logged-in students reaching an ADMISSION_ENDPOINTS route need an active
+registration session. At most ADMISSION_MAX_ACTIVE students hold one at a
+time, and new ones are admitted at ADMISSION_RATE_PER_MINUTE (with bursts
+of up to ADMISSION_BURST). Everyone else gets a queue ticket:
+
+- page loads are redirected to /student/waiting-room, which polls
+  /student/waiting-room/status for position and ETA and returns to the
+  page once admitted
+- AJAX/POST requests get a 503 with {queued, position, eta_seconds} and
+  Retry-After
+
+Tickets are first come, first served. An active session ends after
+ADMISSION_SESSION_SECONDS without a request to a gated route (or at
+logout); a waiting ticket is dropped when its page stops polling for
+ADMISSION_TICKET_SECONDS, so abandoned tabs do not hold up the queue.
+
+Set the rate to what the registration-week benchmark sustains, so the
+server keeps working at capacity instead of collapsing under the burst.
+Queue state lives in memory (per worker) or in a SQLite file shared by
+the workers on one host (ADMISSION_BACKEND).
+"""
+import math
+import time
+import threading
+from collections import namedtuple
+from urllib.parse import urlsplit
+
+from flask import request, session, current_app, jsonify, redirect, url_for, render_template
+
+from app.utils.sqlite_store import SQLiteStore
+
+Admission = namedtuple('Admission', 'admitted position eta_seconds active waiting')
+
+
+# ---------------- Queue stores ----------------
+class _Policy:
+    def __init__(self, config):
+        self.max_active = config.get('ADMISSION_MAX_ACTIVE', 200)
+        self.rate = config.get('ADMISSION_RATE_PER_MINUTE', 60) / 60.0
+        self.burst = max(1, config.get('ADMISSION_BURST', 10))
+        self.session_seconds = config.get('ADMISSION_SESSION_SECONDS', 15 * 60)
+        self.ticket_seconds = config.get('ADMISSION_TICKET_SECONDS', 60)
+        # Admitted students re-write their "seen" time at most this often
+        self.touch_interval = min(30, self.session_seconds / 4)
+
+    def refill(self, tokens, updated, now):
+        return min(self.burst, tokens + (now - updated) * self.rate)
+
+    def eta(self, position):
+        return math.ceil(position / self.rate) if self.rate > 0 else None
+
+
+class MemoryAdmissionStore:
+    def __init__(self, policy):
+        self.policy = policy
+        self._lock = threading.Lock()
+        self._tickets = {}  # owner -> [seq, seen, admitted_at or None]
+        self._seq = 0
+        self._tokens = float(policy.burst)
+        self._updated = time.time()
+
+    def check(self, owner):
+        policy, now = self.policy, time.time()
+        with self._lock:
+            ticket = self._tickets.get(owner)
+            if ticket and ticket[2] and now - ticket[1] < policy.session_seconds:
+                ticket[1] = now
+                return Admission(True, 0, 0, None, None)
+
+            self._tickets = {
+                o: t for o, t in self._tickets.items()
+                if now - t[1] < (policy.session_seconds if t[2] else policy.ticket_seconds)
+            }
+            if owner not in self._tickets:
+                self._seq += 1
+                self._tickets[owner] = [self._seq, now, None]
+            self._tickets[owner][1] = now
+
+            self._tokens = policy.refill(self._tokens, self._updated, now)
+            self._updated = now
+            active = sum(1 for t in self._tickets.values() if t[2])
+            waiting = sorted((t for t in self._tickets.values() if not t[2]), key=lambda t: t[0])
+            for ticket in waiting[:max(0, min(int(self._tokens), policy.max_active - active))]:
+                ticket[2] = now
+                self._tokens -= 1
+                active += 1
+
+            mine = self._tickets[owner]
+            waiting = [t for t in waiting if not t[2]]
+            if mine[2]:
+                return Admission(True, 0, 0, active, len(waiting))
+            position = sum(1 for t in waiting if t[0] <= mine[0])
+            return Admission(False, position, policy.eta(position), active, len(waiting))
+
+    def release(self, owner):
+        with self._lock:
+            self._tickets.pop(owner, None)
+
+
+class SQLiteAdmissionStore(SQLiteStore):
+    """Queue shared by every worker process on this host"""
+
+    schema = """
+        CREATE TABLE IF NOT EXISTS tickets (
+            seq INTEGER PRIMARY KEY,
+            owner TEXT NOT NULL UNIQUE,
+            seen REAL NOT NULL,
+            admitted REAL
+        );
+        CREATE INDEX IF NOT EXISTS ix_tickets_admitted ON tickets (admitted, seq);
+        CREATE TABLE IF NOT EXISTS admission_bucket (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            tokens REAL NOT NULL,
+            updated REAL NOT NULL
+        );
+    """
+
+    def __init__(self, policy, path):
+        self.policy = policy
+        super().__init__(path)
+
+    def check(self, owner):
+        policy, now = self.policy, time.time()
+        # Fast path: an active student seen recently needs no write
+        row = self.conn().execute('SELECT seen, admitted FROM tickets WHERE owner = ?', (owner,)).fetchone()
+        if row and row[1] and now - row[0] < policy.touch_interval:
+            return Admission(True, 0, 0, None, None)
+
+        with self.transaction() as conn:
+            conn.execute(
+                'DELETE FROM tickets WHERE (admitted IS NOT NULL AND seen < ?) OR (admitted IS NULL AND seen < ?)',
+                (now - policy.session_seconds, now - policy.ticket_seconds)
+            )
+            conn.execute(
+                'INSERT INTO tickets (owner, seen) VALUES (?, ?) ON CONFLICT (owner) DO UPDATE SET seen = excluded.seen',
+                (owner, now)
+            )
+
+            bucket = conn.execute('SELECT tokens, updated FROM admission_bucket WHERE id = 1').fetchone()
+            tokens = policy.refill(*bucket, now) if bucket else float(policy.burst)
+            active = conn.execute('SELECT COUNT(*) FROM tickets WHERE admitted IS NOT NULL').fetchone()[0]
+            admit = max(0, min(int(tokens), policy.max_active - active))
+            if admit:
+                admitted = conn.execute(
+                    'UPDATE tickets SET admitted = ? WHERE seq IN '
+                    '(SELECT seq FROM tickets WHERE admitted IS NULL ORDER BY seq LIMIT ?)',
+                    (now, admit)
+                ).rowcount
+                tokens -= admitted
+                active += admitted
+            conn.execute('INSERT OR REPLACE INTO admission_bucket (id, tokens, updated) VALUES (1, ?, ?)',
+                         (tokens, now))
+
+            seq, admitted_at = conn.execute('SELECT seq, admitted FROM tickets WHERE owner = ?', (owner,)).fetchone()
+            waiting = conn.execute('SELECT COUNT(*) FROM tickets WHERE admitted IS NULL').fetchone()[0]
+            if admitted_at:
+                return Admission(True, 0, 0, active, waiting)
+            position = conn.execute(
+                'SELECT COUNT(*) FROM tickets WHERE admitted IS NULL AND seq <= ?', (seq,)
+            ).fetchone()[0]
+        return Admission(False, position, policy.eta(position), active, waiting)
+
+    def release(self, owner):
+        self.conn().execute('DELETE FROM tickets WHERE owner = ?', (owner,))
+
+
+def create_admission_store(app):
+    policy = _Policy(app.config)
+    if (app.config.get('ADMISSION_BACKEND') or 'memory').lower() == 'sqlite':
+        return SQLiteAdmissionStore(policy, app.config['ADMISSION_SQLITE_PATH'])
+    return MemoryAdmissionStore(policy)
+
+
+# ---------------- Views ----------------
+def _owner():
+    student_id = session.get('student_id')
+    return f"student:{student_id}" if student_id else None
+
+
+def _safe_next(target):
+    """
+    target if it is a plain path on this site, else the dashboard.
+    Browsers read "/\\evil.com" as "//evil.com" and drop tabs/newlines
+    inside URLs, so backslashes and control characters are refused too.
+    """
+    if (
+        target
+        and target.startswith('/')
+        and '\\' not in target
+        and not any(ord(ch) < 0x20 or ord(ch) == 0x7f for ch in target)
+    ):
+        parts = urlsplit(target)
+        if not parts.scheme and not parts.netloc:
+            return target
+    return url_for('student.student_dashboard')
+
+
+def _status_payload(admission):
+    return {
+        'admitted': admission.admitted,
+        'position': admission.position,
+        'eta_seconds': admission.eta_seconds,
+        'poll_seconds': current_app.config.get('ADMISSION_POLL_SECONDS', 5),
+    }
+
+
+def waiting_room_view():
+    owner = _owner()
+    if not owner:
+        return redirect(url_for('student.student_login'))
+    next_url = _safe_next(request.args.get('next'))
+    admission = current_app.extensions['admission_store'].check(owner)
+    if admission.admitted:
+        return redirect(next_url)
+    return render_template('student/waiting_room.html', status=_status_payload(admission), next_url=next_url)
+
+
+def waiting_room_status_view():
+    owner = _owner()
+    if not owner:
+        return jsonify({'success': False, 'error': 'Please log in.'}), 401
+    admission = current_app.extensions['admission_store'].check(owner)
+    response = jsonify(_status_payload(admission))
+    response.headers['Cache-Control'] = 'no-store'
+    return response
+
+
+# ---------------- Wiring ----------------
+def init_admission_control(app):
+    """Install the waiting room when ADMISSION_ENABLED"""
+    if not app.config.get('ADMISSION_ENABLED'):
+        return
+
+    store = create_admission_store(app)
+    app.extensions['admission_store'] = store
+    endpoints = set(app.config.get('ADMISSION_ENDPOINTS', ()))
+
+    @app.before_request
+    def admission_control():
+        if request.endpoint == 'student.student_logout':
+            owner = _owner()
+            if owner:
+                store.release(owner)
+            return None
+        if request.endpoint not in endpoints:
+            return None
+        owner = _owner()
+        if not owner:
+            # Not logged in: the route's own login check answers
+            return None
+
+        admission = store.check(owner)
+        if admission.admitted:
+            return None
+
+        if request.method == 'GET' and request.accept_mimetypes.accept_html and not request.is_json \
+                and request.headers.get('X-Requested-With') != 'XMLHttpRequest':
+            return redirect(url_for('waiting_room', next=request.full_path.rstrip('?')))
+
+        response = jsonify({
+            'success': False,
+            'queued': True,
+            'error': 'Registration is busy. You are in the queue.',
+            **_status_payload(admission),
+        })
+        response.status_code = 503
+        poll = app.config.get('ADMISSION_POLL_SECONDS', 5)
+        response.headers['Retry-After'] = str(max(1, min(poll, admission.eta_seconds or poll)))
+        return response
+
+    app.add_url_rule('/student/waiting-room', 'waiting_room', waiting_room_view)
+    app.add_url_rule('/student/waiting-room/status', 'waiting_room_status', waiting_room_status_view)
@@ -0,0 +1,297 @@
+# app/utils/assets.py
+"""
+Response compression and static asset caching.
+
+- Dynamic responses (HTML, JSON, text) above COMPRESS_MIN_SIZE are gzip-
+  or brotli-encoded, whichever the client accepts (brotli only when the
+  `brotli` package is installed).
+- url_for('static', filename=...) appends a content hash (`?v=<hash>`);
+  versioned requests are served with a one-year immutable Cache-Control,
+  unversioned ones keep the short default.
+- url_for('static', filename='images/logo3.png', width=192) points at the
+  smallest built variant at least that wide (or the original).
+- `flask assets build` writes resized PNG/WebP variants of the images and
+  .gz/.br copies of text assets to STATIC_BUILD_FOLDER with a manifest.
+  The static view serves the WebP or precompressed copy when the client
+  accepts it.
+"""
+import os
+import gzip
+import json
+import hashlib
+import mimetypes
+import threading
+
+from flask import request, send_from_directory
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_TYPES = {
+    'text/html', 'text/plain', 'text/css', 'text/csv', 'text/xml', 'text/javascript',
+    'application/json', 'application/javascript', 'application/xml', 'image/svg+xml',
+}
+TEXT_EXTENSIONS = ('.css', '.js', '.svg', '.json', '.txt', '.html', '.xml', '.map')
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg')
+MANIFEST_NAME = 'manifest.json'
+
+
+# ---------------- Dynamic response compression ----------------
+def negotiate_encoding(min_quality=0.001):
+    """'br', 'gzip' or None for the current request"""
+    accepted = request.accept_encodings
+    if brotli is not None and accepted['br'] >= min_quality:
+        return 'br'
+    if accepted['gzip'] >= min_quality:
+        return 'gzip'
+    return None
+
+
+def accepts_webp():
+    """
+    True only if Accept names image/webp itself. accept_mimetypes['image/webp']
+    is also truthy for */* and image/*, which browsers without WebP send too.
+    """
+    return any(value.lower() == 'image/webp' and quality > 0 for value, quality in request.accept_mimetypes)
+
+
+def compress(data, encoding, level=6):
+    if encoding == 'br':
+        # Quality 11 is for build time; 4-5 is the usual on-the-fly setting
+        return brotli.compress(data, quality=min(level, 5))
+    return gzip.compress(data, compresslevel=level, mtime=0)
+
+
+def _compress_response(app, response):
+    if response.mimetype not in COMPRESSIBLE_TYPES:
+        return response
+    response.vary.add('Accept-Encoding')
+
+    if (response.direct_passthrough or response.is_streamed
+            or response.status_code < 200 or response.status_code in (204, 304)
+            or 'Content-Encoding' in response.headers
+            or response.cache_control.no_transform):
+        return response
+
+    data = response.get_data()
+    if len(data) < app.config.get('COMPRESS_MIN_SIZE', 1024):
+        return response
+
+    encoding = negotiate_encoding()
+    if encoding is None:
+        return response
+
+    response.set_data(compress(data, encoding, app.config.get('COMPRESS_LEVEL', 6)))
+    response.headers['Content-Encoding'] = encoding
+    etag, weak = response.get_etag()
+    if etag:
+        response.set_etag(f"{etag}-{encoding}", weak)
+    return response
+
+
+# ---------------- Static files ----------------
+class AssetManifest:
+    """
+    Content hashes plus the variants written by `flask assets build`.
+    Files the build has not seen are hashed on first use (cached by mtime).
+    """
+
+    def __init__(self, static_folder, build_folder):
+        self.static_folder = static_folder
+        self.build_folder = build_folder
+        self._lock = threading.Lock()
+        self._hashes = {}  # filename -> (mtime, hash)
+        self.webp = {}       # filename -> webp filename
+        self.encodings = {}  # filename -> {'br': filename, 'gzip': filename}
+        self.widths = {}     # filename -> {width: variant filename}
+        self.load()
+
+    def load(self):
+        path = os.path.join(self.build_folder, MANIFEST_NAME)
+        try:
+            with open(path) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        self.webp = data.get('webp', {})
+        self.encodings = data.get('encodings', {})
+        self.widths = {name: {int(w): variant for w, variant in widths.items()}
+                       for name, widths in data.get('widths', {}).items()}
+
+    def file_hash(self, filename):
+        path = os.path.join(self.static_folder, filename)
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            return None
+        with self._lock:
+            cached = self._hashes.get(filename)
+            if cached and cached[0] == mtime:
+                return cached[1]
+        digest = _hash_file(path)
+        with self._lock:
+            self._hashes[filename] = (mtime, digest)
+        return digest
+
+    def variant_for_width(self, filename, width):
+        widths = self.widths.get(filename)
+        if not widths:
+            return filename
+        fitting = [w for w in sorted(widths) if w >= width]
+        return widths[fitting[0]] if fitting else filename
+
+
+def _hash_file(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(65536), b''):
+            digest.update(chunk)
+    return digest.hexdigest()[:12]
+
+
+def _static_url_defaults(manifest):
+    def static_url_defaults(endpoint, values):
+        if endpoint != 'static' or 'filename' not in values:
+            return
+        width = values.pop('width', None)
+        if width:
+            values['filename'] = manifest.variant_for_width(values['filename'], int(width))
+        if 'v' not in values:
+            digest = manifest.file_hash(values['filename'])
+            if digest:
+                values['v'] = digest
+    return static_url_defaults
+
+
+def _static_view(app, manifest):
+    immutable_age = app.config.get('STATIC_IMMUTABLE_MAX_AGE', 365 * 24 * 3600)
+
+    def static(filename):
+        served, encoding = filename, None
+
+        if filename in manifest.webp:
+            if accepts_webp():
+                served = manifest.webp[filename]
+        elif filename in manifest.encodings:
+            encoding = negotiate_encoding()
+            if encoding == 'br' and 'br' not in manifest.encodings[filename]:
+                encoding = 'gzip' if request.accept_encodings['gzip'] else None
+            if encoding in manifest.encodings[filename]:
+                served = manifest.encodings[filename][encoding]
+            else:
+                encoding = None
+
+        versioned = bool(request.args.get('v'))
+        response = send_from_directory(
+            app.static_folder, served,
+            max_age=immutable_age if versioned else app.get_send_file_max_age(filename),
+            mimetype=_guess_type(filename) if encoding else None,
+        )
+        if versioned:
+            response.cache_control.public = True
+            response.cache_control.immutable = True
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+        if filename in manifest.webp:
+            # Same URL, different body depending on Accept: caches must key on it
+            response.vary.add('Accept')
+        if filename in manifest.encodings:
+            response.vary.add('Accept-Encoding')
+        return response
+    return static
+
+
+def _guess_type(filename):
+    return mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+
+
+def init_assets(app):
+    """Install response compression, hashed static URLs and the negotiating static view"""
+    if app.static_folder:
+        build_folder = app.config.get('STATIC_BUILD_FOLDER') or os.path.join(app.static_folder, 'dist')
+        manifest = AssetManifest(app.static_folder, build_folder)
+        app.extensions['asset_manifest'] = manifest
+        app.url_defaults(_static_url_defaults(manifest))
+        app.view_functions['static'] = _static_view(app, manifest)
+
+    if app.config.get('COMPRESS_ENABLED', True):
+        @app.after_request
+        def compress_response(response):
+            return _compress_response(app, response)
+
+
+# ---------------- Build step ----------------
+def build_assets(static_folder, build_folder, widths=(192, 640, 1280), webp_quality=80, echo=print):
+    """
+    Write resized/WebP image variants and precompressed text assets into
+    build_folder, plus manifest.json describing them. Returns the manifest.
+    """
+    from PIL import Image
+
+    build_folder = os.path.abspath(build_folder)
+    build_rel = os.path.relpath(build_folder, static_folder).replace(os.sep, '/')
+    manifest = {'webp': {}, 'encodings': {}, 'widths': {}}
+
+    def out_path(name):
+        path = os.path.join(build_folder, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        return path
+
+    def static_name(name):
+        return f"{build_rel}/{name}"
+
+    for root, dirs, files in os.walk(static_folder):
+        if os.path.abspath(root).startswith(build_folder):
+            continue
+        for file in sorted(files):
+            source = os.path.join(root, file)
+            filename = os.path.relpath(source, static_folder).replace(os.sep, '/')
+            stem, ext = os.path.splitext(filename)
+            ext = ext.lower()
+
+            if ext in IMAGE_EXTENSIONS:
+                with Image.open(source) as image:
+                    image.load()
+                    original_size = os.path.getsize(source)
+
+                    webp_name = f"{stem}.webp"
+                    image.save(out_path(webp_name), 'WEBP', quality=webp_quality, method=6)
+                    manifest['webp'][filename] = static_name(webp_name)
+
+                    variants = {}
+                    for width in widths:
+                        if width >= image.width:
+                            continue
+                        height = round(image.height * width / image.width)
+                        resized = image.resize((width, height), Image.LANCZOS)
+                        name = f"{stem}.w{width}{ext}"
+                        resized.save(out_path(name), optimize=True)
+                        resized.save(out_path(f"{stem}.w{width}.webp"), 'WEBP', quality=webp_quality, method=6)
+                        variants[width] = static_name(name)
+                        manifest['webp'][static_name(name)] = static_name(f"{stem}.w{width}.webp")
+                    if variants:
+                        manifest['widths'][filename] = variants
+
+                webp_size = os.path.getsize(os.path.join(build_folder, webp_name))
+                echo(f"  {filename}: {original_size // 1024} KB -> webp {webp_size // 1024} KB, "
+                     f"widths {sorted(variants) or '-'}")
+
+            elif ext in TEXT_EXTENSIONS:
+                with open(source, 'rb') as f:
+                    data = f.read()
+                encodings = {}
+                with open(out_path(f"{filename}.gz"), 'wb') as f:
+                    f.write(gzip.compress(data, compresslevel=9, mtime=0))
+                encodings['gzip'] = static_name(f"{filename}.gz")
+                if brotli is not None:
+                    with open(out_path(f"{filename}.br"), 'wb') as f:
+                        f.write(brotli.compress(data, quality=11))
+                    encodings['br'] = static_name(f"{filename}.br")
+                manifest['encodings'][filename] = encodings
+                echo(f"  {filename}: precompressed ({', '.join(encodings)})")
+
+    with open(out_path(MANIFEST_NAME), 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    return manifest
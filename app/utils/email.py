@@ -5,9 +5,12 @@ from app.extensions import mail
 import logging
 from flask import url_for
 
+from app.utils.profiling import timed
+
 logger = logging.getLogger(__name__)
 
 
+@timed('email')
 def send_registration_email(student):
     """
     Send registration confirmation email to student
@@ -131,6 +134,7 @@ Cavendish University
         return False
 
 
+@timed('email')
 def send_registration_submission_email(
     student,
     program_name,
@@ -224,6 +228,7 @@ Cavendish University
         return False
 
 
+@timed('email')
 def send_payment_approval_email(student, registration_slip, payment):
     """
     Send payment approval email with registration slip link
@@ -324,6 +329,7 @@ Cavendish University
         return False
 
 
+@timed('email')
 def send_payment_rejection_email(student, payment, reason=None):
     """
     Send payment rejection email
@@ -412,6 +418,7 @@ Cavendish University
         return False
 
 
+@timed('email')
 def send_password_reset_email(user, reset_link):
     """
     Send password reset email
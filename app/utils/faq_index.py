@@ -0,0 +1,139 @@
+# app/utils/faq_index.py
+"""
+TF-IDF retrieval for chatbot questions the regex patterns miss.
+
+Every document (a knowledge-base pattern, a knowledge-base response or a
+previously answered question) is turned into word + character 3-gram
+features, weighted with sublinear TF x smoothed IDF and L2-normalised.
+Vectors are stored as an inverted index (term -> [(doc, weight)]), so a
+query's cosine similarity with all documents is a sparse dot product
+over the postings of its own terms only; no NumPy needed.
+
+Character n-grams make misspellings ("paswwrord reset", "reegister")
+land near the right answer.
+
+New documents are added in place with the current IDF table. Once the
+corpus has grown by REBUILD_GROWTH since the last full build, the IDF is
+recomputed and everything is reweighted.
+"""
+import re
+import math
+import threading
+from collections import Counter, defaultdict
+
+# Categories whose answers are picked at random or are not real FAQ answers
+UNINDEXED_CATEGORIES = {'greeting', 'farewell', 'gratitude', 'unknown', 'stored', 'error_fallback'}
+
+NGRAM = 3
+REBUILD_GROWTH = 0.2
+
+_WORD_RE = re.compile(r"[a-z][a-z0-9']*")
+_STOPWORDS = {
+    'a', 'an', 'the', 'i', 'me', 'my', 'is', 'are', 'do', 'does', 'to', 'of', 'for', 'in',
+    'on', 'and', 'or', 'can', 'how', 'what', 'where', 'when', 'it', 'be', 'you', 'your',
+}
+
+
+def features(text):
+    """Word and padded character n-gram counts for text (numbers are ignored)"""
+    words = [w for w in _WORD_RE.findall(text.lower()) if w not in _STOPWORDS]
+    counts = Counter(f"w:{w}" for w in words)
+    for word in words:
+        padded = f" {word} "
+        for i in range(len(padded) - NGRAM + 1):
+            counts[padded[i:i + NGRAM]] += 1
+    return counts
+
+
+def pattern_text(pattern):
+    r"""Readable words from a regex pattern: r"how.*register.*new student" -> "how register new student" """
+    text = re.sub(r"\\[a-zA-Z]", " ", pattern)
+    return re.sub(r"[^a-zA-Z0-9' ]+", " ", text)
+
+
+class TfidfIndex:
+    """Sparse TF-IDF index answering top-1 cosine similarity queries"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._docs = []        # [(term counts, payload)]
+        self._seen = set()     # frozen term counts already indexed
+        self._postings = {}    # term -> [(doc index, weight)]
+        self._idf = {}
+        self._built_size = 0
+
+    def __len__(self):
+        return len(self._docs)
+
+    def build(self, documents):
+        """Replace the index with documents: iterable of (text, payload)"""
+        docs, seen = [], set()
+        for text, payload in documents:
+            counts = features(text)
+            key = frozenset(counts.items())
+            # Identical questions share one vector (the first payload wins)
+            if counts and key not in seen:
+                seen.add(key)
+                docs.append((counts, payload))
+        with self._lock:
+            self._docs = docs
+            self._seen = seen
+            self._reweight()
+
+    def add(self, text, payload):
+        """Index one more document without a full rebuild"""
+        counts = features(text)
+        key = frozenset(counts.items())
+        if not counts:
+            return
+        with self._lock:
+            if key in self._seen:
+                return
+            self._seen.add(key)
+            self._docs.append((counts, payload))
+            if len(self._docs) > self._built_size * (1 + REBUILD_GROWTH):
+                self._reweight()
+            else:
+                self._post(len(self._docs) - 1, counts)
+
+    def _reweight(self):
+        doc_freq = Counter()
+        for counts, _ in self._docs:
+            doc_freq.update(counts.keys())
+        total = len(self._docs)
+        self._idf = {term: math.log((1 + total) / (1 + df)) + 1 for term, df in doc_freq.items()}
+        self._postings = defaultdict(list)
+        for doc_id, (counts, _) in enumerate(self._docs):
+            self._post(doc_id, counts)
+        self._built_size = total
+
+    def _weights(self, counts):
+        # Terms first seen after the last rebuild get the rarest IDF
+        default_idf = math.log(1 + self._built_size) + 1
+        weights = {term: (1 + math.log(tf)) * self._idf.get(term, default_idf) for term, tf in counts.items()}
+        norm = math.sqrt(sum(w * w for w in weights.values())) or 1.0
+        return {term: w / norm for term, w in weights.items()}
+
+    def _post(self, doc_id, counts):
+        for term, weight in self._weights(counts).items():
+            self._postings.setdefault(term, []).append((doc_id, weight))
+
+    def search(self, text):
+        """(cosine score, payload) of the closest document, or (0.0, None)"""
+        counts = features(text)
+        if not counts:
+            return 0.0, None
+        with self._lock:
+            # Terms no document has still count towards the query norm
+            query = self._weights(counts)
+            scores = defaultdict(float)
+            for term, q_weight in query.items():
+                for doc_id, d_weight in self._postings.get(term, ()):
+                    scores[doc_id] += q_weight * d_weight
+            if not scores:
+                return 0.0, None
+            best = max(scores, key=scores.__getitem__)
+            return scores[best], self._docs[best][1]
+
+    def search_many(self, texts):
+        return [self.search(text) for text in texts]
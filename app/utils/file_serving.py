@@ -0,0 +1,121 @@
+# app/utils/file_serving.py
+import io
+import os
+import zipfile
+import mimetypes
+from urllib.parse import quote
+
+from flask import current_app, send_from_directory, abort
+from werkzeug.security import safe_join
+
+
+def send_protected_file(folder_key, filename, as_attachment=False, download_name=None):
+    """
+    Send a file from one of the protected folders (UPLOAD_FOLDER, REGISTRATION_SLIP_FOLDER).
+
+    Call this only AFTER the route has done its auth check. Depending on
+    FILE_SERVING_MODE the bytes are either streamed by the Python worker
+    ("direct", the default) or handed off to the front proxy:
+
+    - "x-accel"    -> nginx X-Accel-Redirect to an `internal` location
+    - "x-sendfile" -> Apache/lighttpd X-Sendfile with the absolute path
+
+    In both offload modes the proxy does the transfer itself, including
+    Range / If-Range handling, so the worker is freed immediately.
+    """
+    directory = current_app.config[folder_key]
+    mode = (current_app.config.get('FILE_SERVING_MODE') or 'direct').lower()
+
+    file_path = safe_join(directory, filename)
+    if file_path is None or not os.path.isfile(file_path):
+        abort(404)
+
+    if mode == 'x-accel':
+        location = current_app.config.get('X_ACCEL_REDIRECT_LOCATIONS', {}).get(folder_key)
+        if location:
+            return _x_accel_response(location, filename, as_attachment, download_name)
+        current_app.logger.warning(
+            f"No X-Accel location configured for {folder_key}, serving directly"
+        )
+
+    elif mode == 'x-sendfile':
+        response = _offload_response(filename, as_attachment, download_name)
+        response.headers['X-Sendfile'] = os.path.abspath(file_path)
+        return response
+
+    # Fallback: stream through the worker (conditional=True keeps Range support)
+    return send_from_directory(
+        directory,
+        filename,
+        as_attachment=as_attachment,
+        download_name=download_name,
+        conditional=True
+    )
+
+
+def _x_accel_response(location, filename, as_attachment, download_name):
+    """Build an empty response that tells nginx which internal URI to serve"""
+    response = _offload_response(filename, as_attachment, download_name)
+    response.headers['X-Accel-Redirect'] = f"{location.rstrip('/')}/{quote(filename)}"
+    return response
+
+
+def _offload_response(filename, as_attachment, download_name):
+    """Empty-bodied response carrying the headers the proxy should pass on"""
+    mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+
+    # Body stays empty; the proxy sets Content-Length/Content-Range from the real file
+    response = current_app.response_class(mimetype=mimetype)
+    response.headers['Accept-Ranges'] = 'bytes'
+    response.headers['Cache-Control'] = 'private, no-cache'
+
+    disposition = 'attachment' if as_attachment else 'inline'
+    name = download_name or filename
+    response.headers['Content-Disposition'] = f"{disposition}; filename*=UTF-8''{quote(name)}"
+    return response
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only, unseekable buffer that zipfile writes into and we drain"""
+
+    def __init__(self):
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def stream_zip(files, chunk_size=64 * 1024):
+    """
+    Yield a ZIP archive of (arcname, path) pairs chunk by chunk.
+
+    Because the sink is unseekable, zipfile writes data descriptors after
+    each member, so only one chunk_size block is held in memory at a time
+    no matter how large the archive grows. PDFs are already compressed, so
+    members are STORED.
+    """
+    sink = _ChunkSink()
+    with zipfile.ZipFile(sink, 'w', compression=zipfile.ZIP_STORED) as archive:
+        for arcname, path in files:
+            with open(path, 'rb') as src, archive.open(arcname, 'w') as dst:
+                while True:
+                    block = src.read(chunk_size)
+                    if not block:
+                        break
+                    dst.write(block)
+                    data = sink.drain()
+                    if data:
+                        yield data
+            data = sink.drain()
+            if data:
+                yield data
+    yield sink.drain()
@@ -1,90 +1,84 @@
 import os
-import io
-from datetime import datetime
+import threading
 from flask import current_app
-from reportlab.lib.pagesizes import A4
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
-from reportlab.lib import colors
-from reportlab.lib.units import inch
+from sqlalchemy import select
+
+from app.extensions import db
+from app.utils.single_flight import single_flight, flight_key
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process lock around the version check
+    fcntl = None
+
+def registration_slip_pdf_filename(registration_slip):
+    """File name of the slip's PDF in REGISTRATION_SLIP_FOLDER"""
+    return f"registration_slip_{registration_slip.student.student_number}.pdf"
+
+def _committed_slip(slip_id):
+    """The slip as committed right now, read on a connection of its own"""
+    from app.models import Student, RegistrationSlip
+
+    with db.engine.connect() as conn:
+        return conn.execute(
+            select(RegistrationSlip.version_id, RegistrationSlip.program_name, RegistrationSlip.faculty_name,
+                   RegistrationSlip.academic_year, RegistrationSlip.semester, RegistrationSlip.issue_date,
+                   RegistrationSlip.slip_number, Student.name, Student.student_number)
+            .join(Student, Student.id == RegistrationSlip.student_id)
+            .where(RegistrationSlip.id == slip_id)
+        ).first()
 
 def generate_registration_slip_pdf(registration_slip):
-    """Generate PDF for registration slip"""
+    """
+    Generate PDF for registration slip. Call after the commit: the PDF is
+    rendered from the committed row, and only replaces the file while that
+    version is still the committed one, so a request that was overtaken by
+    a newer edit can't overwrite that edit's file.
+    """
+    from app.utils.pdf_generator import render_official_slip
+
     try:
-        # Create PDF filename
-        filename = f"registration_slip_{registration_slip.student.student_number}.pdf"
-        file_path = os.path.join(current_app.config['REGISTRATION_SLIP_FOLDER'], filename)
+        row = _committed_slip(registration_slip.id)
+        if row is None:
+            return False
+
+        filename = registration_slip_pdf_filename(registration_slip)
+        folder = current_app.config['REGISTRATION_SLIP_FOLDER']
+        file_path = os.path.join(folder, filename)
         
         # Create directory if it doesn't exist
-        os.makedirs(os.path.dirname(file_path), exist_ok=True)
-        
-        # Create PDF
-        buffer = io.BytesIO()
-        doc = SimpleDocTemplate(buffer, pagesize=A4, topMargin=0.5*inch, bottomMargin=0.5*inch)
-        
-        # Styles
-        styles = getSampleStyleSheet()
-        title_style = ParagraphStyle(
-            'CustomTitle',
-            parent=styles['Heading1'],
-            fontSize=14,
-            spaceAfter=20,
-            alignment=1,
-            textColor=colors.HexColor('#1e3c72')
-        )
-        
-        # Build content
-        story = []
-        
-        # Header
-        story.append(Paragraph("CAVENDISH UNIVERSITY ZAMBIA", title_style))
-        story.append(Paragraph("OFFICIAL REGISTRATION SLIP", styles['Heading2']))
-        story.append(Spacer(1, 20))
+        os.makedirs(folder, exist_ok=True)
         
-        # Student Information
-        story.append(Paragraph("STUDENT INFORMATION", styles['Heading3']))
-        
-        student_data = [
-            ["Student Name:", registration_slip.student.name],
-            ["Student Number:", registration_slip.student.student_number],
-            ["Program:", registration_slip.program_name or "Not specified"],
-            ["Faculty:", registration_slip.faculty_name or "Not specified"],
-            ["Academic Year:", registration_slip.academic_year or "2024/2025"],
-            ["Semester:", registration_slip.semester or "Semester 1"],
-            ["Issue Date:", registration_slip.issue_date.strftime('%d/%m/%Y')],
-            ["Slip Number:", registration_slip.slip_number]
-        ]
-        
-        # Create table
-        table_data = []
-        for label, value in student_data:
-            table_data.append([Paragraph(f"<b>{label}</b>", styles['Normal']), Paragraph(value, styles['Normal'])])
-        
-        student_table = Table(table_data, colWidths=[2*inch, 4*inch])
-        student_table.setStyle(TableStyle([
-            ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-            ('LEFTPADDING', (0, 0), (-1, -1), 6),
-            ('RIGHTPADDING', (0, 0), (-1, -1), 6),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
-            ('GRID', (0, 0), (-1, -1), 1, colors.grey),
-        ]))
-        
-        story.append(student_table)
-        story.append(Spacer(1, 30))
-        
-        # Footer
-        story.append(Paragraph("This is an official registration document.", styles['Normal']))
-        story.append(Paragraph(f"Generated on: {datetime.now().strftime('%d/%m/%Y %H:%M')}", styles['Normal']))
-        
-        # Build PDF
-        doc.build(story)
-        
-        # Save to file
-        with open(file_path, 'wb') as f:
-            f.write(buffer.getvalue())
-        
-        # Update registration slip with PDF filename
-        registration_slip.pdf_filename = filename
+        context = {
+            'student_name': row.name,
+            'student_number': row.student_number,
+            'program_name': row.program_name,
+            'faculty_name': row.faculty_name,
+            'academic_year': row.academic_year,
+            'semester': row.semester,
+            'issue_date': row.issue_date,
+            'slip_number': row.slip_number,
+        }
+
+        # Approvals and regenerations of the same slip at the same time render it once
+        pdf_bytes = single_flight(flight_key(f'official-slip:{file_path}', context),
+                                  lambda: render_official_slip(context))
+
+        # Write then rename so a download never sees a half-written file
+        tmp_path = f"{file_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(pdf_bytes)
+
+        # Check and rename under one lock: a newer commit either shows up
+        # here (and we drop our file) or renames its own file after ours
+        with open(os.path.join(folder, '.write.lock'), 'a+b') as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            current = _committed_slip(registration_slip.id)
+            if current is not None and current.version_id == row.version_id:
+                os.replace(tmp_path, file_path)
+            else:
+                os.unlink(tmp_path)
         return True
         
     except Exception as e:
@@ -0,0 +1,196 @@
+# app/utils/idempotency.py
+"""
+Idempotency-Key support for POST endpoints that must not run twice.
+
+A client sends `Idempotency-Key: <random id>` and reuses it when it
+retries. The first request claims the key and runs; its response
+(status, content type, body) is stored for IDEMPOTENCY_TTL seconds.
+A retry with the same key and the same request gets that response
+replayed with `Idempotent-Replayed: true`, without touching files, the
+database or email. Otherwise:
+
+- the same key with a different request body     -> 422
+- the same key while the first is still running  -> 409 (Retry-After: 1)
+- the first request failed with a 5xx/exception  -> key released, retry runs
+
+A running claim is only a lease of IDEMPOTENCY_LEASE seconds; the full
+TTL starts when the response is stored. If the worker dies mid-request
+the lease runs out and a retry can claim the key again instead of
+getting 409 for a day.
+
+Keys are scoped to the logged-in student and the endpoint. Requests
+without the header behave exactly as before.
+
+Stores: "sqlite" (IDEMPOTENCY_SQLITE_PATH, shared by the workers on one
+host) or "memory" (per worker).
+"""
+import time
+import json
+import hashlib
+import threading
+from functools import wraps
+
+from flask import request, session, current_app, jsonify
+
+from app.utils.sqlite_store import SQLiteStore
+
+HEADER = 'Idempotency-Key'
+MAX_KEY_LENGTH = 255
+# Seconds between sweeps of expired keys from the SQLite table
+PURGE_INTERVAL = 300
+
+
+# ---------------- Stores ----------------
+class MemoryIdempotencyStore:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._records = {}  # key -> dict(fingerprint, status, body, content_type, expires)
+
+    def claim(self, key, fingerprint, lease):
+        """True if key was free (or its lease ran out) and is now ours, else the existing record"""
+        now = time.time()
+        with self._lock:
+            record = self._records.get(key)
+            if record and record['expires'] > now:
+                return False, dict(record)
+            self._records[key] = {'fingerprint': fingerprint, 'status': None, 'body': None,
+                                  'content_type': None, 'expires': now + lease}
+            if len(self._records) > 10000:
+                self._records = {k: v for k, v in self._records.items() if v['expires'] > now}
+            return True, None
+
+    def complete(self, key, status, body, content_type, ttl):
+        with self._lock:
+            if key in self._records:
+                self._records[key].update(status=status, body=body, content_type=content_type,
+                                          expires=time.time() + ttl)
+
+    def release(self, key):
+        with self._lock:
+            self._records.pop(key, None)
+
+
+class SQLiteIdempotencyStore(SQLiteStore):
+    schema = """
+        CREATE TABLE IF NOT EXISTS idempotency_keys (
+            key TEXT PRIMARY KEY,
+            fingerprint TEXT NOT NULL,
+            status INTEGER,
+            body BLOB,
+            content_type TEXT,
+            expires REAL NOT NULL
+        );
+    """
+
+    def __init__(self, path):
+        self._next_purge = 0
+        super().__init__(path)
+
+    def claim(self, key, fingerprint, lease):
+        now = time.time()
+        with self.transaction() as conn:
+            row = conn.execute(
+                'SELECT fingerprint, status, body, content_type, expires FROM idempotency_keys '
+                'WHERE key = ? AND expires > ?', (key, now)
+            ).fetchone()
+            if row:
+                return False, dict(zip(('fingerprint', 'status', 'body', 'content_type', 'expires'), row))
+            # Expired leases and replies are both replaced here
+            conn.execute('INSERT OR REPLACE INTO idempotency_keys (key, fingerprint, expires) VALUES (?, ?, ?)',
+                         (key, fingerprint, now + lease))
+            # Opportunistic cleanup instead of a cron job
+            if now >= self._next_purge:
+                self._next_purge = now + PURGE_INTERVAL
+                conn.execute('DELETE FROM idempotency_keys WHERE expires <= ?', (now,))
+        return True, None
+
+    def complete(self, key, status, body, content_type, ttl):
+        self.conn().execute(
+            'UPDATE idempotency_keys SET status = ?, body = ?, content_type = ?, expires = ? WHERE key = ?',
+            (status, body, content_type, time.time() + ttl, key)
+        )
+
+    def release(self, key):
+        self.conn().execute('DELETE FROM idempotency_keys WHERE key = ?', (key,))
+
+
+def create_idempotency_store(app):
+    if (app.config.get('IDEMPOTENCY_BACKEND') or 'memory').lower() == 'sqlite':
+        return SQLiteIdempotencyStore(app.config['IDEMPOTENCY_SQLITE_PATH'])
+    return MemoryIdempotencyStore()
+
+
+def init_idempotency(app):
+    app.extensions['idempotency_store'] = create_idempotency_store(app)
+
+
+# ---------------- Request fingerprint ----------------
+def request_fingerprint():
+    """Hash of what the request asks for: form fields, file contents and JSON/raw body"""
+    digest = hashlib.sha256()
+    digest.update(f"{request.method} {request.path}\n".encode())
+
+    if request.mimetype in ('multipart/form-data', 'application/x-www-form-urlencoded'):
+        digest.update(json.dumps(sorted(request.form.items(multi=True))).encode())
+        for name, storage in sorted(request.files.items(multi=True), key=lambda item: item[0]):
+            digest.update(f"\n{name}:{storage.filename}:".encode())
+            stream = storage.stream
+            for chunk in iter(lambda: stream.read(65536), b''):
+                digest.update(chunk)
+            stream.seek(0)
+    else:
+        digest.update(request.get_data(cache=True))
+    return digest.hexdigest()
+
+
+def _scoped_key(key):
+    owner = session.get('student_id') or f"user-{session.get('user_id')}"
+    return f"{owner}:{request.endpoint}:{key}"
+
+
+def _error(message, status, **headers):
+    response = jsonify({'success': False, 'error': message})
+    response.status_code = status
+    response.headers.update(headers)
+    return response
+
+
+def idempotent(view):
+    """Replay the stored response for a repeated Idempotency-Key instead of running view again"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        key = request.headers.get(HEADER)
+        if not key:
+            return view(*args, **kwargs)
+        if len(key) > MAX_KEY_LENGTH:
+            return _error(f"{HEADER} is too long.", 400)
+
+        store = current_app.extensions['idempotency_store']
+        scoped = _scoped_key(key)
+        fingerprint = request_fingerprint()
+        claimed, record = store.claim(scoped, fingerprint, current_app.config.get('IDEMPOTENCY_LEASE', 60))
+
+        if not claimed:
+            if record['fingerprint'] != fingerprint:
+                return _error(f"This {HEADER} was already used for a different request.", 422)
+            if record['status'] is None:
+                return _error("This request is still being processed.", 409, **{'Retry-After': '1'})
+            replay = current_app.response_class(record['body'], status=record['status'],
+                                                content_type=record['content_type'])
+            replay.headers['Idempotent-Replayed'] = 'true'
+            return replay
+
+        try:
+            response = current_app.make_response(view(*args, **kwargs))
+        except BaseException:
+            store.release(scoped)
+            raise
+
+        if response.status_code >= 500 or response.is_streamed:
+            # Let the client retry failures for real
+            store.release(scoped)
+        else:
+            store.complete(scoped, response.status_code, response.get_data(), response.content_type,
+                           current_app.config.get('IDEMPOTENCY_TTL', 24 * 3600))
+        return response
+    return wrapper
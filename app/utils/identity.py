@@ -0,0 +1,356 @@
+# app/utils/identity.py
+"""
+Who is logged in, without a database hit per request.
+
+At login the fields routes actually need (user id, student id, name,
+student number, role) are stored in the session as a signed snapshot
+with a short TTL (IDENTITY_SNAPSHOT_TTL). Each request verifies the
+signature and age in memory and caches the result on `g`; only an
+expired or invalidated snapshot is refreshed from the database.
+
+Students and admins are separate realms, so a browser logged in as both
+keeps two snapshots.
+
+Password, role, name or student-number changes invalidate the snapshot
+automatically (ORM update/delete events). When the change commits, it
+is recorded with a sequence number in an invalidation store - "sqlite"
+(IDENTITY_SQLITE_PATH, shared by the workers on one host) or "memory"
+(per worker). Each snapshot carries the sequence number its worker had
+seen when it was issued, and is rebuilt once a change to its user or
+student has a higher one. Workers read new changes from the store at
+most every IDENTITY_CHECK_INTERVAL seconds, so requests in between make
+no store or database call for auth at all, and another worker notices a
+change within that interval (the worker that made it, immediately).
+"""
+import time
+import threading
+
+from flask import g, session, current_app, has_app_context, has_request_context
+from flask_login import UserMixin
+from itsdangerous import URLSafeTimedSerializer, BadSignature, SignatureExpired
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, object_session
+
+from app.extensions import db
+from app.models import User, Student
+from app.utils.sessions import regenerate_session
+from app.utils.sqlite_store import SQLiteStore
+
+SESSION_KEY = '_identity'
+REALMS = ('student', 'admin')
+
+# Session keys the rest of the app reads directly, per realm
+LEGACY_KEYS = {
+    'student': ('student_id', 'student_name', 'student_number'),
+    'admin': ('user_id', 'role'),
+}
+
+
+# ---------------- Invalidation stores ----------------
+# Every committed change gets the next number of a store-wide sequence.
+# A snapshot records the sequence number its worker had seen when it was
+# issued; a change to its keys with a higher number invalidates it.
+
+class MemoryIdentityStore:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._changes = {}  # "user:<id>" / "student:<id>" -> (seq, time.time()) of the last change
+        self._seq = 0
+
+    def changes_after(self, seq):
+        with self._lock:
+            return [(key, key_seq) for key, (key_seq, _) in self._changes.items() if key_seq > seq]
+
+    def mark(self, keys, when, keep):
+        with self._lock:
+            self._seq += 1
+            for key in keys:
+                self._changes[key] = (self._seq, when)
+            if len(self._changes) > 10000:
+                self._changes = {k: v for k, v in self._changes.items() if v[1] > when - keep}
+
+
+class SQLiteIdentityStore(SQLiteStore):
+    schema = """
+        CREATE TABLE IF NOT EXISTS identity_changes (
+            key TEXT PRIMARY KEY,
+            changed REAL NOT NULL,
+            seq INTEGER NOT NULL DEFAULT 0
+        );
+    """
+
+    def migrate(self, conn):
+        if 'seq' not in {row[1] for row in conn.execute('PRAGMA table_info(identity_changes)')}:
+            # Rows from before sequencing count as already seen
+            conn.execute('ALTER TABLE identity_changes ADD COLUMN seq INTEGER NOT NULL DEFAULT 0')
+        conn.execute('CREATE INDEX IF NOT EXISTS ix_identity_changes_seq ON identity_changes (seq)')
+
+    def changes_after(self, seq):
+        return self.conn().execute('SELECT key, seq FROM identity_changes WHERE seq > ?', (seq,)).fetchall()
+
+    def mark(self, keys, when, keep):
+        with self.transaction() as conn:
+            seq = conn.execute('SELECT COALESCE(MAX(seq), 0) + 1 FROM identity_changes').fetchone()[0]
+            conn.executemany('INSERT OR REPLACE INTO identity_changes (key, changed, seq) VALUES (?, ?, ?)',
+                             [(key, when, seq) for key in keys])
+            # Older changes can't matter: every snapshot issued before them has
+            # expired. The row just written keeps MAX(seq) from going backwards.
+            conn.execute('DELETE FROM identity_changes WHERE changed < ?', (when - keep,))
+
+
+def create_identity_store(app):
+    if (app.config.get('IDENTITY_BACKEND') or 'memory').lower() == 'sqlite':
+        return SQLiteIdentityStore(app.config['IDENTITY_SQLITE_PATH'])
+    return MemoryIdentityStore()
+
+
+class IdentityChanges:
+    """
+    This worker's copy of the invalidation store. It is brought up to date
+    at most every `interval` seconds (one query for the whole worker, not
+    one per request), and right after this worker records a change.
+    """
+
+    def __init__(self, store, interval, keep):
+        self.store = store
+        self.interval = interval
+        self.keep = keep
+        self.seq = 0          # highest sequence number seen
+        self._changed = {}    # key -> (seq, time.monotonic() when seen)
+        self._synced = None
+        self._lock = threading.Lock()
+
+    def _sync(self, force=False):
+        now = time.monotonic()
+        if not force and self._synced is not None and now - self._synced < self.interval:
+            return
+        with self._lock:
+            for key, seq in self.store.changes_after(self.seq):
+                self._changed[key] = (seq, now)
+                self.seq = max(self.seq, seq)
+            if len(self._changed) > 10000:
+                self._changed = {k: v for k, v in self._changed.items() if v[1] > now - self.keep}
+            self._synced = now
+
+    def generation(self):
+        """Sequence number to stamp on a snapshot built from rows read after this call"""
+        self._sync()
+        return self.seq
+
+    def changed_after(self, keys, generation):
+        self._sync()
+        return any(self._changed.get(key, (0, 0))[0] > generation for key in keys)
+
+    def mark(self, keys):
+        self.store.mark(keys, time.time(), self.keep)
+        self._sync(force=True)
+
+
+def init_identity(app):
+    ttl = app.config.get('IDENTITY_SNAPSHOT_TTL', 300)
+    app.extensions['identity_changes'] = IdentityChanges(
+        create_identity_store(app), app.config.get('IDENTITY_CHECK_INTERVAL', 2), ttl
+    )
+
+
+def _store_keys(user_id=None, student_id=None):
+    keys = []
+    if user_id is not None:
+        keys.append(f"user:{user_id}")
+    if student_id is not None:
+        keys.append(f"student:{student_id}")
+    return keys
+
+
+class SnapshotUser(UserMixin):
+    """Flask-Login user built from a snapshot instead of a User row"""
+
+    def __init__(self, identity):
+        self.id = identity['uid']
+        self.role = identity['role']
+        self.student_id = identity.get('sid')
+        self.name = identity.get('name')
+        self.student_number = identity.get('number')
+
+
+def _serializer():
+    return URLSafeTimedSerializer(current_app.secret_key, salt='identity-snapshot')
+
+
+def _snapshot(user, student=None, generation=0):
+    return {
+        'gen': generation,
+        'uid': user.id if user else None,
+        'sid': student.id if student else None,
+        'name': student.name if student else (user.username if user else None),
+        'number': student.student_number if student else None,
+        'role': 'student' if student else user.role,
+    }
+
+
+# ---------------- Login / logout ----------------
+def remember_identity(realm, user=None, student=None, regenerate=True, generation=None):
+    """
+    Store a fresh snapshot for realm and mirror it into the legacy session
+    keys. regenerate gives the session a new id (logins); refreshes of an
+    existing login pass False. generation is the invalidation sequence
+    number taken before user/student were read (default: now).
+    """
+    if generation is None:
+        generation = current_app.extensions['identity_changes'].generation()
+    identity = _snapshot(user, student, generation)
+    if regenerate:
+        regenerate_session()
+    tokens = dict(session.get(SESSION_KEY) or {})
+    tokens[realm] = _serializer().dumps(identity)
+    session[SESSION_KEY] = tokens
+
+    if realm == 'student':
+        session['student_id'] = identity['sid']
+        session['student_name'] = identity['name']
+        session['student_number'] = identity['number']
+    else:
+        session['user_id'] = identity['uid']
+        session['role'] = identity['role']
+
+    g.setdefault('_identities', {})[realm] = identity
+    return identity
+
+
+def forget_identity(realm):
+    regenerate_session()
+    tokens = dict(session.get(SESSION_KEY) or {})
+    tokens.pop(realm, None)
+    session[SESSION_KEY] = tokens
+    for key in LEGACY_KEYS[realm]:
+        session.pop(key, None)
+    g.setdefault('_identities', {})[realm] = None
+
+
+# ---------------- Per-request lookup ----------------
+def _refresh(realm):
+    """Rebuild the snapshot from the database (expired, invalidated or pre-snapshot session)"""
+    # Taken before the reads, so a change committed in between still invalidates
+    generation = current_app.extensions['identity_changes'].generation()
+    if realm == 'student':
+        student_id = session.get('student_id')
+        student = db.session.get(Student, student_id) if student_id else None
+        if student is None:
+            forget_identity(realm)
+            return None
+        user = User.query.filter_by(student_id=student.id, role='student').first()
+        return remember_identity(realm, user, student, regenerate=False, generation=generation)
+
+    user_id = session.get('user_id')
+    user = db.session.get(User, user_id) if user_id else None
+    if user is None or user.role != 'admin':
+        forget_identity(realm)
+        return None
+    # A changed role is a privilege change: new session id
+    return remember_identity(realm, user, regenerate=user.role != session.get('role'), generation=generation)
+
+
+def _invalidated(identity):
+    keys = _store_keys(identity.get('uid'), identity.get('sid'))
+    if not keys:
+        return False
+    # Snapshots from before sequencing carry no 'gen' and are rebuilt once
+    return current_app.extensions['identity_changes'].changed_after(keys, identity.get('gen', 0))
+
+
+def current_identity(realm):
+    """The realm's snapshot dict for this request, or None if not logged in"""
+    cache = g.setdefault('_identities', {})
+    if realm in cache:
+        return cache[realm]
+
+    token = (session.get(SESSION_KEY) or {}).get(realm)
+    legacy_key = 'student_id' if realm == 'student' else 'user_id'
+
+    if token is None:
+        # Sessions created before snapshots existed still carry the plain keys
+        identity = _refresh(realm) if session.get(legacy_key) else None
+    else:
+        try:
+            identity = _serializer().loads(
+                token,
+                max_age=current_app.config.get('IDENTITY_SNAPSHOT_TTL', 300)
+            )
+            if _invalidated(identity):
+                identity = _refresh(realm)
+        except SignatureExpired:
+            identity = _refresh(realm)
+        except BadSignature:
+            forget_identity(realm)
+            identity = None
+
+    cache[realm] = identity
+    return identity
+
+
+def load_session_user(user_id):
+    """Flask-Login user_loader: answer from a snapshot when one matches"""
+    if has_request_context():
+        for realm in REALMS:
+            identity = current_identity(realm)
+            if identity and identity['uid'] == user_id:
+                return SnapshotUser(identity)
+    return db.session.get(User, user_id)
+
+
+# ---------------- Invalidation ----------------
+def invalidate_identity(user_id=None, student_id=None):
+    """Force snapshots of this user/student to be rebuilt on their next request, in every worker"""
+    keys = _store_keys(user_id, student_id)
+    if keys and has_app_context():
+        current_app.extensions['identity_changes'].mark(keys)
+
+    if has_request_context():
+        g.pop('_identities', None)
+
+
+def _defer(target, user_id=None, student_id=None):
+    """Invalidate once the change commits, so a refresh can't re-read the old row"""
+    session = object_session(target)
+    if session is None:
+        invalidate_identity(user_id, student_id)
+        return
+    session.info.setdefault('_identity_changes', set()).add((user_id, student_id))
+
+
+@event.listens_for(Session, 'after_commit')
+def _flush_identity_changes(session):
+    for user_id, student_id in session.info.pop('_identity_changes', ()):
+        invalidate_identity(user_id, student_id)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _drop_identity_changes(session):
+    session.info.pop('_identity_changes', None)
+
+
+def _changed(target, *fields):
+    state = inspect(target)
+    return any(state.attrs[field].history.has_changes() for field in fields)
+
+
+@event.listens_for(User, 'after_update')
+def _user_updated(mapper, connection, target):
+    if _changed(target, 'password_hash', 'role', 'username', 'student_id'):
+        _defer(target, user_id=target.id, student_id=target.student_id)
+
+
+@event.listens_for(Student, 'after_update')
+def _student_updated(mapper, connection, target):
+    if _changed(target, 'name', 'student_number'):
+        _defer(target, student_id=target.id)
+
+
+@event.listens_for(User, 'after_delete')
+def _user_deleted(mapper, connection, target):
+    _defer(target, user_id=target.id, student_id=target.student_id)
+
+
+@event.listens_for(Student, 'after_delete')
+def _student_deleted(mapper, connection, target):
+    _defer(target, student_id=target.id)
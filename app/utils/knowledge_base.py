@@ -0,0 +1,199 @@
+# app/utils/knowledge_base.py
+"""
+Chatbot knowledge base: loading, compiling and hot-swapping.
+
+The categories live in a JSON file (CHATBOT_KB_PATH, by default
+app/data/chatbot_knowledge.json):
+
+    {"categories": {"<name>": {"patterns": ["regex", ...], "response": "..."}}}
+
+Order matters: a message gets the first category with a matching pattern.
+Compiling turns each category's patterns into one case-insensitive
+alternation and checks the whole file for overlaps:
+
+- duplicate: the same pattern already appears earlier, so it can never win
+  (it is left out of the compiled matcher)
+- shadowed:  the pattern's own wording is already matched by an earlier
+  category, so that category usually answers instead
+- unreachable: every pattern of the category is a duplicate or shadowed
+
+Saving validates and compiles first, then replaces the file atomically.
+Workers notice the new file by its mtime and swap in the recompiled
+knowledge base between requests, so no restart is needed.
+"""
+import os
+import re
+import json
+import time
+import tempfile
+import threading
+from collections import namedtuple
+
+from app.utils.faq_index import pattern_text
+
+DEFAULT_KB_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                               'data', 'chatbot_knowledge.json')
+
+KnowledgeIssue = namedtuple('KnowledgeIssue', 'kind category pattern other_category other_pattern')
+
+
+class CompiledKnowledgeBase:
+    def __init__(self, categories, matchers, issues, mtime=None):
+        self.categories = categories  # name -> {'patterns': [...], 'response': str}
+        self.matchers = matchers      # [(name, compiled alternation)] in file order
+        self.issues = issues
+        self.mtime = mtime
+
+    def match(self, message):
+        """First category with a pattern found in message, or None"""
+        for name, regex in self.matchers:
+            if regex.search(message):
+                return name
+        return None
+
+
+def _probe(pattern):
+    return re.sub(r"\s+", " ", pattern_text(pattern)).strip().lower()
+
+
+def check_overlaps(categories):
+    """Duplicate, shadowed and unreachable patterns, in file order"""
+    issues = []
+    first_seen = {}   # lowercased pattern -> category
+    earlier = []      # [(name, [(pattern, compiled)])]
+
+    for name, data in categories.items():
+        blocked = 0
+        for pattern in data['patterns']:
+            key = pattern.lower()
+            if key in first_seen:
+                issues.append(KnowledgeIssue('duplicate', name, pattern, first_seen[key], pattern))
+                blocked += 1
+                continue
+            first_seen[key] = name
+
+            probe = _probe(pattern)
+            shadow = next(
+                ((other, other_pattern) for other, compiled in earlier
+                 for other_pattern, regex in compiled if probe and regex.search(probe)),
+                None
+            )
+            if shadow:
+                issues.append(KnowledgeIssue('shadowed', name, pattern, *shadow))
+                blocked += 1
+
+        if data['patterns'] and blocked == len(data['patterns']):
+            issues.append(KnowledgeIssue('unreachable', name, None, None, None))
+        earlier.append((name, [(p, re.compile(p, re.IGNORECASE)) for p in data['patterns']]))
+
+    return issues
+
+
+def compile_knowledge_base(data, mtime=None):
+    """Validate the parsed JSON and build the matcher. Raises ValueError on bad input."""
+    raw = data.get('categories') if isinstance(data, dict) else None
+    if not isinstance(raw, dict) or not raw:
+        raise ValueError("The knowledge base needs a non-empty 'categories' object")
+
+    categories = {}
+    for name, entry in raw.items():
+        if not re.fullmatch(r"[a-z0-9_]+", name or ''):
+            raise ValueError(f"Category name '{name}' may only use lowercase letters, digits and '_'")
+        if not isinstance(entry, dict):
+            raise ValueError(f"Category '{name}' must be an object with 'patterns' and 'response'")
+        patterns = entry.get('patterns') or []
+        if not isinstance(patterns, list) or not all(isinstance(p, str) for p in patterns):
+            raise ValueError(f"Category '{name}': 'patterns' must be a list of strings")
+        response = entry.get('response') or ''
+        if not isinstance(response, str):
+            raise ValueError(f"Category '{name}': 'response' must be a string")
+        patterns = [p for p in patterns if p.strip()]
+        response = response.strip()
+        if not response:
+            raise ValueError(f"Category '{name}' has no response")
+        for pattern in patterns:
+            try:
+                re.compile(pattern)
+            except re.error as e:
+                raise ValueError(f"Category '{name}': invalid pattern {pattern!r} ({e})")
+        categories[name] = {'patterns': patterns, 'response': response}
+
+    issues = check_overlaps(categories)
+    duplicates = {(i.category, i.pattern) for i in issues if i.kind == 'duplicate'}
+    matchers = []
+    for name, entry in categories.items():
+        live = [p for p in entry['patterns'] if (name, p) not in duplicates]
+        if live:
+            matchers.append((name, re.compile('|'.join(f'(?:{p})' for p in live), re.IGNORECASE)))
+
+    return CompiledKnowledgeBase(categories, matchers, issues, mtime)
+
+
+def read_categories(path):
+    """The raw categories dict from path (for editing)"""
+    with open(path, encoding='utf-8') as f:
+        return json.load(f).get('categories', {})
+
+
+def load_knowledge_base(path):
+    mtime = os.stat(path).st_mtime_ns
+    with open(path, encoding='utf-8') as f:
+        return compile_knowledge_base(json.load(f), mtime)
+
+
+def save_knowledge_base(path, categories):
+    """Compile categories, then atomically replace the file. Returns the compiled knowledge base."""
+    compiled = compile_knowledge_base({'categories': categories})
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix='.chatbot_knowledge.', suffix='.json', dir=directory)
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump({'categories': compiled.categories}, f, indent=2, ensure_ascii=False)
+            f.write('\n')
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+    compiled.mtime = os.stat(path).st_mtime_ns
+    return compiled
+
+
+class KnowledgeBaseSource:
+    """The current compiled knowledge base for one file, reloaded when the file changes"""
+
+    def __init__(self, path=DEFAULT_KB_PATH, check_interval=5):
+        self.path = path
+        self.check_interval = check_interval
+        self.current = None
+        self._lock = threading.Lock()
+        self._checked = 0.0
+
+    def get(self):
+        """The compiled knowledge base; (re)loads at most every check_interval seconds"""
+        if self.current is not None and time.monotonic() - self._checked < self.check_interval:
+            return self.current
+        with self._lock:
+            self._checked = time.monotonic()
+            try:
+                mtime = os.stat(self.path).st_mtime_ns
+            except OSError:
+                if self.current is None:
+                    raise
+                return self.current
+            if self.current is None or mtime != self.current.mtime:
+                try:
+                    self.current = load_knowledge_base(self.path)
+                except ValueError as e:
+                    # Keep answering from the last good version
+                    if self.current is None:
+                        raise
+                    print(f"⚠️ Ignoring invalid chatbot knowledge base {self.path}: {e}")
+                    self.current.mtime = mtime
+        return self.current
+
+    def swap(self, compiled):
+        """Install a knowledge base this worker just saved"""
+        with self._lock:
+            self.current = compiled
+            self._checked = time.monotonic()
@@ -0,0 +1,96 @@
+# app/utils/loading_profiles.py
+"""
+Named loading profiles for the academic models.
+
+ProgramCourse.program/.course and StudentRegistration.courses used to be
+lazy="joined", so every query on those models pulled in whole Program,
+Course and RegisteredCourse rows - including counts and existence checks
+that never looked at them. They are now plain lazy relationships, and a
+query that does need related data opts into a profile:
+
+    profiled(ProgramCourse, 'catalog').filter_by(program_id=...).all()
+
+- catalog:    ProgramCourse rows for course pickers and the program
+              builder, with only code/title/credits of each Course
+- slip:       a StudentRegistration with program, faculty, academic year
+              names and its courses (code/title/credits), for slips,
+              timetables and the student details page
+- admin_list: StudentRegistration listings - student name/number and the
+              program/faculty/academic year names, no courses
+
+Each profile uses load_only(), so columns the page never shows (course
+descriptions, created_at, ...) are not fetched. Touching a column that a
+profile left out still works, it just costs an extra query.
+"""
+from sqlalchemy.orm import load_only, joinedload, selectinload
+
+from app.models import Student
+from app.models_academics import (
+    Faculty, Program, Course, AcademicYear, ProgramCourse, StudentRegistration, RegisteredCourse
+)
+
+
+def _course_columns(path):
+    return path.load_only(Course.code, Course.title, Course.credits)
+
+
+def _registration_columns():
+    return load_only(
+        StudentRegistration.student_id,
+        StudentRegistration.program_id,
+        StudentRegistration.academic_year_id,
+        StudentRegistration.year_level,
+        StudentRegistration.semester_type,
+        StudentRegistration.registration_date,
+        StudentRegistration.payment_status,
+        StudentRegistration.version_id  # needed to UPDATE without reloading
+    )
+
+
+def _registration_names():
+    """Program, faculty and academic year names joined into the registration row"""
+    return (
+        joinedload(StudentRegistration.program)
+        .load_only(Program.name, Program.faculty_id)
+        .joinedload(Program.faculty).load_only(Faculty.name),
+        joinedload(StudentRegistration.academic_year).load_only(AcademicYear.name),
+    )
+
+
+PROFILES = {
+    (ProgramCourse, 'catalog'): lambda: (
+        load_only(
+            ProgramCourse.program_id,
+            ProgramCourse.course_id,
+            ProgramCourse.year_level,
+            ProgramCourse.semester_type,
+            ProgramCourse.is_mandatory
+        ),
+        _course_columns(joinedload(ProgramCourse.course)),
+    ),
+    (StudentRegistration, 'slip'): lambda: (
+        _registration_columns(),
+        *_registration_names(),
+        # One extra query for all courses instead of a row per course per registration
+        _course_columns(
+            selectinload(StudentRegistration.courses)
+            .load_only(RegisteredCourse.registration_id, RegisteredCourse.course_id)
+            .joinedload(RegisteredCourse.course)
+        ),
+    ),
+    (StudentRegistration, 'admin_list'): lambda: (
+        _registration_columns(),
+        *_registration_names(),
+        joinedload(StudentRegistration.student).load_only(Student.name, Student.student_number),
+    ),
+}
+
+
+def loading_options(model, profile):
+    """The loader options of a named profile for model (KeyError if undefined)"""
+    return PROFILES[(model, profile)]()
+
+
+def profiled(model, profile):
+    """model.query with the named loading profile applied"""
+    return model.query.options(*loading_options(model, profile))
@@ -0,0 +1,585 @@
+# app/utils/pdf_generator.py
+"""
+Shared ReportLab toolkit used by every PDF the portal produces.
+
+Stylesheets, paragraph styles, table style templates and the decoded
+university logo are built once per process at import time and reused by
+each render. The render_* functions take plain dicts (no ORM objects) and
+return the finished PDF as bytes, so they can be called from a request,
+a CLI command or a worker process alike.
+"""
+import io
+import logging
+import os
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+
+from reportlab import rl_config
+from reportlab.lib import colors
+from reportlab.lib.enums import TA_CENTER
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib.units import inch
+from reportlab.lib.utils import ImageReader
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, Flowable, PageBreak
+
+from app.utils.profiling import timed
+
+logger = logging.getLogger(__name__)
+
+APP_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LOGO_PATH = os.path.join(APP_ROOT, 'static', 'images', 'logo3.png')
+
+
+BRAND_BLUE = colors.HexColor('#1e3c72')
+BRAND_BLUE_LIGHT = colors.HexColor('#2a5298')
+
+# =========================================================
+# STYLES (built once per process)
+# =========================================================
+_base = getSampleStyleSheet()
+
+STYLES = {
+    'normal': _base['Normal'],
+    'italic': _base['Italic'],
+    'heading2': _base['Heading2'],
+    'heading3': _base['Heading3'],
+
+    # Student registration slip
+    'title': ParagraphStyle(
+        'CustomTitle',
+        parent=_base['Heading1'],
+        fontSize=22,
+        spaceAfter=5,
+        alignment=TA_CENTER,
+        textColor=BRAND_BLUE,
+        fontName='Helvetica-Bold'
+    ),
+    'subtitle': ParagraphStyle(
+        'Subtitle',
+        parent=_base['Normal'],
+        fontSize=10,
+        alignment=TA_CENTER,
+        textColor=colors.HexColor('#666666'),
+        spaceAfter=15
+    ),
+    'section_header': ParagraphStyle(
+        'SectionHeader',
+        parent=_base['Heading2'],
+        fontSize=12,
+        spaceAfter=8,
+        spaceBefore=10,
+        textColor=BRAND_BLUE,
+        fontName='Helvetica-Bold'
+    ),
+    'label': ParagraphStyle(
+        'Label',
+        parent=_base['Normal'],
+        fontSize=9,
+        textColor=colors.HexColor('#555555'),
+        fontName='Helvetica-Bold'
+    ),
+    'value': ParagraphStyle(
+        'Value',
+        parent=_base['Normal'],
+        fontSize=9,
+        textColor=colors.HexColor('#333333')
+    ),
+    'footer': ParagraphStyle(
+        'Footer',
+        parent=_base['Normal'],
+        fontSize=8,
+        alignment=TA_CENTER,
+        textColor=colors.HexColor('#999999')
+    ),
+
+    # Timetable
+    'timetable_title': ParagraphStyle(
+        'TimetableTitle',
+        parent=_base['Heading1'],
+        fontSize=16,
+        spaceAfter=30,
+        alignment=TA_CENTER,
+        textColor=BRAND_BLUE
+    ),
+    'timetable_heading': ParagraphStyle(
+        'TimetableHeading',
+        parent=_base['Heading2'],
+        fontSize=12,
+        spaceAfter=12,
+        textColor=BRAND_BLUE_LIGHT
+    ),
+
+    # Admin-issued registration slip
+    'official_title': ParagraphStyle(
+        'OfficialTitle',
+        parent=_base['Heading1'],
+        fontSize=14,
+        spaceAfter=20,
+        alignment=TA_CENTER,
+        textColor=BRAND_BLUE
+    ),
+}
+
+# =========================================================
+# TABLE STYLE TEMPLATES
+# =========================================================
+# TableStyle only holds a command list, so one instance can be applied
+# to any number of Table objects.
+KEY_VALUE_TABLE = TableStyle([
+    ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+    ('LEFTPADDING', (0, 0), (-1, -1), 0),
+    ('RIGHTPADDING', (0, 0), (-1, -1), 0),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
+])
+
+REG_INFO_TABLE = TableStyle([
+    ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+    ('LEFTPADDING', (0, 0), (-1, -1), 0),
+    ('RIGHTPADDING', (0, 0), (-1, -1), 0),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 5),
+])
+
+PADDED_KEY_VALUE_TABLE = TableStyle([
+    ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+    ('LEFTPADDING', (0, 0), (-1, -1), 6),
+    ('RIGHTPADDING', (0, 0), (-1, -1), 6),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
+])
+
+GRID_KEY_VALUE_TABLE = TableStyle(
+    PADDED_KEY_VALUE_TABLE.getCommands() + [('GRID', (0, 0), (-1, -1), 1, colors.grey)]
+)
+
+HEADER_TABLE = TableStyle([
+    ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+    ('ALIGN', (1, 0), (1, 0), 'CENTER'),
+    ('LEFTPADDING', (0, 0), (0, 0), 0),
+    ('RIGHTPADDING', (2, 0), (2, 0), 0),
+])
+
+COURSE_TABLE = TableStyle([
+    # Header row styling
+    ('BACKGROUND', (0, 0), (-1, 0), BRAND_BLUE),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+    ('ALIGN', (0, 0), (-1, 0), 'CENTER'),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, 0), 10),
+    ('BOTTOMPADDING', (0, 0), (-1, 0), 8),
+    ('TOPPADDING', (0, 0), (-1, 0), 8),
+
+    # Data rows styling
+    ('BACKGROUND', (0, 1), (-1, -2), colors.beige),
+    ('TEXTCOLOR', (0, 1), (-1, -2), colors.black),
+    ('FONTNAME', (0, 1), (-1, -2), 'Helvetica'),
+    ('FONTSIZE', (0, 1), (-1, -2), 9),
+    ('ALIGN', (0, 1), (0, -2), 'CENTER'),
+    ('ALIGN', (3, 1), (3, -2), 'CENTER'),
+
+    # Grid lines
+    ('GRID', (0, 0), (-1, -2), 0.5, colors.HexColor('#cccccc')),
+
+    # Total row styling
+    ('BACKGROUND', (0, -1), (-1, -1), colors.HexColor('#e8e8e8')),
+    ('FONTNAME', (0, -1), (-1, -1), 'Helvetica-Bold'),
+    ('SPAN', (0, -1), (1, -1)),
+    ('ALIGN', (2, -1), (2, -1), 'RIGHT'),
+    ('ALIGN', (3, -1), (3, -1), 'CENTER'),
+    ('TOPPADDING', (0, -1), (-1, -1), 6),
+    ('BOTTOMPADDING', (0, -1), (-1, -1), 6),
+
+    # Cell padding
+    ('LEFTPADDING', (0, 0), (-1, -1), 6),
+    ('RIGHTPADDING', (0, 0), (-1, -1), 6),
+])
+
+TIMETABLE_TABLE = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), BRAND_BLUE),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+    ('ALIGN', (0, 0), (-1, 0), 'CENTER'),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, 0), 10),
+    ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+    ('BACKGROUND', (0, 1), (-1, -2), colors.beige),
+    ('TEXTCOLOR', (0, 1), (-1, -2), colors.black),
+    ('FONTNAME', (0, 1), (-1, -2), 'Helvetica'),
+    ('FONTSIZE', (0, 1), (-1, -2), 9),
+    ('GRID', (0, 0), (-1, -2), 1, colors.black),
+    ('BACKGROUND', (0, -1), (-1, -1), colors.HexColor('#f0f0f0')),
+    ('FONTNAME', (0, -1), (-1, -1), 'Helvetica-Bold'),
+    ('SPAN', (0, -1), (1, -1)),
+    ('ALIGN', (3, -1), (3, -1), 'RIGHT'),
+])
+
+SLIP_NOTES = [
+    "1. This registration slip is valid for the current academic session.",
+    "2. The student must present this slip when required by university authorities.",
+    "3. Any changes to registered courses must be approved by the academic office.",
+    "4. This is a computer-generated document and requires no signature.",
+]
+
+TIMETABLE_NOTES = [
+    "1. This timetable is subject to changes. Please check regularly for updates.",
+    "2. Students are expected to be punctual for all classes.",
+    "3. Any timetable conflicts should be reported to the academic office immediately.",
+    "4. Laboratory sessions will be scheduled separately.",
+]
+
+# =========================================================
+# LOGO (decoded once, shared by every document)
+# =========================================================
+LOGO_SIZE = 1.2*inch
+LOGO_DPI = 300
+
+_logo_lock = threading.Lock()
+_logo_cache = {}
+
+
+def get_logo():
+    """Return the decoded logo ImageReader, or None if the file is missing"""
+    if LOGO_PATH not in _logo_cache:
+        with _logo_lock:
+            if LOGO_PATH not in _logo_cache:
+                _logo_cache[LOGO_PATH] = _load_logo(LOGO_PATH)
+    return _logo_cache[LOGO_PATH]
+
+
+def _load_logo(path):
+    """Decode the logo once, downscaled to LOGO_DPI at its printed size"""
+    try:
+        if not os.path.exists(path):
+            return None
+
+        from PIL import Image as PILImage
+
+        image = PILImage.open(path)
+        target = int(LOGO_SIZE / inch * LOGO_DPI)
+        if max(image.size) > target:
+            image.thumbnail((target, target), PILImage.LANCZOS)
+
+        reader = ImageReader(image)
+        # Force decoding now so renders only copy pixel data
+        reader.getRGBData()
+        return reader
+    except Exception as e:
+        logger.warning(f"Logo loading error: {e}")
+        return None
+
+
+class LogoImage(Flowable):
+    """Draws a pre-decoded ImageReader (platypus Image would re-open the file)"""
+
+    def __init__(self, reader, width, height):
+        super().__init__()
+        self.reader = reader
+        self.width = width
+        self.height = height
+
+    def wrap(self, availWidth, availHeight):
+        return self.width, self.height
+
+    def draw(self):
+        self.canv.drawImage(self.reader, 0, 0, self.width, self.height, mask='auto')
+
+
+# =========================================================
+# HELPERS
+# =========================================================
+def key_value_table(rows, col_widths, table_style=KEY_VALUE_TABLE,
+                    label_style='label', value_style='value'):
+    """Two-column label/value table"""
+    data = [
+        [Paragraph(f"<b>{label}</b>", STYLES[label_style]),
+         Paragraph(str(value), STYLES[value_style])]
+        for label, value in rows
+    ]
+    table = Table(data, colWidths=col_widths)
+    table.setStyle(table_style)
+    return table
+
+
+def course_rows(courses):
+    """Numbered course rows plus the total-credits row"""
+    rows = []
+    total_credits = 0
+    for idx, course in enumerate(courses, 1):
+        credits = course.get('credits') or 0
+        rows.append([
+            str(idx),
+            course.get('code') or "N/A",
+            course.get('title') or "N/A",
+            str(credits)
+        ])
+        total_credits += credits
+    rows.append(['', '', 'TOTAL CREDITS:', str(total_credits)])
+    return rows
+
+
+_a85_lock = threading.Lock()
+_a85_users = 0
+_a85_saved = None
+
+
+@contextmanager
+def _binary_streams():
+    """
+    Write binary (zlib) streams instead of ASCII85 text while a document
+    builds. The pure-Python ASCII85 encoder dominated render time for the
+    logo image and inflated every slip by ~25%.
+
+    ReportLab only reads this from the process-wide rl_config, so the
+    setting is counted across concurrent builds and the previous value
+    comes back once the last one finishes.
+    """
+    global _a85_users, _a85_saved
+    with _a85_lock:
+        if _a85_users == 0:
+            _a85_saved = rl_config.useA85
+            rl_config.useA85 = 0
+        _a85_users += 1
+    try:
+        yield
+    finally:
+        with _a85_lock:
+            _a85_users -= 1
+            if _a85_users == 0:
+                rl_config.useA85 = _a85_saved
+
+
+@timed('pdf')
+def _build(story, **doc_kwargs):
+    buffer = io.BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=A4, **doc_kwargs)
+    with _binary_streams():
+        doc.build(story)
+    return buffer.getvalue()
+
+
+# =========================================================
+# STUDENT REGISTRATION SLIP
+# =========================================================
+def render_student_slip(context):
+    """
+    Render the student-facing registration slip.
+
+    context keys: student (id, name, student_number, email, phone),
+    program_name, faculty_name, year_level, semester, academic_year,
+    payment (None or amount, reference, method, approved_date), courses
+    (list of code/title/credits dicts).
+    """
+    student = context['student']
+    payment = context.get('payment')
+    courses = context.get('courses') or []
+    now = context.get('generated_at') or datetime.now()
+
+    story = []
+
+    # Header with logo
+    logo = get_logo()
+    if logo is not None:
+        header_data = [[
+            LogoImage(logo, LOGO_SIZE, LOGO_SIZE),
+            Paragraph("CAVENDISH UNIVERSITY<br/><font size='8' color='#666666'>Lusaka, Zambia</font>", STYLES['title']),
+            ""
+        ]]
+        header_table = Table(header_data, colWidths=[1.2*inch, 4*inch, 1*inch])
+        header_table.setStyle(HEADER_TABLE)
+        story.append(header_table)
+    else:
+        story.append(Paragraph("CAVENDISH UNIVERSITY", STYLES['title']))
+        story.append(Paragraph("Lusaka, Zambia", STYLES['subtitle']))
+
+    story.append(Spacer(1, 5))
+    story.append(Paragraph("OFFICIAL REGISTRATION SLIP", STYLES['title']))
+    story.append(Spacer(1, 15))
+
+    # Registration info box
+    status = "<font color='green'><b>APPROVED</b></font>" if payment else "<font color='orange'><b>PENDING</b></font>"
+    story.append(key_value_table([
+        ("Registration Number:", f"REG-{student['id']:06d}-{now.year}"),
+        ("Issue Date:", now.strftime('%d %B, %Y')),
+        ("Registration Status:", status),
+    ], [2*inch, 3.5*inch], table_style=REG_INFO_TABLE))
+    story.append(Spacer(1, 10))
+
+    # Student information
+    story.append(Paragraph("STUDENT INFORMATION", STYLES['section_header']))
+    story.append(Spacer(1, 3))
+    story.append(key_value_table([
+        ("Full Name:", student.get('name') or "N/A"),
+        ("Student ID:", student.get('student_number') or "N/A"),
+        ("Email:", student.get('email') or "N/A"),
+        ("Phone:", student.get('phone') or "N/A"),
+    ], [1.2*inch, 4.5*inch]))
+    story.append(Spacer(1, 10))
+
+    # Academic information
+    story.append(Paragraph("ACADEMIC INFORMATION", STYLES['section_header']))
+    story.append(Spacer(1, 3))
+    story.append(key_value_table([
+        ("Program of Study:", context.get('program_name') or "N/A"),
+        ("Faculty/School:", context.get('faculty_name') or "N/A"),
+        ("Year of Study:", context.get('year_level') or "N/A"),
+        ("Semester:", context.get('semester') or "N/A"),
+        ("Academic Year:", context.get('academic_year') or "N/A"),
+    ], [1.2*inch, 4.5*inch]))
+    story.append(Spacer(1, 10))
+
+    # Payment information
+    story.append(Paragraph("PAYMENT INFORMATION", STYLES['section_header']))
+    story.append(Spacer(1, 3))
+    approved_date = payment.get('approved_date') if payment else None
+    story.append(key_value_table([
+        ("Payment Status:", "Paid" if payment else "Pending Approval"),
+        ("Amount Paid:", f"ZMW {payment['amount']:,.2f}" if payment and payment.get('amount') else "N/A"),
+        ("Reference Number:", (payment.get('reference') or "N/A") if payment else "N/A"),
+        ("Payment Method:", (payment.get('method') or "N/A") if payment else "N/A"),
+        ("Approved Date:", approved_date.strftime('%d %B, %Y') if approved_date else "N/A"),
+    ], [1.2*inch, 4.5*inch]))
+    story.append(Spacer(1, 10))
+
+    # Registered courses
+    story.append(Paragraph("REGISTERED COURSES", STYLES['section_header']))
+    story.append(Spacer(1, 5))
+    if courses:
+        course_table = Table(
+            [['S/N', 'Course Code', 'Course Title', 'Credits']] + course_rows(courses),
+            colWidths=[0.5*inch, 1.2*inch, 3.5*inch, 0.8*inch]
+        )
+        course_table.setStyle(COURSE_TABLE)
+        story.append(course_table)
+    else:
+        story.append(Paragraph("<i>No registered courses found for this student.</i>", STYLES['italic']))
+    story.append(Spacer(1, 10))
+
+    # Footer notes
+    story.append(Spacer(1, 15))
+    story.append(Paragraph("IMPORTANT NOTES", STYLES['section_header']))
+    for note in SLIP_NOTES:
+        story.append(Paragraph(note, STYLES['normal']))
+        story.append(Spacer(1, 3))
+
+    story.append(Spacer(1, 20))
+    story.append(Paragraph("© Cavendish University - Official Registration Document", STYLES['footer']))
+
+    return _build(
+        story,
+        topMargin=0.5*inch,
+        bottomMargin=0.5*inch,
+        leftMargin=0.7*inch,
+        rightMargin=0.7*inch
+    )
+
+
+# =========================================================
+# TIMETABLE
+# =========================================================
+def render_timetable(context):
+    """
+    Render the student timetable.
+
+    context keys: student (name, student_number), program_name,
+    academic_year, semester, courses (list of code/title/credits dicts).
+    """
+    student = context['student']
+    courses = context.get('courses') or []
+    now = context.get('generated_at') or datetime.now()
+
+    story = []
+
+    # University header
+    story.append(Paragraph("CAVENDISH UNIVERSITY", STYLES['timetable_title']))
+    story.append(Paragraph("Lusaka, Zambia", STYLES['heading2']))
+    story.append(Spacer(1, 20))
+
+    story.append(Paragraph("STUDENT TIMETABLE", STYLES['timetable_title']))
+    story.append(Spacer(1, 30))
+
+    # Student information
+    story.append(Paragraph("STUDENT INFORMATION", STYLES['timetable_heading']))
+    story.append(key_value_table([
+        ("Student Name:", student.get('name') or "N/A"),
+        ("Student ID:", student.get('student_number') or "N/A"),
+        ("Program:", context.get('program_name') or "N/A"),
+        ("Academic Year:", context.get('academic_year') or "N/A"),
+        ("Semester:", context.get('semester') or "N/A"),
+        ("Date Generated:", now.strftime('%d-%m-%Y')),
+    ], [2*inch, 3*inch], table_style=PADDED_KEY_VALUE_TABLE,
+        label_style='normal', value_style='normal'))
+    story.append(Spacer(1, 30))
+
+    # Class schedule
+    story.append(Paragraph("CLASS SCHEDULE", STYLES['timetable_heading']))
+    if courses:
+        timetable_table = Table(
+            [['#', 'Course Code', 'Course Name', 'Credits']] + course_rows(courses),
+            colWidths=[0.5*inch, 1.2*inch, 3.5*inch, 1*inch]
+        )
+        timetable_table.setStyle(TIMETABLE_TABLE)
+        story.append(timetable_table)
+    else:
+        story.append(Paragraph("<i>No registered courses found. Please complete registration.</i>", STYLES['italic']))
+
+    story.append(Spacer(1, 30))
+
+    # Important notes
+    story.append(Paragraph("IMPORTANT NOTES", STYLES['timetable_heading']))
+    for note in TIMETABLE_NOTES:
+        story.append(Paragraph(note, STYLES['normal']))
+        story.append(Spacer(1, 5))
+
+    return _build(story, topMargin=1*inch, bottomMargin=1*inch)
+
+
+# =========================================================
+# ADMIN-ISSUED REGISTRATION SLIP
+# =========================================================
+def official_slip_story(context):
+    """
+    Flowables for the admin-issued slip stored in REGISTRATION_SLIP_FOLDER.
+
+    context keys: student_name, student_number, program_name,
+    faculty_name, academic_year, semester, issue_date, slip_number.
+    """
+    now = context.get('generated_at') or datetime.now()
+
+    story = []
+
+    story.append(Paragraph("CAVENDISH UNIVERSITY ZAMBIA", STYLES['official_title']))
+    story.append(Paragraph("OFFICIAL REGISTRATION SLIP", STYLES['heading2']))
+    story.append(Spacer(1, 20))
+
+    story.append(Paragraph("STUDENT INFORMATION", STYLES['heading3']))
+    story.append(key_value_table([
+        ("Student Name:", context['student_name']),
+        ("Student Number:", context['student_number']),
+        ("Program:", context.get('program_name') or "Not specified"),
+        ("Faculty:", context.get('faculty_name') or "Not specified"),
+        ("Academic Year:", context.get('academic_year') or "2024/2025"),
+        ("Semester:", context.get('semester') or "Semester 1"),
+        ("Issue Date:", context['issue_date'].strftime('%d/%m/%Y')),
+        ("Slip Number:", context['slip_number']),
+    ], [2*inch, 4*inch], table_style=GRID_KEY_VALUE_TABLE,
+        label_style='normal', value_style='normal'))
+    story.append(Spacer(1, 30))
+
+    story.append(Paragraph("This is an official registration document.", STYLES['normal']))
+    story.append(Paragraph(f"Generated on: {now.strftime('%d/%m/%Y %H:%M')}", STYLES['normal']))
+
+    return story
+
+
+def render_official_slip(context):
+    """Render one admin-issued slip"""
+    return _build(official_slip_story(context), topMargin=0.5*inch, bottomMargin=0.5*inch)
+
+
+def render_official_booklet(contexts):
+    """Render many admin-issued slips into one printable PDF, one slip per page"""
+    story = []
+    for idx, context in enumerate(contexts):
+        if idx:
+            story.append(PageBreak())
+        story.extend(official_slip_story(context))
+    return _build(story, topMargin=0.5*inch, bottomMargin=0.5*inch)
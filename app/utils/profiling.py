@@ -0,0 +1,288 @@
+# app/utils/profiling.py
+"""
+Opt-in per-request instrumentation (PROFILING_ENABLED).
+
+For every request it records, per endpoint: wall time, SQL statement
+count and time (SQLAlchemy engine events), template render time and the
+time spent in code wrapped with @timed('pdf') / @timed('email').
+
+- GET /metrics serves the totals in Prometheus text format. Admin
+  session or `Authorization: Bearer <METRICS_TOKEN>` required.
+- Admins can profile a single request with `?_profile=1` or the
+  `X-Profile: 1` header (cProfile, text report). Use the value
+  `pyinstrument` for pyinstrument's sampling profiler if it is installed.
+
+Metrics are kept per worker process; Prometheus scrapes each worker (or
+sums them) the same way it would with any multi-process server.
+"""
+import io
+import time
+import pstats
+import cProfile
+import threading
+from functools import wraps
+
+from flask import g, request, abort, current_app, has_request_context
+from flask.signals import before_render_template, template_rendered
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Request duration histogram buckets (seconds)
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Extra timers besides SQL and templates, fed by @timed(kind)
+TIMED_KINDS = ('pdf', 'email')
+
+
+class RequestMetrics:
+    """Thread-safe per-endpoint counters rendered as Prometheus text"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._requests = {}   # (endpoint, method, status) -> count
+        self._endpoints = {}  # endpoint -> totals dict
+
+    def _totals(self, endpoint):
+        totals = self._endpoints.get(endpoint)
+        if totals is None:
+            totals = self._endpoints[endpoint] = {
+                'buckets': [0] * len(BUCKETS),
+                'count': 0,
+                'wall': 0.0,
+                'sql_count': 0,
+                'sql_time': 0.0,
+                'template': 0.0,
+                **{kind: 0.0 for kind in TIMED_KINDS},
+            }
+        return totals
+
+    def observe(self, endpoint, method, status, wall, stats):
+        with self._lock:
+            key = (endpoint, method, status)
+            self._requests[key] = self._requests.get(key, 0) + 1
+
+            totals = self._totals(endpoint)
+            totals['count'] += 1
+            totals['wall'] += wall
+            for i, bound in enumerate(BUCKETS):
+                if wall <= bound:
+                    totals['buckets'][i] += 1
+            for name in ('sql_count', 'sql_time', 'template') + TIMED_KINDS:
+                totals[name] += stats[name]
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self._requests), {
+                endpoint: {**totals, 'buckets': list(totals['buckets'])}
+                for endpoint, totals in self._endpoints.items()
+            }
+
+    def reset(self):
+        with self._lock:
+            self._requests.clear()
+            self._endpoints.clear()
+
+    def render(self):
+        requests_, endpoints = self.snapshot()
+        lines = [
+            '# HELP cavendish_http_requests_total Requests handled, by endpoint, method and status.',
+            '# TYPE cavendish_http_requests_total counter',
+        ]
+        for (endpoint, method, status), count in sorted(requests_.items()):
+            lines.append(
+                f'cavendish_http_requests_total{{endpoint="{endpoint}",method="{method}",status="{status}"}} {count}'
+            )
+
+        lines += [
+            '# HELP cavendish_http_request_duration_seconds Wall time per request.',
+            '# TYPE cavendish_http_request_duration_seconds histogram',
+        ]
+        for endpoint, totals in sorted(endpoints.items()):
+            label = f'endpoint="{endpoint}"'
+            for bound, count in zip(BUCKETS, totals['buckets']):
+                lines.append(f'cavendish_http_request_duration_seconds_bucket{{{label},le="{bound}"}} {count}')
+            lines.append(f'cavendish_http_request_duration_seconds_bucket{{{label},le="+Inf"}} {totals["count"]}')
+            lines.append(f'cavendish_http_request_duration_seconds_sum{{{label}}} {totals["wall"]:.6f}')
+            lines.append(f'cavendish_http_request_duration_seconds_count{{{label}}} {totals["count"]}')
+
+        counters = [
+            ('sql_count', 'cavendish_sql_queries_total', 'SQL statements executed.'),
+            ('sql_time', 'cavendish_sql_seconds_total', 'Time spent executing SQL.'),
+            ('template', 'cavendish_template_render_seconds_total', 'Time spent rendering templates.'),
+            ('pdf', 'cavendish_pdf_render_seconds_total', 'Time spent building PDFs.'),
+            ('email', 'cavendish_email_send_seconds_total', 'Time spent building and sending email.'),
+        ]
+        for key, name, help_text in counters:
+            lines += [f'# HELP {name} {help_text}', f'# TYPE {name} counter']
+            for endpoint, totals in sorted(endpoints.items()):
+                value = totals[key]
+                value = str(value) if isinstance(value, int) else f'{value:.6f}'
+                lines.append(f'{name}{{endpoint="{endpoint}"}} {value}')
+
+        return '\n'.join(lines) + '\n'
+
+
+metrics = RequestMetrics()
+
+
+# ---------------- Per-request accumulators ----------------
+def _stats():
+    """Counters for the current request, or None outside an instrumented request"""
+    if not has_request_context():
+        return None
+    return g.get('_perf')
+
+
+class timed:
+    """
+    Add the wrapped block's duration to the current request's `kind` timer.
+
+        @timed('pdf')
+        def _build(story): ...
+
+        with timed('email'):
+            mail.send(msg)
+
+    A no-op outside an instrumented request (CLI, slip worker processes).
+    """
+
+    def __init__(self, kind):
+        self.kind = kind
+
+    def __enter__(self):
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        stats = _stats()
+        if stats is not None:
+            stats[self.kind] += time.perf_counter() - self._started
+        return False
+
+    def __call__(self, func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with timed(self.kind):
+                return func(*args, **kwargs)
+        return wrapper
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('_query_started', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info['_query_started'].pop()
+    stats = _stats()
+    if stats is not None:
+        stats['sql_count'] += 1
+        stats['sql_time'] += time.perf_counter() - started
+
+
+def _template_started(sender, template, context, **extra):
+    stats = _stats()
+    if stats is not None:
+        stats['_templates'].append(time.perf_counter())
+
+
+def _template_finished(sender, template, context, **extra):
+    stats = _stats()
+    if stats is not None and stats['_templates']:
+        stats['template'] += time.perf_counter() - stats['_templates'].pop()
+
+
+# ---------------- On-demand profiler (admins only) ----------------
+def _requested_profiler():
+    from app.utils.identity import current_identity
+
+    value = request.args.get('_profile') or request.headers.get('X-Profile')
+    if not value or not current_identity('admin'):
+        return None
+    return 'pyinstrument' if value.lower() == 'pyinstrument' else 'cprofile'
+
+
+def _start_profiler(kind):
+    if kind == 'pyinstrument':
+        try:
+            from pyinstrument import Profiler
+        except ImportError:
+            current_app.logger.warning("pyinstrument is not installed, falling back to cProfile")
+        else:
+            profiler = Profiler()
+            profiler.start()
+            return kind, profiler
+
+    profiler = cProfile.Profile()
+    profiler.enable()
+    return 'cprofile', profiler
+
+
+def _profile_response(kind, profiler):
+    if kind == 'pyinstrument':
+        profiler.stop()
+        return current_app.response_class(profiler.output_html(), mimetype='text/html')
+
+    profiler.disable()
+    out = io.StringIO()
+    pstats.Stats(profiler, stream=out).sort_stats('cumulative').print_stats(60)
+    return current_app.response_class(out.getvalue(), mimetype='text/plain')
+
+
+# ---------------- Wiring ----------------
+def metrics_view():
+    from app.utils.identity import current_identity
+
+    token = current_app.config.get('METRICS_TOKEN')
+    authorized = current_identity('admin') or (
+        token and request.headers.get('Authorization') == f'Bearer {token}'
+    )
+    if not authorized:
+        abort(403)
+    return current_app.response_class(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+
+def init_profiling(app):
+    """Install the instrumentation on app when PROFILING_ENABLED is set"""
+    if not app.config.get('PROFILING_ENABLED'):
+        return
+
+    # Engine-class listeners cover every engine Flask-SQLAlchemy creates
+    if not event.contains(Engine, 'before_cursor_execute', _before_cursor_execute):
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+
+    before_render_template.connect(_template_started, app)
+    template_rendered.connect(_template_finished, app)
+
+    @app.before_request
+    def start_request_timer():
+        g._perf = {
+            'started': time.perf_counter(),
+            'sql_count': 0,
+            'sql_time': 0.0,
+            'template': 0.0,
+            '_templates': [],
+            **{kind: 0.0 for kind in TIMED_KINDS},
+        }
+        kind = _requested_profiler()
+        if kind:
+            g._profiler = _start_profiler(kind)
+
+    @app.after_request
+    def record_request(response):
+        stats = g.pop('_perf', None)
+        if stats is not None and request.endpoint != 'metrics':
+            metrics.observe(
+                request.endpoint or 'unmatched',
+                request.method,
+                response.status_code,
+                time.perf_counter() - stats['started'],
+                stats
+            )
+
+        profiler = g.pop('_profiler', None)
+        if profiler:
+            return _profile_response(*profiler)
+        return response
+
+    app.add_url_rule('/metrics', 'metrics', metrics_view)
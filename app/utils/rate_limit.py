@@ -0,0 +1,240 @@
+# app/utils/rate_limit.py
+"""
+Token-bucket rate limiting and load shedding for the public endpoints.
+
+RATE_LIMITS maps an endpoint ("student.student_login") or a whole
+blueprint ("chatbot") to (requests, per_seconds). A limited request must
+find a token in its per-account bucket (logged-in student/admin, or the
+student number / username / email typed into a login or reset form; the
+IP when there is none) and in its per-IP ceiling, if the rule has one.
+Tokens are taken from all of them or from none, so a request refused by
+one bucket doesn't spend the others. A refused request gets a 429 with
+Retry-After.
+
+Buckets live in memory (per worker) or in a SQLite file shared by all
+workers on the host (RATE_LIMIT_BACKEND).
+
+Independently, at most MAX_CONCURRENT_REQUESTS requests per worker may be
+inside the LOAD_SHED_ENDPOINTS at once; the rest get a fast 503 instead
+of queueing up behind the SQLite writer.
+"""
+import math
+import time
+import threading
+
+from flask import g, request, session, jsonify, current_app
+
+from app.utils.sqlite_store import SQLiteStore
+
+# Seconds between sweeps of refilled buckets from the SQLite table
+PURGE_INTERVAL = 300
+
+
+# ---------------- Bucket stores ----------------
+def _refill(tokens, updated, now, capacity, per):
+    return min(capacity, tokens + (now - updated) * capacity / per)
+
+
+def _take_all(buckets, levels):
+    """
+    buckets: [(key, capacity, per)], levels: their refilled token counts.
+    Returns (denied key or None, retry_after, levels after the take); the
+    tokens are only taken when every bucket has one.
+    """
+    denied, retry_after = None, 0
+    for (key, capacity, per), tokens in zip(buckets, levels):
+        if tokens < 1:
+            wait = (1 - tokens) * per / capacity
+            if wait > retry_after or denied is None:
+                denied, retry_after = key, wait
+    if denied is not None:
+        return denied, retry_after, levels
+    return None, 0, [tokens - 1 for tokens in levels]
+
+
+class MemoryBucketStore:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._buckets = {}  # key -> (tokens, updated)
+
+    def take(self, buckets):
+        """Take a token from every (key, capacity, per) or none. Returns (denied key or None, retry_after)."""
+        now = time.monotonic()
+        with self._lock:
+            levels = []
+            for key, capacity, per in buckets:
+                tokens, updated = self._buckets.get(key, (capacity, now))
+                levels.append(_refill(tokens, updated, now, capacity, per))
+            denied, retry_after, levels = _take_all(buckets, levels)
+            for (key, capacity, per), tokens in zip(buckets, levels):
+                self._buckets[key] = (tokens, now)
+            # Full buckets carry no information; drop them to bound memory
+            if len(self._buckets) > 50000:
+                self._buckets = {k: v for k, v in self._buckets.items() if v[0] < capacity - 1}
+        return denied, retry_after
+
+
+class SQLiteBucketStore(SQLiteStore):
+    """Buckets shared by every worker process on this host"""
+
+    schema = """
+        CREATE TABLE IF NOT EXISTS buckets (
+            key TEXT PRIMARY KEY,
+            tokens REAL NOT NULL,
+            updated REAL NOT NULL,
+            expires REAL NOT NULL DEFAULT 0
+        );
+    """
+
+    def __init__(self, path):
+        self._next_purge = 0
+        super().__init__(path)
+
+    def migrate(self, conn):
+        if 'expires' not in {row[1] for row in conn.execute('PRAGMA table_info(buckets)')}:
+            # Files created before expiry was tracked; their rows get purged on the first sweep
+            conn.execute('ALTER TABLE buckets ADD COLUMN expires REAL NOT NULL DEFAULT 0')
+        conn.execute('CREATE INDEX IF NOT EXISTS ix_buckets_expires ON buckets (expires)')
+
+    def take(self, buckets):
+        """Take a token from every (key, capacity, per) or none. Returns (denied key or None, retry_after)."""
+        now = time.time()
+        with self.transaction() as conn:
+            levels = []
+            for key, capacity, per in buckets:
+                row = conn.execute('SELECT tokens, updated FROM buckets WHERE key = ?', (key,)).fetchone()
+                tokens, updated = row if row else (capacity, now)
+                levels.append(_refill(tokens, updated, now, capacity, per))
+            denied, retry_after, levels = _take_all(buckets, levels)
+            for (key, capacity, per), tokens in zip(buckets, levels):
+                # Once refilled, a bucket is the same as no row at all
+                expires = now + (capacity - tokens) * per / capacity
+                conn.execute('INSERT OR REPLACE INTO buckets (key, tokens, updated, expires) VALUES (?, ?, ?, ?)',
+                             (key, tokens, now, expires))
+            if now >= self._next_purge:
+                self._next_purge = now + PURGE_INTERVAL
+                conn.execute('DELETE FROM buckets WHERE expires <= ?', (now,))
+        return denied, retry_after
+
+
+def create_bucket_store(app):
+    if (app.config.get('RATE_LIMIT_BACKEND') or 'memory').lower() == 'sqlite':
+        return SQLiteBucketStore(app.config['RATE_LIMIT_SQLITE_PATH'])
+    return MemoryBucketStore()
+
+
+# ---------------- Request keys ----------------
+# Form fields that name the account a login / reset attempt is aimed at
+ACCOUNT_FIELDS = ('student_number', 'username', 'email')
+
+
+def client_ip():
+    """
+    REMOTE_ADDR, or with RATE_LIMIT_TRUST_PROXY = n the address the n-th
+    proxy from the right saw. Entries further left are client-supplied and
+    never trusted.
+    """
+    hops = int(current_app.config.get('RATE_LIMIT_TRUST_PROXY') or 0)
+    if hops:
+        forwarded = [ip.strip() for ip in request.headers.get('X-Forwarded-For', '').split(',') if ip.strip()]
+        if len(forwarded) >= hops:
+            return forwarded[-hops]
+    return request.remote_addr
+
+
+def account_key(form_account=False):
+    """
+    The account a request counts against: the one named in the form for
+    login/reset endpoints (form_account), else the logged-in student/admin.
+    """
+    if form_account:
+        for field in ACCOUNT_FIELDS:
+            value = request.form.get(field)
+            if value:
+                return f"{field}:{value.strip().lower()}"
+        return None
+    if session.get('student_id'):
+        return f"student:{session['student_id']}"
+    if session.get('user_id'):
+        return f"user:{session['user_id']}"
+    return None
+
+
+def request_buckets(rule_name, rule, ceiling, form_account=False):
+    """[(key, capacity, per)] a request under rule_name must take a token from"""
+    capacity, per = rule
+    ip = client_ip()
+    account = account_key(form_account)
+    buckets = [(f"{rule_name}|{account or f'ip:{ip}'}", capacity, per)]
+    if ceiling:
+        buckets.append((f"{rule_name}|ceiling:{ip}", *ceiling))
+    return buckets
+
+
+def _rule_for(endpoint, limits):
+    if not endpoint:
+        return None, None
+    if endpoint in limits:
+        return endpoint, limits[endpoint]
+    blueprint = endpoint.rsplit('.', 1)[0] if '.' in endpoint else None
+    if blueprint in limits:
+        return blueprint, limits[blueprint]
+    return None, None
+
+
+def _too_many(retry_after, status=429, message="Too many requests. Please wait and try again."):
+    wants_json = request.is_json or request.accept_mimetypes.best == 'application/json' \
+        or request.headers.get('X-Requested-With') == 'XMLHttpRequest'
+    if wants_json:
+        response = jsonify({'success': False, 'error': message})
+    else:
+        response = current_app.response_class(message, mimetype='text/plain')
+    response.status_code = status
+    response.headers['Retry-After'] = str(max(1, math.ceil(retry_after)))
+    return response
+
+
+# ---------------- Wiring ----------------
+def init_rate_limiting(app):
+    """Install the limiter and the concurrency cap when RATE_LIMIT_ENABLED"""
+    if not app.config.get('RATE_LIMIT_ENABLED', True):
+        return
+
+    store = create_bucket_store(app)
+    limits = app.config.get('RATE_LIMITS', {})
+    ceilings = app.config.get('RATE_LIMIT_IP_CEILINGS', {})
+    form_account_endpoints = set(app.config.get('RATE_LIMIT_FORM_ACCOUNT_ENDPOINTS', ()))
+    methods = set(app.config.get('RATE_LIMIT_METHODS', ('POST',)))
+    shed_endpoints = set(app.config.get('LOAD_SHED_ENDPOINTS', ()))
+    max_concurrent = app.config.get('MAX_CONCURRENT_REQUESTS')
+    slots = threading.BoundedSemaphore(max_concurrent) if max_concurrent else None
+
+    @app.before_request
+    def rate_limit():
+        if request.method not in methods:
+            return None
+        rule_name, rule = _rule_for(request.endpoint, limits)
+        if rule is None:
+            return None
+
+        buckets = request_buckets(rule_name, rule, ceilings.get(rule_name),
+                                  form_account=request.endpoint in form_account_endpoints)
+        denied, retry_after = store.take(buckets)
+        if denied is not None:
+            current_app.logger.warning(f"Rate limit hit: {denied}")
+            return _too_many(retry_after)
+        return None
+
+    @app.before_request
+    def shed_load():
+        if slots is None or request.endpoint not in shed_endpoints:
+            return None
+        if not slots.acquire(blocking=False):
+            return _too_many(1, status=503, message="The server is busy. Please try again in a moment.")
+        g._shed_slot = True
+        return None
+
+    @app.teardown_request
+    def release_slot(exception=None):
+        if g.pop('_shed_slot', None):
+            slots.release()
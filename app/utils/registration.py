@@ -0,0 +1,206 @@
+# app/utils/registration.py
+"""
+Registration submission service.
+
+create_registration() does the whole write in three statements:
+
+1. one SELECT checking every course id against the program's curriculum
+   (ProgramCourse) for that year and semester
+2. the StudentRegistration INSERT, whose uniqueness per
+   (student, program, year, semester) is enforced by the database
+   (uq_student_registration_term) instead of a check-then-insert
+3. one multi-row INSERT for all RegisteredCourse rows
+
+create_registration_with_payment() adds the payment slip and its Payment
+row to the same transaction, for the dashboard's single submit request.
+
+Problems are raised as RegistrationError (400) or RegistrationConflict
+(409) with a message that can go straight back to the student.
+"""
+import os
+import uuid
+import shutil
+import tempfile
+from datetime import datetime
+
+from sqlalchemy import select, insert
+from sqlalchemy.exc import IntegrityError
+from werkzeug.utils import secure_filename
+
+from app.extensions import db
+from app.models import Payment
+from app.models_academics import ProgramCourse, StudentRegistration, RegisteredCourse
+from app.utils.helpers import allowed_file
+from app.utils.student_status import refresh_student_status
+
+SEMESTER_TYPES = {
+    'Semester 1': 'SEM1',
+    'Semester 2': 'SEM2',
+    'Summer Semester': 'SUMMER',
+    'Industrial Attachment': 'INDUSTRIAL'
+}
+
+UPLOAD_CHUNK_SIZE = 64 * 1024
+
+
+class RegistrationError(Exception):
+    status = 400
+
+    def __init__(self, message, **details):
+        super().__init__(message)
+        self.message = message
+        self.details = details
+
+
+class RegistrationConflict(RegistrationError):
+    status = 409
+
+
+def semester_type_for(value):
+    """'Semester 2' or 'SEM2' -> 'SEM2' (unknown values fall back to SEM1, like the lookup routes)"""
+    if value in SEMESTER_TYPES.values():
+        return value
+    return SEMESTER_TYPES.get(value, 'SEM1')
+
+
+def _as_int(value, field):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise RegistrationError(f"Invalid {field}")
+
+
+def validate_courses(program_id, year_level, semester_type, course_ids):
+    """Deduplicated course ids, all offered for this program/year/semester (one query)"""
+    course_ids = list(dict.fromkeys(_as_int(course_id, 'course id') for course_id in course_ids))
+    if not course_ids:
+        return []
+
+    offered = set(db.session.execute(
+        select(ProgramCourse.course_id).where(
+            ProgramCourse.program_id == program_id,
+            ProgramCourse.year_level == year_level,
+            ProgramCourse.semester_type == semester_type,
+            ProgramCourse.course_id.in_(course_ids)
+        )
+    ).scalars())
+
+    invalid = [course_id for course_id in course_ids if course_id not in offered]
+    if invalid:
+        raise RegistrationError(
+            'Some selected courses are not offered for this program, year and semester',
+            invalid_courses=invalid
+        )
+    return course_ids
+
+
+def _is_term_conflict(error):
+    # SQLite names the columns, PostgreSQL/MySQL name the index
+    message = str(error.orig)
+    return 'uq_student_registration_term' in message or (
+        'UNIQUE' in message and 'student_registration.' in message
+    )
+
+
+def _registration_fields(program_id, year_level, semester_type, course_ids):
+    program_id = _as_int(program_id, 'program')
+    year_level = _as_int(year_level, 'year level')
+    semester_type = semester_type_for(semester_type)
+    course_ids = validate_courses(program_id, year_level, semester_type, course_ids or [])
+    return program_id, year_level, semester_type, course_ids
+
+
+def _add_registration(student_id, program_id, year_level, semester_type, course_ids):
+    """INSERT the registration and its courses into the current transaction (no commit)"""
+    registration = StudentRegistration(
+        student_id=student_id,
+        program_id=program_id,
+        year_level=year_level,
+        semester_type=semester_type,
+        payment_status='pending'
+    )
+    db.session.add(registration)
+    db.session.flush()
+
+    if course_ids:
+        db.session.execute(insert(RegisteredCourse.__table__).values([
+            {'registration_id': registration.id, 'course_id': course_id}
+            for course_id in course_ids
+        ]))
+    return registration
+
+
+def create_registration(student_id, program_id, year_level, semester_type, course_ids):
+    """Create a pending registration with its courses and commit. Returns the StudentRegistration."""
+    fields = _registration_fields(program_id, year_level, semester_type, course_ids)
+    try:
+        registration = _add_registration(student_id, *fields)
+        refresh_student_status(student_id)
+        db.session.commit()
+    except IntegrityError as e:
+        db.session.rollback()
+        if _is_term_conflict(e):
+            raise RegistrationConflict('Application already submitted for this selection')
+        raise
+
+    return registration
+
+
+# ---------------- Registration + payment in one transaction ----------------
+def _stream_to_temp(file_storage, folder):
+    """Copy an upload to a hidden temp file in folder chunk by chunk. Returns its path."""
+    os.makedirs(folder, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(prefix='.upload.', suffix='.part', dir=folder)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            shutil.copyfileobj(file_storage.stream, f, UPLOAD_CHUNK_SIZE)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return tmp_path
+
+
+def create_registration_with_payment(student_id, payment_slip, upload_folder,
+                                     program_id, year_level, semester_type, course_ids):
+    """
+    Store the payment slip and create the pending Payment, StudentRegistration
+    and RegisteredCourse rows in one commit. Returns (payment, registration).
+
+    Either everything is saved or nothing is: the slip only gets its final
+    name once the rows are flushed, and is deleted again if the commit fails.
+    """
+    if not payment_slip or not payment_slip.filename:
+        raise RegistrationError('Please upload a payment slip.')
+    if not allowed_file(payment_slip.filename):
+        raise RegistrationError('Invalid file format. Please upload an image or PDF.')
+
+    # Cheap checks first so a bad selection never touches the disk
+    fields = _registration_fields(program_id, year_level, semester_type, course_ids)
+
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    filename = f"{timestamp}_{uuid.uuid4().hex[:8]}_{secure_filename(payment_slip.filename)}"
+    final_path = os.path.join(upload_folder, filename)
+    tmp_path = _stream_to_temp(payment_slip, upload_folder)
+
+    try:
+        payment = Payment(
+            slip_filename=filename,
+            student_id=student_id,
+            status='pending',
+            submitted_date=datetime.utcnow()
+        )
+        db.session.add(payment)
+        registration = _add_registration(student_id, *fields)
+        refresh_student_status(student_id)
+        os.replace(tmp_path, final_path)
+        db.session.commit()
+    except BaseException as e:
+        db.session.rollback()
+        for path in (tmp_path, final_path):
+            if os.path.exists(path):
+                os.unlink(path)
+        if isinstance(e, IntegrityError) and _is_term_conflict(e):
+            raise RegistrationConflict('Application already submitted for this selection')
+        raise
+
+    return payment, registration
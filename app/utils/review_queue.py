@@ -0,0 +1,176 @@
+# app/utils/review_queue.py
+"""
+Payment review queue: reviewers claim work instead of racing on one list.
+
+claim_payments() hands a reviewer up to N pending payments that nobody
+else holds, each with a lease until now + REVIEW_LEASE_SECONDS. Leases
+are plain columns (Payment.claimed_by / claimed_until), so an expired
+lease simply makes the payment claimable again - no cleanup job.
+
+How a claim stays exclusive depends on the database:
+
+- PostgreSQL / MySQL: SELECT ... FOR UPDATE SKIP LOCKED picks the rows, so
+  concurrent reviewers skip each other's candidates instead of waiting on
+  them, then the lease is written in the same transaction
+- SQLite: writers are serialized, so one UPDATE ... WHERE id IN (SELECT
+  ... LIMIT n) that re-checks the lease is atomic on its own
+
+Deciding a payment clears the lease and records reviewed_by, which is what
+reviewer_throughput() counts.
+"""
+from datetime import datetime, timedelta
+
+from sqlalchemy import select, update, or_, and_, func, case
+from sqlalchemy.orm import joinedload
+
+from app.extensions import db
+from app.models import Payment, User
+
+SKIP_LOCKED_DIALECTS = ('postgresql', 'mysql')
+
+
+class ClaimConflict(Exception):
+    """The payment is leased to another reviewer"""
+
+    def __init__(self, holder_id, until):
+        super().__init__(f"Payment is being reviewed by another admin until {until:%H:%M} UTC")
+        self.holder_id = holder_id
+        self.until = until
+
+
+def _claimable(now):
+    return and_(
+        Payment.status == 'pending',
+        or_(Payment.claimed_until.is_(None), Payment.claimed_until < now)
+    )
+
+
+def claim_payments(reviewer_id, limit, lease_seconds):
+    """
+    The reviewer's pending payments, topped up to `limit` with new claims.
+    Renews the lease on the ones they already hold. Commits.
+    """
+    now = datetime.utcnow()
+    until = now + timedelta(seconds=lease_seconds)
+
+    held = db.session.execute(
+        update(Payment)
+        .where(Payment.status == 'pending', Payment.claimed_by == reviewer_id, Payment.claimed_until >= now)
+        .values(claimed_until=until)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    wanted = max(0, limit - held)
+
+    if wanted:
+        oldest_first = (Payment.submitted_date, Payment.id)
+        if db.session.get_bind().dialect.name in SKIP_LOCKED_DIALECTS:
+            ids = db.session.execute(
+                select(Payment.id).where(_claimable(now)).order_by(*oldest_first)
+                .limit(wanted).with_for_update(skip_locked=True)
+            ).scalars().all()
+            if ids:
+                db.session.execute(
+                    update(Payment).where(Payment.id.in_(ids))
+                    .values(claimed_by=reviewer_id, claimed_until=until)
+                    .execution_options(synchronize_session=False)
+                )
+        else:
+            candidates = select(Payment.id).where(_claimable(now)).order_by(*oldest_first).limit(wanted)
+            db.session.execute(
+                update(Payment).where(Payment.id.in_(candidates.scalar_subquery()), _claimable(now))
+                .values(claimed_by=reviewer_id, claimed_until=until)
+                .execution_options(synchronize_session=False)
+            )
+    db.session.commit()
+
+    return Payment.query.options(joinedload(Payment.student)).filter(
+        Payment.status == 'pending',
+        Payment.claimed_by == reviewer_id,
+        Payment.claimed_until >= now
+    ).order_by(Payment.submitted_date, Payment.id).all()
+
+
+def check_claim(payment, reviewer_id):
+    """Raise ClaimConflict if someone else holds a live lease on payment"""
+    if payment.claimed_by and payment.claimed_by != reviewer_id \
+            and payment.claimed_until and payment.claimed_until >= datetime.utcnow():
+        raise ClaimConflict(payment.claimed_by, payment.claimed_until)
+
+
+def release_claim(payment_id, reviewer_id):
+    """Give a payment back to the queue. True if the reviewer held it. Commits."""
+    released = db.session.execute(
+        update(Payment)
+        .where(Payment.id == payment_id, Payment.claimed_by == reviewer_id)
+        .values(claimed_by=None, claimed_until=None)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    db.session.commit()
+    return bool(released)
+
+
+def mark_reviewed(payment, reviewer_id):
+    """Record the decision maker and drop the lease (caller commits)"""
+    payment.reviewed_by = reviewer_id
+    payment.claimed_by = None
+    payment.claimed_until = None
+
+
+def reviewer_throughput(hours=8):
+    """[{reviewer, approved, rejected, total, per_hour, holding}] for the last `hours`"""
+    now = datetime.utcnow()
+    since = now - timedelta(hours=hours)
+
+    decided = db.session.execute(
+        select(
+            Payment.reviewed_by,
+            func.sum(case((Payment.status == 'approved', 1), else_=0)),
+            func.sum(case((Payment.status == 'rejected', 1), else_=0)),
+            func.count(Payment.id),
+            func.min(Payment.approved_date)
+        )
+        .where(Payment.reviewed_by.isnot(None), Payment.approved_date >= since)
+        .group_by(Payment.reviewed_by)
+    ).all()
+    holding = dict(db.session.execute(
+        select(Payment.claimed_by, func.count(Payment.id))
+        .where(Payment.status == 'pending', Payment.claimed_by.isnot(None), Payment.claimed_until >= now)
+        .group_by(Payment.claimed_by)
+    ).all())
+
+    reviewer_ids = {row[0] for row in decided} | set(holding)
+    names = dict(db.session.execute(
+        select(User.id, User.username).where(User.id.in_(reviewer_ids))
+    ).all()) if reviewer_ids else {}
+
+    stats = []
+    for reviewer_id, approved, rejected, total, first in decided:
+        # Rate over the time they have actually been reviewing in this window
+        active_hours = max((now - first).total_seconds() / 3600, 1 / 60)
+        stats.append({
+            'reviewer_id': reviewer_id,
+            'reviewer': names.get(reviewer_id, f"#{reviewer_id}"),
+            'approved': approved or 0,
+            'rejected': rejected or 0,
+            'total': total,
+            'per_hour': round(total / active_hours, 1),
+            'holding': holding.pop(reviewer_id, 0),
+        })
+    for reviewer_id, count in holding.items():
+        stats.append({
+            'reviewer_id': reviewer_id, 'reviewer': names.get(reviewer_id, f"#{reviewer_id}"),
+            'approved': 0, 'rejected': 0, 'total': 0, 'per_hour': 0.0, 'holding': count,
+        })
+    return sorted(stats, key=lambda s: -s['total'])
+
+
+def queue_depth():
+    """(pending payments, of which currently leased)"""
+    now = datetime.utcnow()
+    pending, leased = db.session.execute(
+        select(
+            func.count(Payment.id),
+            func.sum(case((and_(Payment.claimed_by.isnot(None), Payment.claimed_until >= now), 1), else_=0))
+        ).where(Payment.status == 'pending')
+    ).one()
+    return pending, leased or 0
@@ -0,0 +1,382 @@
+# app/utils/sessions.py
+"""
+Server-side sessions (SESSION_BACKEND).
+
+The cookie only carries a signed random session id; the session dict
+lives in a store and is written back only when it changes. Expiry is
+sliding: every request pushes it SESSION_IDLE_TIMEOUT seconds ahead,
+at most once per SESSION_TOUCH_INTERVAL.
+
+Backends:
+- "cookie": Flask's default signed-cookie session (no server state)
+- "memory": per-process dict; single-worker development only
+- "sqlite": a small SQLite file (SESSION_SQLITE_PATH) shared by every
+  worker on one machine
+- "redis":  SESSION_REDIS_URL, shared by every node. `local://` uses an
+  in-process stand-in with the same commands, for development and tests;
+  any other URL needs the `redis` package or the app refuses to start
+
+Each stored session is indexed by its owner ("student:<id>",
+"user:<id>"), so revoke_sessions() can log a student or admin out
+everywhere, e.g. after a password reset.
+
+Logging in, logging out and a role change call regenerate_session(): the
+session keeps its data under a new id and the old server-side record is
+deleted, so an id planted or captured before login is worthless after.
+"""
+import time
+import zlib
+import secrets
+import threading
+
+from flask import current_app, has_app_context, session as flask_session
+from flask.sessions import SessionInterface, SessionMixin, session_json_serializer
+from itsdangerous import Signer, BadSignature
+from werkzeug.datastructures import CallbackDict
+
+from app.utils.sqlite_store import SQLiteStore
+
+
+# ---------------- Serialization ----------------
+# Flask's tagged JSON (keeps flashes, Markup, datetimes) with zlib for larger payloads
+COMPRESS_OVER = 512
+
+
+def encode_session(data):
+    raw = session_json_serializer.dumps(dict(data)).encode('utf-8')
+    if len(raw) > COMPRESS_OVER:
+        return b'z' + zlib.compress(raw)
+    return b'j' + raw
+
+
+def decode_session(blob):
+    if isinstance(blob, str):
+        blob = blob.encode('utf-8')
+    kind, body = blob[:1], blob[1:]
+    if kind == b'z':
+        body = zlib.decompress(body)
+    return session_json_serializer.loads(body.decode('utf-8'))
+
+
+def session_owners(data):
+    owners = []
+    if data.get('student_id'):
+        owners.append(f"student:{data['student_id']}")
+    if data.get('user_id'):
+        owners.append(f"user:{data['user_id']}")
+    return owners
+
+
+# ---------------- Stores ----------------
+class SQLiteSessionStore(SQLiteStore):
+    """Sessions in a local SQLite file; safe across worker processes on one host"""
+
+    schema = """
+        CREATE TABLE IF NOT EXISTS sessions (
+            sid TEXT PRIMARY KEY,
+            data BLOB NOT NULL,
+            expires REAL NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS session_owners (
+            owner TEXT NOT NULL,
+            sid TEXT NOT NULL,
+            PRIMARY KEY (owner, sid)
+        );
+        CREATE INDEX IF NOT EXISTS ix_sessions_expires ON sessions (expires);
+        CREATE INDEX IF NOT EXISTS ix_session_owners_sid ON session_owners (sid);
+    """
+
+    def get(self, sid):
+        row = self.conn().execute(
+            'SELECT data, expires FROM sessions WHERE sid = ? AND expires > ?', (sid, time.time())
+        ).fetchone()
+        return (row[0], row[1]) if row else None
+
+    def set(self, sid, data, ttl, owners):
+        with self.transaction() as conn:
+            conn.execute('INSERT OR REPLACE INTO sessions (sid, data, expires) VALUES (?, ?, ?)',
+                         (sid, data, time.time() + ttl))
+            conn.execute('DELETE FROM session_owners WHERE sid = ?', (sid,))
+            conn.executemany('INSERT OR IGNORE INTO session_owners (owner, sid) VALUES (?, ?)',
+                             [(owner, sid) for owner in owners])
+            # Opportunistic cleanup instead of a cron job
+            if secrets.randbelow(100) == 0:
+                self._purge(conn)
+
+    def touch(self, sid, ttl, owners):
+        self.conn().execute('UPDATE sessions SET expires = ? WHERE sid = ?', (time.time() + ttl, sid))
+
+    def delete(self, sid):
+        with self.transaction() as conn:
+            conn.execute('DELETE FROM sessions WHERE sid = ?', (sid,))
+            conn.execute('DELETE FROM session_owners WHERE sid = ?', (sid,))
+
+    def delete_owner(self, owner):
+        with self.transaction() as conn:
+            sids = [row[0] for row in conn.execute('SELECT sid FROM session_owners WHERE owner = ?', (owner,))]
+            conn.executemany('DELETE FROM sessions WHERE sid = ?', [(sid,) for sid in sids])
+            conn.executemany('DELETE FROM session_owners WHERE sid = ?', [(sid,) for sid in sids])
+        return len(sids)
+
+    def _purge(self, conn):
+        conn.execute('DELETE FROM session_owners WHERE sid IN (SELECT sid FROM sessions WHERE expires <= ?)',
+                     (time.time(),))
+        conn.execute('DELETE FROM sessions WHERE expires <= ?', (time.time(),))
+
+
+class LocalRedis:
+    """
+    In-process stand-in for the handful of Redis commands RedisSessionStore uses.
+    Also backs the "memory" backend.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._values = {}   # key -> (value, expires_at or None)
+
+    def _live(self, key):
+        entry = self._values.get(key)
+        if entry and entry[1] is not None and entry[1] <= time.time():
+            del self._values[key]
+            return None
+        return entry
+
+    def get(self, key):
+        with self._lock:
+            entry = self._live(key)
+            return entry[0] if entry and isinstance(entry[0], bytes) else None
+
+    def ttl(self, key):
+        with self._lock:
+            entry = self._live(key)
+            if entry is None:
+                return -2
+            return -1 if entry[1] is None else max(0, int(entry[1] - time.time()))
+
+    def setex(self, key, seconds, value):
+        with self._lock:
+            self._values[key] = (value, time.time() + seconds)
+
+    def expire(self, key, seconds):
+        with self._lock:
+            entry = self._live(key)
+            if entry:
+                self._values[key] = (entry[0], time.time() + seconds)
+            return bool(entry)
+
+    def delete(self, *keys):
+        with self._lock:
+            return sum(1 for key in keys if self._values.pop(key, None) is not None)
+
+    def sadd(self, key, *members):
+        with self._lock:
+            entry = self._live(key)
+            current, expires = entry if entry else (set(), None)
+            current = set(current) | set(members)
+            self._values[key] = (current, expires)
+
+    def smembers(self, key):
+        with self._lock:
+            entry = self._live(key)
+            return set(entry[0]) if entry else set()
+
+
+class RedisSessionStore:
+    """Sessions as `<prefix>s:<sid>` keys with native TTLs; owner sets for bulk logout"""
+
+    def __init__(self, client, prefix='cavendish:'):
+        self.client = client
+        self.prefix = prefix
+
+    def _key(self, sid):
+        return f"{self.prefix}s:{sid}"
+
+    def _owner_key(self, owner):
+        return f"{self.prefix}o:{owner}"
+
+    def get(self, sid):
+        data = self.client.get(self._key(sid))
+        if data is None:
+            return None
+        return data, time.time() + max(0, self.client.ttl(self._key(sid)))
+
+    def set(self, sid, data, ttl, owners):
+        self.client.setex(self._key(sid), int(ttl), data)
+        for owner in owners:
+            self.client.sadd(self._owner_key(owner), sid)
+            self.client.expire(self._owner_key(owner), int(ttl))
+
+    def touch(self, sid, ttl, owners):
+        self.client.expire(self._key(sid), int(ttl))
+        # Every session lives `ttl` past its last set/touch, so pushing the
+        # owner set out as well keeps it alive as long as its newest session
+        # (re-adding the sid heals sets that already expired)
+        for owner in owners:
+            self.client.sadd(self._owner_key(owner), sid)
+            self.client.expire(self._owner_key(owner), int(ttl))
+
+    def delete(self, sid):
+        self.client.delete(self._key(sid))
+
+    def delete_owner(self, owner):
+        sids = [sid.decode() if isinstance(sid, bytes) else sid
+                for sid in self.client.smembers(self._owner_key(owner))]
+        if sids:
+            self.client.delete(*[self._key(sid) for sid in sids])
+        self.client.delete(self._owner_key(owner))
+        return len(sids)
+
+
+def _redis_client(url):
+    if not url or url.startswith('local://'):
+        return LocalRedis()
+    try:
+        import redis
+    except ImportError:
+        # A per-process stand-in would silently split sessions between workers
+        raise RuntimeError("SESSION_BACKEND is 'redis' but the redis package is not installed; "
+                           "install it or set SESSION_REDIS_URL=local:// for development")
+    return redis.Redis.from_url(url)
+
+
+def create_session_store(app):
+    backend = (app.config.get('SESSION_BACKEND') or 'cookie').lower()
+    if backend == 'sqlite':
+        return SQLiteSessionStore(app.config['SESSION_SQLITE_PATH'])
+    if backend == 'redis':
+        return RedisSessionStore(_redis_client(app.config.get('SESSION_REDIS_URL')),
+                                 prefix=app.config.get('SESSION_KEY_PREFIX', 'cavendish:'))
+    if backend == 'memory':
+        return RedisSessionStore(LocalRedis())
+    return None
+
+
+# ---------------- Flask session interface ----------------
+class ServerSideSession(CallbackDict, SessionMixin):
+    def __init__(self, initial=None, sid=None, new=False, expires=None):
+        def on_update(self):
+            self.modified = True
+            self.accessed = True
+
+        super().__init__(initial, on_update)
+        self.sid = sid
+        self.new = new
+        self.expires = expires
+        self.modified = False
+        self.accessed = False
+        self.previous_sid = None
+
+    def regenerate(self):
+        """Move the data to a fresh id; the old record is deleted on save"""
+        if not self.new and self.previous_sid is None:
+            self.previous_sid = self.sid
+        self.sid = secrets.token_urlsafe(32)
+        self.new = True
+        self.modified = True
+
+    def __getitem__(self, key):
+        self.accessed = True
+        return super().__getitem__(key)
+
+    def get(self, key, default=None):
+        self.accessed = True
+        return super().get(key, default)
+
+    def setdefault(self, key, default=None):
+        self.accessed = True
+        return super().setdefault(key, default)
+
+
+class ServerSideSessionInterface(SessionInterface):
+    session_class = ServerSideSession
+
+    def __init__(self, store):
+        self.store = store
+
+    def _signer(self, app):
+        return Signer(app.secret_key, salt='server-side-session')
+
+    def open_session(self, app, request):
+        cookie = request.cookies.get(self.get_cookie_name(app))
+        if cookie:
+            try:
+                sid = self._signer(app).unsign(cookie).decode()
+            except BadSignature:
+                sid = None
+            record = self.store.get(sid) if sid else None
+            if record:
+                data, expires = record
+                try:
+                    return self.session_class(decode_session(data), sid=sid, expires=expires)
+                except ValueError:
+                    pass
+        return self.session_class(sid=secrets.token_urlsafe(32), new=True)
+
+    def save_session(self, app, session, response):
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+
+        if session.accessed:
+            response.vary.add('Cookie')
+
+        if session.previous_sid:
+            self.store.delete(session.previous_sid)
+
+        if not session:
+            if not session.new:
+                self.store.delete(session.sid)
+            if not session.new or session.previous_sid:
+                response.delete_cookie(name, domain=domain, path=path)
+            return
+
+        idle = app.config.get('SESSION_IDLE_TIMEOUT', 7200)
+        if session.new or session.modified:
+            self.store.set(session.sid, encode_session(session), idle, session_owners(session))
+        elif session.expires is not None:
+            # Sliding expiry without a write on every single request
+            touch_interval = app.config.get('SESSION_TOUCH_INTERVAL', 60)
+            if session.expires - time.time() < idle - touch_interval:
+                self.store.touch(session.sid, idle, session_owners(session))
+
+        # The cookie is only signed and sent for a new (or regenerated) id
+        if session.new:
+            response.set_cookie(
+                name,
+                self._signer(app).sign(session.sid).decode(),
+                expires=self.get_expiration_time(app, session),
+                httponly=self.get_cookie_httponly(app),
+                domain=domain,
+                path=path,
+                secure=self.get_cookie_secure(app),
+                samesite=self.get_cookie_samesite(app),
+            )
+
+
+def init_sessions(app):
+    """Swap in the server-side session interface unless SESSION_BACKEND is "cookie" """
+    store = create_session_store(app)
+    if store is not None:
+        app.session_interface = ServerSideSessionInterface(store)
+
+
+def regenerate_session():
+    """New session id for the current request's session (login, logout, role change)"""
+    if isinstance(flask_session._get_current_object(), ServerSideSession):
+        flask_session.regenerate()
+
+
+def revoke_sessions(user_id=None, student_id=None):
+    """Log a user/student out of every session. No-op with cookie sessions."""
+    if not has_app_context():
+        return 0
+    interface = current_app.session_interface
+    if not isinstance(interface, ServerSideSessionInterface):
+        return 0
+
+    revoked = 0
+    if user_id is not None:
+        revoked += interface.store.delete_owner(f"user:{user_id}")
+    if student_id is not None:
+        revoked += interface.store.delete_owner(f"student:{student_id}")
+    return revoked
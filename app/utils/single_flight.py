@@ -0,0 +1,210 @@
+# app/utils/single_flight.py
+"""
+Single-flight: concurrent calls for the same key run the work once.
+
+The first caller for a key (the leader) runs fn; callers arriving while
+it runs wait and get the leader's result, or its exception. Nothing is
+cached afterwards: the next call after the leader finishes runs again.
+
+Keys should describe the inputs completely (see flight_key(), which
+hashes the render context), so waiters can never receive output built
+from different data.
+
+Across processes (SINGLE_FLIGHT_BACKEND):
+
+- "process": in-process only (the default)
+- "file":    the leader also takes an flock on a lock file in
+             SINGLE_FLIGHT_DIR. A bytes result is left next to it while
+             workers are waiting on the lock, so they reuse it instead of
+             rendering again (one render per host). Whoever holds the lock
+             last removes it; a periodic sweep removes files left behind by
+             workers that died.
+- "db":      the leader holds a PostgreSQL advisory lock while it runs, so
+             nodes sharing the database never run the same work at the same
+             time (results are not shared between nodes). Other databases
+             fall back to "file".
+"""
+import os
+import json
+import time
+import hashlib
+import tempfile
+import threading
+
+from flask import current_app
+
+try:
+    import fcntl
+except ImportError:  # Windows: in-process coalescing only
+    fcntl = None
+
+RESULT_MAX_AGE = 10 * 60  # leftover result files older than this are removed
+SWEEP_INTERVAL = 5 * 60   # how often a worker looks for them
+
+
+def flight_key(kind, payload):
+    """'kind:<sha1 of payload>' for a JSON-able payload (datetimes are stringified)"""
+    digest = hashlib.sha1(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+    return f"{kind}:{digest}"
+
+
+class _Call:
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    def __init__(self, backend='process', lock_dir=None, engine=None):
+        self.backend = backend
+        self.lock_dir = lock_dir
+        self.engine = engine
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.stats = {'runs': 0, 'shared': 0, 'reused': 0}
+        self._last_sweep = 0.0
+        if backend in ('file', 'db') and lock_dir:
+            os.makedirs(lock_dir, exist_ok=True)
+
+    def do(self, key, fn):
+        """fn() once for all concurrent callers with this key; returns its result"""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            call.done.wait()
+            with self._lock:
+                self.stats['shared'] += 1
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = self._run(key, fn)
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+    # ---------------- Cross-process ----------------
+    def _run(self, key, fn):
+        if self.backend == 'db' and self.engine is not None and self.engine.dialect.name == 'postgresql':
+            return self._run_advisory(key, fn)
+        if self.backend in ('file', 'db') and self.lock_dir and fcntl is not None:
+            return self._run_file_locked(key, fn)
+        return self._count(fn)
+
+    def _count(self, fn):
+        with self._lock:
+            self.stats['runs'] += 1
+        return fn()
+
+    def _run_advisory(self, key, fn):
+        from sqlalchemy import text
+
+        lock_id = int.from_bytes(hashlib.sha1(key.encode()).digest()[:8], 'big', signed=True)
+        with self.engine.connect() as conn:
+            conn.execute(text('SELECT pg_advisory_lock(:id)'), {'id': lock_id})
+            try:
+                return self._count(fn)
+            finally:
+                conn.execute(text('SELECT pg_advisory_unlock(:id)'), {'id': lock_id})
+                conn.commit()
+
+    def _run_file_locked(self, key, fn):
+        started = time.time()
+        digest = hashlib.sha1(key.encode()).hexdigest()
+        result_path = os.path.join(self.lock_dir, digest + '.out')
+        # 256 lock files shared by all keys; lock files are never deleted,
+        # which would let two workers hold "the same" lock
+        lock_path = os.path.join(self.lock_dir, digest[:2] + '.lock')
+        # Byte of the lock file that this key's waiters hold a shared POSIX
+        # lock on. Closing any handle of the file drops a process's POSIX
+        # locks, so a marker can go early; that worker then renders again.
+        waiting = int(digest[2:15], 16)
+
+        with open(lock_path, 'a+b') as lock_file:
+            fcntl.lockf(lock_file, fcntl.LOCK_SH, 1, waiting)
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            fcntl.lockf(lock_file, fcntl.LOCK_UN, 1, waiting)
+            try:
+                # Another worker finished this while we waited for the lock
+                try:
+                    if os.stat(result_path).st_mtime >= started:
+                        with open(result_path, 'rb') as f:
+                            result = f.read()
+                        with self._lock:
+                            self.stats['reused'] += 1
+                        return result
+                except FileNotFoundError:
+                    pass
+
+                result = self._count(fn)
+                if isinstance(result, bytes):
+                    fd, tmp_path = tempfile.mkstemp(dir=self.lock_dir, suffix='.tmp')
+                    with os.fdopen(fd, 'wb') as f:
+                        f.write(result)
+                    os.replace(tmp_path, result_path)
+                return result
+            finally:
+                self._drop_unwanted(lock_file, waiting, result_path)
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+                if started - self._last_sweep > SWEEP_INTERVAL:
+                    self._last_sweep = started
+                    self._sweep(started)
+
+    def _drop_unwanted(self, lock_file, waiting, result_path):
+        """Remove the result once no other worker is waiting for this key"""
+        try:
+            fcntl.lockf(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB, 1, waiting)
+        except OSError:
+            return  # the last waiter removes it
+        try:
+            os.unlink(result_path)
+        except FileNotFoundError:
+            pass
+        finally:
+            fcntl.lockf(lock_file, fcntl.LOCK_UN, 1, waiting)
+
+    def _sweep(self, now):
+        """Result/temp files left behind by workers that died mid-render"""
+        for name in os.listdir(self.lock_dir):
+            path = os.path.join(self.lock_dir, name)
+            try:
+                if name.endswith(('.out', '.tmp')) and now - os.stat(path).st_mtime > RESULT_MAX_AGE:
+                    os.unlink(path)
+            except OSError:
+                pass
+
+
+_fallback = SingleFlight()
+
+
+def single_flight(key, fn):
+    """Run fn through the app's SingleFlight (in-process only outside an app)"""
+    try:
+        flight = current_app.extensions.get('single_flight', _fallback)
+    except RuntimeError:
+        flight = _fallback
+    return flight.do(key, fn)
+
+
+def init_single_flight(app):
+    from app.extensions import db
+
+    backend = (app.config.get('SINGLE_FLIGHT_BACKEND') or 'process').lower()
+    engine = None
+    if backend == 'db':
+        with app.app_context():
+            engine = db.engine
+    app.extensions['single_flight'] = SingleFlight(backend, app.config.get('SINGLE_FLIGHT_DIR'), engine)
@@ -0,0 +1,428 @@
+# app/utils/slip_batch.py
+"""
+Batch (re)generation of admin-issued registration slips for a whole intake.
+
+Used by the `flask slips generate` CLI command and the admin
+"Batch Generate" action. Rendering runs across a process pool; the
+RegistrationSlip.pdf_filename column is bulk-updated once at the end.
+
+Admin-started jobs run in a thread of the web worker that received the
+request, so their pool always uses "spawn" (forking a threaded server is
+unsafe). Their progress lives in a job store - "sqlite"
+(SLIP_BATCH_JOB_SQLITE_PATH, shared by the workers on one host) or
+"memory" (per worker) - so any worker can answer the status poll.
+"""
+import os
+import json
+import time
+import threading
+import uuid
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+
+from flask import current_app
+from sqlalchemy import update, bindparam
+
+from app.extensions import db
+from app.models import Student, RegistrationSlip
+from app.models_academics import StudentRegistration, AcademicYear
+from app.utils.student_status import refresh_student_status
+from app.utils.loading_profiles import profiled
+from app.utils.sqlite_store import SQLiteStore
+
+SEMESTER_LABELS = {
+    'SEM1': 'Semester 1',
+    'SEM2': 'Semester 2',
+    'SUMMER': 'Summer Semester',
+    'INDUSTRIAL': 'Industrial Attachment'
+}
+
+# Finished/failed admin jobs are kept this long for the status page
+JOB_TTL = 24 * 3600
+
+
+# ---------------- Selecting students ----------------
+def select_registrations(program_id=None, year_level=None, semester_type=None,
+                         academic_year=None, payment_status='approved'):
+    """
+    Latest matching StudentRegistration per student.
+
+    academic_year may be an AcademicYear id or its name ("2025/2026").
+    payment_status=None matches any status.
+    """
+    # Program/faculty/academic year names are joined in; courses aren't needed
+    query = profiled(StudentRegistration, 'admin_list')
+
+    if program_id:
+        query = query.filter(StudentRegistration.program_id == program_id)
+    if year_level:
+        query = query.filter(StudentRegistration.year_level == year_level)
+    if semester_type:
+        query = query.filter(StudentRegistration.semester_type == semester_type)
+    if payment_status:
+        query = query.filter(StudentRegistration.payment_status == payment_status)
+    if academic_year:
+        if str(academic_year).isdigit():
+            query = query.filter(StudentRegistration.academic_year_id == int(academic_year))
+        else:
+            query = query.join(AcademicYear).filter(AcademicYear.name == academic_year)
+
+    latest = {}
+    for registration in query.order_by(StudentRegistration.id).all():
+        latest[registration.student_id] = registration
+    return list(latest.values())
+
+
+def build_jobs(registrations, created_by='batch', refresh_details=False):
+    """
+    Turn registrations into picklable render jobs, creating missing slips.
+
+    Existing slips keep their admin-edited details unless refresh_details
+    is set, in which case program/faculty/year/semester are re-synced
+    from the registration (e.g. after an academic-year change).
+    """
+    if not registrations:
+        return []
+
+    student_ids = [r.student_id for r in registrations]
+    students = {s.id: s for s in Student.query.filter(Student.id.in_(student_ids)).all()}
+    slips = {}
+    for slip in RegistrationSlip.query.filter(RegistrationSlip.student_id.in_(student_ids)).all():
+        slips.setdefault(slip.student_id, slip)
+
+    folder = current_app.config['REGISTRATION_SLIP_FOLDER']
+    os.makedirs(folder, exist_ok=True)
+
+    jobs = []
+    issued = set()
+    for registration in registrations:
+        student = students.get(registration.student_id)
+        if not student:
+            continue
+
+        details = {
+            'program_name': registration.program.name if registration.program else None,
+            'faculty_name': (registration.program.faculty.name
+                             if registration.program and registration.program.faculty else None),
+            'academic_year': registration.academic_year.name if registration.academic_year else None,
+            'semester': SEMESTER_LABELS.get(registration.semester_type, registration.semester_type),
+        }
+
+        slip = slips.get(student.id)
+        if slip is None:
+            slip = RegistrationSlip(
+                slip_number=f"RS{student.id:06d}-{datetime.now().strftime('%Y%m%d')}",
+                student_id=student.id,
+                program_name=details['program_name'] or student.program or "To be assigned",
+                faculty_name=details['faculty_name'] or student.faculty or "To be assigned",
+                academic_year=details['academic_year'] or "2024/2025",
+                semester=details['semester'] or "Semester 1",
+                issue_date=datetime.utcnow(),
+                created_by=str(created_by)
+            )
+            db.session.add(slip)
+            issued.add(student.id)
+        elif refresh_details:
+            for field, value in details.items():
+                if value:
+                    setattr(slip, field, value)
+
+        jobs.append(slip)
+
+    # Assign ids to new slips before handing work to other processes
+    db.session.flush()
+    for student_id in issued:
+        refresh_student_status(student_id)
+
+    return [
+        {
+            'slip_id': slip.id,
+            'path': os.path.join(folder, f"registration_slip_{students[slip.student_id].student_number}.pdf"),
+            'context': {
+                'student_name': students[slip.student_id].name,
+                'student_number': students[slip.student_id].student_number,
+                'program_name': slip.program_name,
+                'faculty_name': slip.faculty_name,
+                'academic_year': slip.academic_year,
+                'semester': slip.semester,
+                'issue_date': slip.issue_date,
+                'slip_number': slip.slip_number,
+            },
+        }
+        for slip in jobs
+    ]
+
+
+# ---------------- Rendering ----------------
+def render_job(job):
+    """Worker entry point: render one slip to disk (runs in a child process)"""
+    from app.utils.pdf_generator import render_official_slip
+
+    try:
+        pdf_bytes = render_official_slip(job['context'])
+        tmp_path = f"{job['path']}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(pdf_bytes)
+        # Atomic swap so a concurrent download never sees a half-written file
+        os.replace(tmp_path, job['path'])
+        return job['slip_id'], os.path.basename(job['path']), None
+    except Exception as e:
+        return job['slip_id'], None, str(e)
+
+
+def render_jobs(jobs, workers=None, progress=None, start_method=None):
+    """
+    Render jobs across a process pool.
+
+    progress, if given, is called as progress(done, total) after every
+    finished slip. start_method overrides SLIP_BATCH_START_METHOD.
+    Returns (rendered, failed) where rendered is a list of
+    {'id', 'pdf_filename'} rows and failed a list of (slip_id, error).
+    """
+    total = len(jobs)
+    rendered, failed = [], []
+    if not total:
+        return rendered, failed
+
+    workers = workers or current_app.config.get('SLIP_BATCH_WORKERS') or os.cpu_count() or 1
+    workers = max(1, min(workers, total))
+
+    def collect(result):
+        slip_id, filename, error = result
+        if error:
+            failed.append((slip_id, error))
+        else:
+            rendered.append({'id': slip_id, 'pdf_filename': filename})
+        if progress:
+            progress(len(rendered) + len(failed), total)
+
+    if workers == 1:
+        for job in jobs:
+            collect(render_job(job))
+        return rendered, failed
+
+    # Children only render and write files; they never touch the DB session
+    context = multiprocessing.get_context(start_method or current_app.config.get('SLIP_BATCH_START_METHOD'))
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+        futures = [pool.submit(render_job, job) for job in jobs]
+        for future in as_completed(futures):
+            collect(future.result())
+
+    return rendered, failed
+
+
+def _store_pdf_filenames(rendered):
+    """
+    One executemany UPDATE ... WHERE id = ? for the whole batch. Goes through
+    the table because the ORM's bulk UPDATE by primary key wants each
+    slip's version_id; the version is bumped so open edit forms notice.
+    """
+    slip_table = RegistrationSlip.__table__
+    db.session.execute(
+        update(slip_table)
+        .where(slip_table.c.id == bindparam('slip_id'))
+        .values(pdf_filename=bindparam('filename'), version_id=slip_table.c.version_id + 1),
+        [{'slip_id': row['id'], 'filename': row['pdf_filename']} for row in rendered]
+    )
+
+
+def generate_slips(workers=None, progress=None, created_by='batch', refresh_details=False,
+                   start_method=None, missing_only=False, **filters):
+    """
+    Select, render and bulk-update slips. Returns a summary dict.
+    missing_only skips students whose slip PDF is already on disk.
+    """
+    registrations = select_registrations(**filters)
+    if missing_only:
+        registrations = stored_slip_files(registrations)[1]
+    jobs = build_jobs(registrations, created_by=created_by, refresh_details=refresh_details)
+    # New/refreshed slip rows are committed before the slow part
+    db.session.commit()
+
+    rendered, failed = render_jobs(jobs, workers=workers, progress=progress, start_method=start_method)
+
+    if rendered:
+        _store_pdf_filenames(rendered)
+        db.session.commit()
+
+    return {
+        'selected': len(jobs),
+        'rendered': len(rendered),
+        'failed': len(failed),
+        'errors': failed[:20],
+    }
+
+
+# ---------------- Class exports ----------------
+def _cached_pdf_path(slip, folder):
+    """Path of an already-rendered slip PDF, or None if it has to be rendered"""
+    if not slip or not slip.pdf_filename:
+        return None
+    path = os.path.join(folder, slip.pdf_filename)
+    return path if os.path.isfile(path) else None
+
+
+def stored_slip_files(registrations):
+    """
+    Slip PDFs already on disk for these registrations: ([(arcname, path)]
+    sorted by student number, registrations whose slip has no PDF yet).
+    """
+    if not registrations:
+        return [], []
+
+    folder = current_app.config['REGISTRATION_SLIP_FOLDER']
+    student_ids = [r.student_id for r in registrations]
+    slips = {}
+    for slip in RegistrationSlip.query.filter(RegistrationSlip.student_id.in_(student_ids)).all():
+        slips.setdefault(slip.student_id, slip)
+    students = {s.id: s.student_number for s in Student.query.filter(Student.id.in_(student_ids)).all()}
+
+    files, missing = [], []
+    for registration in registrations:
+        path = _cached_pdf_path(slips.get(registration.student_id), folder)
+        if path:
+            files.append((f"{students[registration.student_id]}.pdf", path))
+        else:
+            missing.append(registration)
+    return sorted(files), missing
+
+
+def ensure_slip_files(registrations, created_by='export', workers=None):
+    """
+    Make sure every registration's student has a slip PDF on disk.
+
+    Stored PDFs are reused as-is; only the missing ones are rendered, across
+    the process pool. Returns ([(arcname, path)] sorted by student number,
+    [(slip_id, error)] for slips that could not be rendered).
+    """
+    files, missing = stored_slip_files(registrations)
+    if not missing:
+        return files, []
+
+    jobs = build_jobs(missing, created_by=created_by)
+    db.session.commit()
+    # Called from a (threaded) web worker, which must not be forked
+    rendered, failed = render_jobs(jobs, workers=workers, start_method='spawn')
+    if rendered:
+        _store_pdf_filenames(rendered)
+        db.session.commit()
+    for slip_id, error in failed:
+        current_app.logger.error(f"Slip {slip_id} could not be rendered for export: {error}")
+    return stored_slip_files(registrations)[0], failed
+
+
+def booklet_contexts(registrations, created_by='export'):
+    """Slip contexts for a single merged booklet, sorted by student number"""
+    jobs = build_jobs(registrations, created_by=created_by)
+    db.session.commit()
+    return sorted((job['context'] for job in jobs), key=lambda c: c['student_number'])
+
+
+# ---------------- Job stores (admin UI) ----------------
+class MemoryBatchJobStore:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._jobs = {}  # job_id -> status dict
+
+    def create(self, status):
+        with self._lock:
+            now = time.time()
+            self._jobs = {k: v for k, v in self._jobs.items() if v['expires'] > now}
+            self._jobs[status['id']] = dict(status, expires=now + JOB_TTL)
+
+    def update(self, job_id, **fields):
+        with self._lock:
+            if job_id in self._jobs:
+                self._jobs[job_id].update(fields)
+
+    def get(self, job_id):
+        with self._lock:
+            status = self._jobs.get(job_id)
+            if not status or status['expires'] <= time.time():
+                return None
+            status = dict(status)
+        status.pop('expires')
+        return status
+
+
+class SQLiteBatchJobStore(SQLiteStore):
+    schema = """
+        CREATE TABLE IF NOT EXISTS slip_batch_jobs (
+            id TEXT PRIMARY KEY,
+            status TEXT NOT NULL,
+            expires REAL NOT NULL
+        );
+    """
+
+    def create(self, status):
+        now = time.time()
+        with self.transaction() as conn:
+            conn.execute('DELETE FROM slip_batch_jobs WHERE expires <= ?', (now,))
+            conn.execute('INSERT INTO slip_batch_jobs (id, status, expires) VALUES (?, ?, ?)',
+                         (status['id'], json.dumps(status), now + JOB_TTL))
+
+    def update(self, job_id, **fields):
+        # Only the job's own thread writes its row, so read-modify-write is safe
+        with self.transaction() as conn:
+            row = conn.execute('SELECT status FROM slip_batch_jobs WHERE id = ?', (job_id,)).fetchone()
+            if row:
+                conn.execute('UPDATE slip_batch_jobs SET status = ? WHERE id = ?',
+                             (json.dumps(dict(json.loads(row[0]), **fields)), job_id))
+
+    def get(self, job_id):
+        row = self.conn().execute(
+            'SELECT status FROM slip_batch_jobs WHERE id = ? AND expires > ?', (job_id, time.time())
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+
+def create_batch_job_store(app):
+    if (app.config.get('SLIP_BATCH_JOB_BACKEND') or 'memory').lower() == 'sqlite':
+        return SQLiteBatchJobStore(app.config['SLIP_BATCH_JOB_SQLITE_PATH'])
+    return MemoryBatchJobStore()
+
+
+def init_slip_batch(app):
+    app.extensions['slip_batch_jobs'] = create_batch_job_store(app)
+
+
+def batch_job_status(job_id):
+    """Status dict of an admin-started job (from any worker), or None"""
+    return current_app.extensions['slip_batch_jobs'].get(job_id)
+
+
+# ---------------- Background jobs (admin UI) ----------------
+def start_background_batch(app, created_by, **kwargs):
+    """Run generate_slips in a thread; progress goes to the shared job store"""
+    store = app.extensions['slip_batch_jobs']
+    job_id = uuid.uuid4().hex[:12]
+    store.create({
+        'id': job_id,
+        'state': 'running',
+        'done': 0,
+        'total': 0,
+        'started_at': datetime.utcnow().isoformat(),
+        'summary': None,
+        'error': None,
+    })
+
+    def progress(done, total):
+        store.update(job_id, done=done, total=total)
+
+    def run():
+        with app.app_context():
+            try:
+                # spawn, not fork: this process is a threaded web worker
+                summary = generate_slips(progress=progress, created_by=created_by,
+                                         start_method='spawn', **kwargs)
+                store.update(job_id, state='finished', summary=summary)
+            except Exception as e:
+                db.session.rollback()
+                current_app.logger.error(f"Batch slip generation failed: {e}")
+                store.update(job_id, state='failed', error=str(e))
+            finally:
+                db.session.remove()
+
+    threading.Thread(target=run, name=f"slip-batch-{job_id}", daemon=True).start()
+    return job_id
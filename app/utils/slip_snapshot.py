@@ -0,0 +1,175 @@
+# app/utils/slip_snapshot.py
+"""
+Registration snapshots: what a student's slip shows, frozen at approval.
+
+When a payment is approved, manage_payment (via _apply_payment_decision)
+calls capture_snapshot(), which stores one RegistrationSnapshot row with
+the student, program, term, payment and course list already resolved to
+plain values, plus total credits. Slip pages and PDFs then read that one
+row instead of joining student, registration, program, faculty, academic
+year, payment, registered courses and courses on every request.
+
+Snapshots are never updated: a later approval writes a new row. Renaming
+a course or moving it between programs therefore doesn't change slips
+that were already issued.
+
+Students who were approved before snapshots existed (or aren't approved
+yet) get the same dict built from live data by slip_context().
+"""
+from datetime import datetime
+
+from sqlalchemy import select
+
+from app.extensions import db
+from app.models import Student, Payment, RegistrationSnapshot
+from app.models_academics import StudentRegistration, RegisteredCourse, Course
+
+SEMESTER_NAMES = {
+    'SEM1': 'Semester 1',
+    'SEM2': 'Semester 2',
+    'SUMMER': 'Summer Semester',
+    'INDUSTRIAL': 'Industrial Attachment'
+}
+
+# Keys holding ISO datetimes in the stored JSON
+_DATE_KEYS = ('registration_date', 'captured_at')
+
+
+def _iso(value):
+    return value.isoformat() if value else None
+
+
+def build_slip_context(student_id, registration=None, payment=None):
+    """
+    Everything the slip shows, as JSON-safe values. Uses the latest
+    registration / approved payment unless they are passed in.
+    """
+    student = db.session.get(Student, student_id)
+    if student is None:
+        return None
+
+    if registration is None:
+        registration = StudentRegistration.query.filter_by(
+            student_id=student_id
+        ).order_by(StudentRegistration.id.desc()).first()
+    if payment is None:
+        payment = Payment.query.filter_by(
+            student_id=student_id,
+            status='approved'
+        ).order_by(Payment.submitted_date.desc()).first()
+
+    data = {
+        'student': {
+            'id': student.id,
+            'name': student.name,
+            'student_number': student.student_number,
+            'email': student.email,
+            'phone': student.phone,
+            'program': student.program,
+            'faculty': student.faculty,
+        },
+        'registration_id': None,
+        'program_name': None,
+        'faculty_name': None,
+        'year_level': None,
+        'semester_type': None,
+        'semester': None,
+        'academic_year': None,
+        'registration_date': None,
+        'payment_status': None,
+        'payment': None,
+        'courses': [],
+        'total_credits': 0,
+        'captured_at': _iso(datetime.utcnow()),
+    }
+
+    if payment:
+        data['payment'] = {
+            'id': payment.id,
+            'amount': payment.amount,
+            'reference': payment.reference,
+            'method': payment.method,
+            'approved_date': _iso(payment.approved_date),
+        }
+
+    if registration:
+        program = registration.program
+        data.update({
+            'registration_id': registration.id,
+            'program_name': program.name if program else None,
+            'faculty_name': program.faculty.name if program and program.faculty else None,
+            'year_level': registration.year_level,
+            'semester_type': registration.semester_type,
+            'semester': SEMESTER_NAMES.get(registration.semester_type, registration.semester_type),
+            'academic_year': registration.academic_year.name if registration.academic_year else None,
+            'registration_date': _iso(registration.registration_date),
+            'payment_status': registration.payment_status,
+        })
+
+        # Course columns only, in registration order, in one query
+        rows = db.session.execute(
+            select(Course.code, Course.title, Course.credits)
+            .join(RegisteredCourse, RegisteredCourse.course_id == Course.id)
+            .where(RegisteredCourse.registration_id == registration.id)
+            .order_by(RegisteredCourse.id)
+        ).all()
+        data['courses'] = [
+            {'code': code, 'title': title, 'credits': credits or 0}
+            for code, title, credits in rows
+        ]
+        data['total_credits'] = sum(course['credits'] for course in data['courses'])
+
+    return data
+
+
+def capture_snapshot(student_id, registration=None, payment=None):
+    """Store the slip as it is now. Flushes (so .id is set); the caller commits."""
+    data = build_slip_context(student_id, registration, payment)
+    snapshot = RegistrationSnapshot(
+        student_id=student_id,
+        registration_id=data['registration_id'],
+        payment_id=data['payment']['id'] if data['payment'] else None,
+        data=data
+    )
+    db.session.add(snapshot)
+    db.session.flush()
+    return snapshot
+
+
+def latest_snapshot(student_id):
+    """The student's newest snapshot (one ix_registration_snapshot_student seek), or None"""
+    return RegistrationSnapshot.query.filter_by(
+        student_id=student_id
+    ).order_by(RegistrationSnapshot.id.desc()).first()
+
+
+def _revive(data):
+    """Turn the stored ISO strings back into datetimes for templates/PDFs"""
+    data = dict(data)
+    for key in _DATE_KEYS:
+        if data.get(key):
+            data[key] = datetime.fromisoformat(data[key])
+    if data.get('payment') and data['payment'].get('approved_date'):
+        data['payment'] = dict(data['payment'],
+                               approved_date=datetime.fromisoformat(data['payment']['approved_date']))
+    return data
+
+
+def slip_context(student_id=None, snapshot=None):
+    """
+    Slip data for templates: the given (or latest) snapshot, otherwise
+    built from live data. Adds 'snapshot_id' (None when live).
+    """
+    if snapshot is None and student_id is not None:
+        snapshot = latest_snapshot(student_id)
+    if snapshot is not None:
+        data = _revive(snapshot.data)
+        data['snapshot_id'] = snapshot.id
+        return data
+
+    data = build_slip_context(student_id)
+    if data is None:
+        return None
+    data = _revive(data)
+    data['snapshot_id'] = None
+    return data
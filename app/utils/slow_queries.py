@@ -0,0 +1,284 @@
+# app/utils/slow_queries.py
+"""
+Slow-query log with automatic EXPLAIN capture.
+
+Every statement slower than SLOW_QUERY_THRESHOLD_MS is written, with
+redacted parameters, the calling route and its query plan, to a rotating
+log file (SLOW_QUERY_LOG_FILE) and optionally to the app logger
+(SLOW_QUERY_APP_LOG). Statements are also aggregated in-process by
+normalized SQL for the admin "Slow Queries" page.
+
+Plans are not taken inside the request's transaction: statements are
+queued and EXPLAINed after the response, on a separate connection, once
+per distinct statement per process.
+
+With SLOW_QUERY_SCAN_CHECK on (off by default), every distinct filtered
+SELECT is EXPLAINed that way, and full table scans are recorded even when
+they are still fast, so filters that need an index show up before the
+table grows.
+"""
+import os
+import re
+import time
+import logging
+import threading
+from datetime import datetime, timezone
+from logging.handlers import RotatingFileHandler
+
+from flask import g, request, current_app, has_app_context, has_request_context
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger('cavendish.slow_queries')
+
+# Distinct statements kept by the aggregator
+MAX_STATEMENTS = 500
+
+_WHITESPACE_RE = re.compile(r'\s+')
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r'\b\d+(?:\.\d+)?\b')
+_IN_LIST_RE = re.compile(r'\(\s*\?(?:\s*,\s*\?)+\s*\)')
+_FULL_SCAN_RE = re.compile(r'^SCAN (?!.*USING)|Seq Scan', re.MULTILINE)
+
+
+# ---------------- Statement helpers ----------------
+def normalize_sql(statement):
+    """Collapse literals and IN-lists so equivalent statements group together"""
+    sql = _WHITESPACE_RE.sub(' ', statement).strip()
+    sql = _STRING_RE.sub('?', sql)
+    sql = _NUMBER_RE.sub('?', sql)
+    sql = _IN_LIST_RE.sub('(?, ...)', sql)
+    return sql[:2000]
+
+
+def _redact_value(value):
+    if value is None or isinstance(value, (bool, int, float)):
+        return value
+    if isinstance(value, str):
+        return f'<str:{len(value)}>'
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return f'<bytes:{len(value)}>'
+    return f'<{type(value).__name__}>'
+
+
+def redact_parameters(parameters, executemany=False):
+    """Keep numbers and NULLs (ids, flags); replace text and blobs with type/length"""
+    if executemany and parameters:
+        return {'rows': len(parameters), 'first': redact_parameters(parameters[0])}
+    if isinstance(parameters, dict):
+        return {key: _redact_value(value) for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [_redact_value(value) for value in parameters]
+    return _redact_value(parameters)
+
+
+def explain(conn, statement, parameters):
+    """Query plan for a SELECT, or None. Runs on a fresh DBAPI cursor so no events fire."""
+    if not statement.lstrip().upper().startswith(('SELECT', 'WITH')):
+        return None
+
+    prefix = 'EXPLAIN QUERY PLAN ' if conn.dialect.name == 'sqlite' else 'EXPLAIN '
+    cursor = conn.connection.cursor()
+    try:
+        cursor.execute(prefix + statement, parameters)
+        rows = cursor.fetchall()
+    except Exception as e:
+        return f'(EXPLAIN failed: {e})'
+    finally:
+        cursor.close()
+
+    # SQLite rows are (id, parent, notused, detail); other backends return one text column
+    return '\n'.join(str(row[-1]) for row in rows)
+
+
+def _route():
+    if has_request_context():
+        return f"{request.method} {request.endpoint or request.path}"
+    return 'background'
+
+
+# ---------------- Aggregation ----------------
+class SlowQueryStats:
+    """Worst statements by normalized SQL, kept per process"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._statements = {}
+        self._plans = {}  # normalized SQL -> plan text (None for non-SELECT)
+
+    def plan_for(self, normalized):
+        return self._plans.get(normalized)
+
+    def has_plan(self, normalized):
+        return normalized in self._plans
+
+    def remember_plan(self, normalized, plan):
+        with self._lock:
+            if len(self._plans) >= MAX_STATEMENTS * 4:
+                self._plans.clear()
+            self._plans[normalized] = plan
+
+    def record(self, normalized, statement, elapsed_ms, route, parameters, full_scan, slow):
+        with self._lock:
+            entry = self._statements.get(normalized)
+            if entry is None:
+                if len(self._statements) >= MAX_STATEMENTS:
+                    cheapest = min(self._statements, key=lambda k: self._statements[k]['total_ms'])
+                    del self._statements[cheapest]
+                entry = self._statements[normalized] = {
+                    'normalized': normalized,
+                    'count': 0,
+                    'slow_count': 0,
+                    'total_ms': 0.0,
+                    'max_ms': 0.0,
+                    'routes': {},
+                    'full_scan': full_scan,
+                }
+            entry['count'] += 1
+            entry['slow_count'] += 1 if slow else 0
+            entry['total_ms'] += elapsed_ms
+            entry['routes'][route] = entry['routes'].get(route, 0) + 1
+            entry['full_scan'] = entry['full_scan'] or full_scan
+            entry['last_seen'] = datetime.now(timezone.utc)
+            if elapsed_ms >= entry['max_ms']:
+                entry['max_ms'] = elapsed_ms
+                entry['sample_sql'] = statement
+                entry['sample_params'] = parameters
+
+    def worst(self, order_by='total_ms', limit=50):
+        with self._lock:
+            entries = [
+                {**entry, 'routes': dict(entry['routes']), 'plan': self._plans.get(key)}
+                for key, entry in self._statements.items()
+            ]
+        for entry in entries:
+            entry['avg_ms'] = entry['total_ms'] / entry['count']
+        return sorted(entries, key=lambda e: e.get(order_by, 0), reverse=True)[:limit]
+
+    def reset(self):
+        with self._lock:
+            self._statements.clear()
+            self._plans.clear()
+
+
+slow_query_stats = SlowQueryStats()
+
+
+# ---------------- Engine events ----------------
+class _SlowQueryListener:
+    threshold_ms = 0
+    scan_check = False
+    to_app_log = False
+
+    def configure(self, app):
+        self.threshold_ms = float(app.config.get('SLOW_QUERY_THRESHOLD_MS') or 0)
+        self.scan_check = app.config.get('SLOW_QUERY_SCAN_CHECK', False)
+        self.to_app_log = app.config.get('SLOW_QUERY_APP_LOG', False)
+
+    def before(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('_slow_query_started', []).append(time.perf_counter())
+
+    def after(self, conn, cursor, statement, parameters, context, executemany):
+        elapsed_ms = (time.perf_counter() - conn.info['_slow_query_started'].pop()) * 1000
+        if not self.threshold_ms:
+            return
+        slow = elapsed_ms >= self.threshold_ms
+        if not slow and not self.scan_check:
+            return
+
+        query = {
+            'engine': conn.engine,
+            'statement': statement,
+            'parameters': parameters,
+            'normalized': normalize_sql(statement),
+            'executemany': executemany,
+            'elapsed_ms': elapsed_ms,
+            'slow': slow,
+            'route': _route(),
+        }
+        if executemany or slow_query_stats.has_plan(query['normalized']):
+            self.finish(query)
+        elif has_request_context():
+            # EXPLAIN later, outside this request's transaction
+            g.setdefault('_slow_query_pending', []).append(query)
+        else:
+            self.finish(query)
+
+    def finish(self, query):
+        """Attach the plan (EXPLAINing on its own connection if needed), then record and log"""
+        normalized = query['normalized']
+        if query['executemany']:
+            plan = None
+        elif slow_query_stats.has_plan(normalized):
+            plan = slow_query_stats.plan_for(normalized)
+        else:
+            plan = explain_separately(query['engine'], query['statement'], query['parameters'])
+            slow_query_stats.remember_plan(normalized, plan)
+
+        full_scan = bool(plan and ' WHERE ' in normalized.upper() and _FULL_SCAN_RE.search(plan))
+        slow = query['slow']
+        if not slow and not full_scan:
+            return
+
+        elapsed_ms, route, statement = query['elapsed_ms'], query['route'], query['statement']
+        redacted = redact_parameters(query['parameters'], query['executemany'])
+        slow_query_stats.record(normalized, statement, elapsed_ms, route, redacted, full_scan, slow)
+
+        if not slow:
+            return
+
+        message = "%.1f ms %s\n  SQL: %s\n  params: %r\n  plan: %s"
+        args = (elapsed_ms, route, _WHITESPACE_RE.sub(' ', statement), redacted,
+                (plan or '-').replace('\n', ' | '))
+        logger.warning(message, *args)
+        if self.to_app_log and has_app_context():
+            current_app.logger.warning("Slow query: " + message, *args)
+
+
+_listener = _SlowQueryListener()
+
+
+def explain_separately(engine, statement, parameters):
+    """explain() on a connection of its own, so the caller's transaction is untouched"""
+    try:
+        with engine.connect() as conn:
+            return explain(conn, statement, parameters)
+    except Exception as e:
+        return f'(EXPLAIN failed: {e})'
+
+
+def _finish_pending(exception=None):
+    """Teardown: plan and log the statements this request queued"""
+    for query in g.pop('_slow_query_pending', None) or ():
+        try:
+            _listener.finish(query)
+        except Exception as e:
+            current_app.logger.error(f"Could not record slow query: {e}")
+
+
+def init_slow_query_log(app):
+    """Install the slow-query listener when SLOW_QUERY_THRESHOLD_MS is set"""
+    _listener.configure(app)
+    if not _listener.threshold_ms:
+        return
+
+    log_file = app.config.get('SLOW_QUERY_LOG_FILE')
+    if log_file and not logger.handlers:
+        os.makedirs(os.path.dirname(log_file), exist_ok=True)
+        handler = RotatingFileHandler(
+            log_file,
+            maxBytes=app.config.get('SLOW_QUERY_LOG_MAX_BYTES', 5 * 1024 * 1024),
+            backupCount=app.config.get('SLOW_QUERY_LOG_BACKUPS', 5)
+        )
+        handler.setFormatter(logging.Formatter('%(asctime)s %(message)s'))
+        logger.addHandler(handler)
+        logger.setLevel(logging.WARNING)
+        logger.propagate = False
+
+    # Engine-class listeners are global, so install them once and just
+    # pick up the latest app's settings on later create_app() calls
+    if not event.contains(Engine, 'before_cursor_execute', _listener.before):
+        event.listen(Engine, 'before_cursor_execute', _listener.before)
+        event.listen(Engine, 'after_cursor_execute', _listener.after)
+
+    app.teardown_request(_finish_pending)
@@ -0,0 +1,70 @@
+# app/utils/sqlite_store.py
+"""
+Base class for the small SQLite side stores (sessions, rate-limit buckets,
+idempotency keys, batch jobs, ...).
+
+Each store is one file, normally under app/var, shared by every worker
+process on the host. A store subclasses SQLiteStore, sets `schema` and
+uses conn() for reads and transaction() for writes:
+
+    class SQLiteThingStore(SQLiteStore):
+        schema = 'CREATE TABLE IF NOT EXISTS things (key TEXT PRIMARY KEY, value TEXT)'
+
+        def get(self, key):
+            return self.conn().execute('SELECT value FROM things WHERE key = ?', (key,)).fetchone()
+
+        def put(self, key, value):
+            with self.transaction() as conn:
+                conn.execute('INSERT OR REPLACE INTO things VALUES (?, ?)', (key, value))
+
+Connections are per thread, in autocommit mode, with WAL journaling (readers
+don't block the writer) and synchronous=NORMAL (a crash of the host, not of
+a worker, can lose the last commits - acceptable for this kind of state).
+"""
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+BUSY_TIMEOUT = 10  # seconds a write waits for another process's transaction
+
+
+class SQLiteStore:
+    schema = ''
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        conn = self.conn()
+        conn.executescript(self.schema)
+        self.migrate(conn)
+
+    def migrate(self, conn):
+        """Bring files created by older versions up to date (after `schema` ran)"""
+
+    def conn(self):
+        """This thread's connection"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def transaction(self):
+        """
+        A write transaction that takes the lock up front (BEGIN IMMEDIATE),
+        so read-modify-write sequences from two processes serialize instead
+        of failing to upgrade a read lock. Commits, or rolls back on error.
+        """
+        conn = self.conn()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            yield conn
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        conn.execute('COMMIT')
@@ -0,0 +1,141 @@
+# app/utils/student_status.py
+"""
+Per-student status summary (the student_status table).
+
+The student dashboard needs the latest registration, the payment state,
+whether a slip exists and the credit total. Deriving that on every page
+view meant loading the student, all their payments, the approved payment
+and the slip, and then working out the state in the template. Instead,
+each write path that changes one of those calls refresh_student_status()
+before it commits. The summary row is then committed, or rolled back, in
+the same transaction as the change, and the dashboard reads it with one
+primary-key lookup.
+
+The row is recomputed from the source tables rather than adjusted
+incrementally. A path that forgets to call it can only leave it stale
+until the next write, never drift permanently. `flask students rebuild-status`
+recomputes every row.
+"""
+from datetime import datetime
+
+from sqlalchemy import select, func
+from sqlalchemy.exc import IntegrityError
+
+from app.extensions import db
+from app.models import Student, Payment, RegistrationSlip, StudentStatus
+from app.models_academics import StudentRegistration, RegisteredCourse, Course, Program
+
+
+def _locked_row(student_id):
+    """The student's status row, created if missing, locked FOR UPDATE where supported"""
+    row = db.session.get(StudentStatus, student_id, with_for_update=True, populate_existing=True)
+    if row is None:
+        try:
+            # Savepoint: a concurrent first write may insert the row too
+            with db.session.begin_nested():
+                row = StudentStatus(student_id=student_id)
+                db.session.add(row)
+        except IntegrityError:
+            row = db.session.get(StudentStatus, student_id, with_for_update=True, populate_existing=True)
+    return row
+
+
+def refresh_student_status(student_id):
+    """
+    Recompute the student's summary row from payments, registrations and
+    slips. Call after the change is in the session; the caller commits.
+    """
+    # Lock first, so concurrent writers for this student recompute one after another
+    row = _locked_row(student_id)
+    db.session.flush()
+
+    registration = db.session.execute(
+        select(
+            StudentRegistration.id,
+            Program.name,
+            StudentRegistration.year_level,
+            StudentRegistration.semester_type,
+            StudentRegistration.payment_status
+        )
+        .outerjoin(Program, Program.id == StudentRegistration.program_id)
+        .where(StudentRegistration.student_id == student_id)
+        .order_by(StudentRegistration.id.desc())
+        .limit(1)
+    ).first()
+
+    if registration:
+        row.registration_id, row.program_name, row.year_level, \
+            row.semester_type, row.registration_status = registration
+        row.total_credits = db.session.execute(
+            select(func.coalesce(func.sum(Course.credits), 0))
+            .join(RegisteredCourse, RegisteredCourse.course_id == Course.id)
+            .where(RegisteredCourse.registration_id == registration.id)
+        ).scalar()
+    else:
+        row.registration_id = row.program_name = row.year_level = None
+        row.semester_type = row.registration_status = None
+        row.total_credits = 0
+
+    by_status = {
+        status: (count, last_submitted, last_approved)
+        for status, count, last_submitted, last_approved in db.session.execute(
+            select(Payment.status, func.count(Payment.id),
+                   func.max(Payment.submitted_date), func.max(Payment.approved_date))
+            .where(Payment.student_id == student_id)
+            .group_by(Payment.status)
+        )
+    }
+    row.payment_count = sum(count for count, _, _ in by_status.values())
+    row.pending_since = by_status['pending'][1] if 'pending' in by_status else None
+    row.approved_at = by_status['approved'][2] if 'approved' in by_status else None
+    for state in ('approved', 'pending', 'rejected'):
+        if state in by_status:
+            row.payment_state = state
+            break
+    else:
+        row.payment_state = 'none'
+
+    row.slip_id = db.session.execute(
+        select(RegistrationSlip.id)
+        .where(RegistrationSlip.student_id == student_id)
+        .order_by(RegistrationSlip.id.desc())
+        .limit(1)
+    ).scalar()
+
+    row.updated_at = datetime.utcnow()
+    return row
+
+
+def program_student_ids(program_id):
+    """Students with a registration on the program (their rows may show its name)"""
+    return db.session.execute(
+        select(StudentRegistration.student_id)
+        .where(StudentRegistration.program_id == program_id)
+        .distinct()
+    ).scalars().all()
+
+
+def refresh_student_statuses(student_ids):
+    """refresh_student_status() for each student; the caller commits"""
+    for student_id in student_ids:
+        refresh_student_status(student_id)
+
+
+def student_status(student_id):
+    """The student's summary row, built (and committed) on first use"""
+    row = db.session.get(StudentStatus, student_id)
+    if row is None:
+        row = refresh_student_status(student_id)
+        db.session.commit()
+    return row
+
+
+def rebuild_all_statuses(batch_size=500):
+    """Recompute every student's row. Returns the number of students."""
+    student_ids = db.session.execute(select(Student.id).order_by(Student.id)).scalars().all()
+    for i, student_id in enumerate(student_ids, 1):
+        refresh_student_status(student_id)
+        if i % batch_size == 0:
+            db.session.commit()
+    db.session.commit()
+    return len(student_ids)
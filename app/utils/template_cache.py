@@ -0,0 +1,227 @@
+# app/utils/template_cache.py
+"""
+Jinja bytecode caching and template fragment caching.
+
+Bytecode cache: compiled templates are written to JINJA_BYTECODE_CACHE_DIR
+so new workers load them instead of re-parsing ~9.5k lines of templates.
+`flask templates compile` fills the cache ahead of time at deploy.
+
+Fragment cache: wrap static-heavy markup in a template with
+
+    {% cache "programs:table" %} ... {% endcache %}
+    {% cache "layout:admin_sidebar", 3600 %} ... {% endcache %}
+
+and drop it after writes with invalidate_fragments("programs"), or have
+model writes do that with invalidate_on_commit(). Don't cache markup with
+content-hashed static URLs: the key doesn't change when the assets do.
+
+Rendered fragments live in each worker process, but every key is tied to a
+generation counter for its namespace (the part before the first ":")
+kept in a generation store - "sqlite" (TEMPLATE_FRAGMENT_SQLITE_PATH,
+shared by the workers on one host) or "memory" (per worker).
+Invalidating bumps the counter, so every worker treats its copies as
+stale on its next request. Counters are read once per request.
+"""
+import os
+import threading
+import time
+
+from flask import g, has_request_context
+from jinja2 import nodes, FileSystemBytecodeCache
+from jinja2.ext import Extension
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+
+from app.models_academics import Faculty
+from app.utils.sqlite_store import SQLiteStore
+
+ALL = '*'  # bumped by invalidate_fragments() without prefixes
+
+
+# ---------------- Generation stores ----------------
+class MemoryGenerationStore:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._generations = {}
+
+    def all(self):
+        with self._lock:
+            return dict(self._generations)
+
+    def bump(self, names):
+        with self._lock:
+            for name in names:
+                self._generations[name] = self._generations.get(name, 0) + 1
+
+
+class SQLiteGenerationStore(SQLiteStore):
+    schema = """
+        CREATE TABLE IF NOT EXISTS fragment_generations (
+            name TEXT PRIMARY KEY,
+            generation INTEGER NOT NULL
+        );
+    """
+
+    def all(self):
+        return dict(self.conn().execute('SELECT name, generation FROM fragment_generations'))
+
+    def bump(self, names):
+        with self.transaction() as conn:
+            conn.executemany(
+                'INSERT INTO fragment_generations (name, generation) VALUES (?, 1) '
+                'ON CONFLICT(name) DO UPDATE SET generation = generation + 1',
+                [(name,) for name in names]
+            )
+
+
+def create_generation_store(app):
+    if (app.config.get('TEMPLATE_FRAGMENT_BACKEND') or 'memory').lower() == 'sqlite':
+        return SQLiteGenerationStore(app.config['TEMPLATE_FRAGMENT_SQLITE_PATH'])
+    return MemoryGenerationStore()
+
+
+# ---------------- Fragment cache ----------------
+class FragmentCache:
+    """Small thread-safe in-process TTL cache for rendered fragments"""
+
+    def __init__(self, default_timeout=300):
+        self.default_timeout = default_timeout
+        self.enabled = True
+        self.generations = MemoryGenerationStore()
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def _generations(self):
+        """Current counters, read from the store once per request"""
+        if not has_request_context():
+            return self.generations.all()
+        if '_fragment_generations' not in g:
+            g._fragment_generations = self.generations.all()
+        return g._fragment_generations
+
+    def _generation(self, key):
+        generations = self._generations()
+        return generations.get(key.split(':', 1)[0], 0), generations.get(ALL, 0)
+
+    def get(self, key):
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        value, expires_at, generation = entry
+        if (expires_at is not None and expires_at < time.monotonic()) or generation != self._generation(key):
+            with self._lock:
+                self._data.pop(key, None)
+            return None
+        return value
+
+    def set(self, key, value, timeout=None):
+        timeout = self.default_timeout if timeout is None else timeout
+        expires_at = time.monotonic() + timeout if timeout else None
+        generation = self._generation(key)
+        with self._lock:
+            self._data[key] = (value, expires_at, generation)
+
+    def get_or_set(self, key, factory, timeout=None):
+        if not self.enabled:
+            return factory()
+        value = self.get(key)
+        if value is None:
+            value = factory()
+            self.set(key, value, timeout)
+        return value
+
+    def invalidate(self, *prefixes):
+        """Make every key in the given namespaces stale in all workers; no prefixes clears all"""
+        names = {p.split(':', 1)[0] for p in prefixes} or {ALL}
+        self.generations.bump(names)
+        if has_request_context():
+            g.pop('_fragment_generations', None)
+
+
+fragment_cache = FragmentCache()
+
+
+def invalidate_fragments(*prefixes):
+    fragment_cache.invalidate(*prefixes)
+
+
+def invalidate_on_commit(model, *prefixes):
+    """Invalidate the namespaces once an insert/update/delete of a model row commits"""
+    def changed(mapper, connection, target):
+        session = object_session(target)
+        if session is None:
+            invalidate_fragments(*prefixes)
+            return
+        session.info.setdefault('_fragment_prefixes', set()).update(prefixes)
+
+    for name in ('after_insert', 'after_update', 'after_delete'):
+        event.listen(model, name, changed)
+
+
+@event.listens_for(Session, 'after_commit')
+def _flush_fragment_prefixes(session):
+    prefixes = session.info.pop('_fragment_prefixes', None)
+    if prefixes:
+        invalidate_fragments(*prefixes)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _drop_fragment_prefixes(session):
+    session.info.pop('_fragment_prefixes', None)
+
+
+# The programs fragments show faculty names. Faculties have no admin pages
+# of their own, so writes from anywhere (shell, scripts) must invalidate them.
+invalidate_on_commit(Faculty, 'programs')
+
+
+class FragmentCacheExtension(Extension):
+    """Adds {% cache key[, timeout] %}...{% endcache %} to the environment"""
+
+    tags = {"cache"}
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+
+        args = [parser.parse_expression()]
+        if parser.stream.skip_if("comma"):
+            args.append(parser.parse_expression())
+        else:
+            args.append(nodes.Const(None))
+
+        body = parser.parse_statements(("name:endcache",), drop_needle=True)
+        return nodes.CallBlock(
+            self.call_method("_cache_support", args), [], [], body
+        ).set_lineno(lineno)
+
+    def _cache_support(self, key, timeout, caller):
+        return fragment_cache.get_or_set(key, caller, timeout)
+
+
+def init_template_cache(app):
+    """Attach the bytecode cache and the {% cache %} tag to app.jinja_env"""
+    fragment_cache.default_timeout = app.config.get('TEMPLATE_FRAGMENT_CACHE_TIMEOUT', 300)
+    fragment_cache.enabled = app.config.get('TEMPLATE_FRAGMENT_CACHE', True)
+    if fragment_cache.enabled:
+        fragment_cache.generations = create_generation_store(app)
+
+    app.jinja_env.add_extension(FragmentCacheExtension)
+
+    if app.config.get('JINJA_BYTECODE_CACHE', True):
+        # None lets Jinja pick a per-user directory under the system temp dir
+        cache_dir = app.config.get('JINJA_BYTECODE_CACHE_DIR')
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+        app.jinja_env.bytecode_cache = FileSystemBytecodeCache(cache_dir)
+
+
+def precompile_templates(app):
+    """Compile every template once so its bytecode lands in the cache"""
+    compiled, failed = 0, []
+    for name in app.jinja_env.list_templates():
+        try:
+            app.jinja_env.get_template(name)
+            compiled += 1
+        except Exception as e:
+            failed.append((name, str(e)))
+    return compiled, failed
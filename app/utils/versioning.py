@@ -0,0 +1,54 @@
+# app/utils/versioning.py
+"""
+Optimistic concurrency for the versioned models (Payment,
+StudentRegistration, RegistrationSlip all map a version_id column as
+SQLAlchemy's version_id_col).
+
+Two situations become a VersionConflict:
+
+- stale page: the link or form carried ?version=N (the version the admin
+  was looking at) but the row has changed since
+- lost race: two requests read the same version at the same time; the
+  second one's UPDATE ... WHERE version_id = N matches nothing and
+  SQLAlchemy raises StaleDataError
+
+Routes turn the conflict into a flash message (pages) or a 409 (JSON).
+"""
+from contextlib import contextmanager
+
+from flask import request
+from sqlalchemy.orm.exc import StaleDataError
+
+from app.extensions import db
+
+
+class VersionConflict(Exception):
+    status = 409
+
+    def __init__(self, what='This record'):
+        super().__init__(f"{what} was changed by someone else in the meantime. Reload the page and try again.")
+
+
+def expected_version():
+    """The version the client last saw (?version= or a form field), or None"""
+    try:
+        return int(request.values['version'])
+    except (KeyError, ValueError):
+        return None
+
+
+def check_version(obj, what='This record'):
+    """Raise VersionConflict if the client saw an older version of obj"""
+    expected = expected_version()
+    if expected is not None and expected != obj.version_id:
+        raise VersionConflict(what)
+
+
+@contextmanager
+def stale_guard(what='This record'):
+    """Roll back and raise VersionConflict when a flush/commit inside loses the race"""
+    try:
+        yield
+    except StaleDataError:
+        db.session.rollback()
+        raise VersionConflict(what)
@@ -0,0 +1,245 @@
+# benchmarks/approval_hammer.py
+"""
+Concurrency hammer for payment decisions (optimistic locking check).
+
+Seeds a throwaway SQLite database with --payments students, each with one
+pending Payment and StudentRegistration, then lets --threads admin clients
+(spread over --admins accounts) race to approve or reject every payment
+at the same moment through /admin/review-queue/<id>/<action>, all sending
+the version they "saw" (1).
+
+Afterwards it checks that nothing was lost or duplicated:
+
+- every payment was decided by exactly one request (200); every other
+  attempt got a 409 conflict, never a 500
+- the stored status and reviewer are the ones of that winning request
+- each student has at most one registration slip, and exactly one if
+  their payment was approved
+
+Then the same threads race to edit every issued slip through
+/admin/edit_registration_slip/<id>, each with its own program name and
+the version it saw. Exactly one edit per slip may win, and both the
+stored slip and its PDF file must show the winner's program name.
+
+    python -m benchmarks.approval_hammer --payments 40 --threads 16
+
+Exits with status 1 if any check fails.
+"""
+import argparse
+import os
+import random
+import re
+import sys
+import tempfile
+import threading
+import time
+import zlib
+from collections import Counter, defaultdict
+from datetime import datetime
+
+WORK_DIR = tempfile.mkdtemp(prefix="cavendish_hammer_")
+os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(WORK_DIR, "hammer.db")
+os.environ["VAR_DIR"] = os.path.join(WORK_DIR, "var")  # side stores, not app/var
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from werkzeug.security import generate_password_hash  # noqa: E402
+
+from app import create_app                          # noqa: E402
+from app.config import Config                       # noqa: E402
+from app.extensions import db                       # noqa: E402
+from app.models import User, Student, Payment, RegistrationSlip  # noqa: E402
+from app.utils.helpers import generate_registration_slip_pdf  # noqa: E402
+from app.models_academics import StudentRegistration  # noqa: E402
+from benchmarks.factories import seed_database, PASSWORD  # noqa: E402
+
+
+class HammerConfig(Config):
+    TESTING = True
+    MAIL_SUPPRESS_SEND = True
+    PROPAGATE_EXCEPTIONS = False  # count view errors as 500s, like a real server
+    UPLOAD_FOLDER = os.path.join(WORK_DIR, "uploads")
+    REGISTRATION_SLIP_FOLDER = os.path.join(WORK_DIR, "registration_slips")
+    RATE_LIMIT_ENABLED = False
+    SLOW_QUERY_THRESHOLD_MS = 0
+
+
+def seed(payments, admins):
+    seed_database(students=payments, programs=1, approved_payment_ratio=0, chatbot_messages=0)
+    # Only the hammered payments should be pending
+    Payment.query.delete()
+    password_hash = generate_password_hash(PASSWORD)
+    for i in range(admins):
+        db.session.add(User(username=f"hammer-admin-{i}", email=f"hammer-admin-{i}@example.com",
+                            password_hash=password_hash, role="admin"))
+    for student in Student.query.all():
+        program_id = db.session.execute(db.text("SELECT id FROM program LIMIT 1")).scalar()
+        db.session.add(Payment(slip_filename=f"hammer-{student.id}.pdf", student_id=student.id,
+                               status="pending", submitted_date=datetime.utcnow()))
+        db.session.add(StudentRegistration(student_id=student.id, program_id=program_id, year_level=1,
+                                           semester_type="SEM1", payment_status="pending"))
+    db.session.commit()
+    return [payment_id for (payment_id,) in db.session.query(Payment.id).order_by(Payment.id)]
+
+
+def pdf_text(pdf):
+    """The PDF's bytes with its (Flate-compressed) content streams inflated"""
+    chunks = [pdf]
+    for stream in re.findall(rb"(?<!end)stream\r?\n(.*?)endstream", pdf, re.S):
+        try:
+            chunks.append(zlib.decompressobj().decompress(stream))
+        except zlib.error:
+            pass
+    return b"".join(chunks)
+
+
+def run_threads(target, count):
+    threads = [threading.Thread(target=target, args=(i,)) for i in range(count)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - started
+
+
+def hammer_slip_edits(app, args):
+    """Race every worker's edit of every slip; returns (requests, elapsed, failures)"""
+    with app.app_context():
+        slips = {slip.id: slip.version_id for slip in RegistrationSlip.query.all()}
+        for slip in RegistrationSlip.query.all():
+            assert generate_registration_slip_pdf(slip)
+        db.session.commit()
+
+    attempts = []  # (slip_id, program_name, outcome)
+    lock = threading.Lock()
+    start = threading.Barrier(args.threads)
+
+    def edit(worker):
+        rng = random.Random(args.seed + 1000 + worker)
+        client = app.test_client()
+        client.post("/admin/login", data={"username": f"hammer-admin-{worker % args.admins}",
+                                          "password": PASSWORD})
+        order = list(slips)
+        rng.shuffle(order)
+        start.wait()
+        for slip_id in order:
+            program_name = f"HAMMER-W{worker}-S{slip_id}"
+            response = client.post(f"/admin/edit_registration_slip/{slip_id}", data={
+                "version": slips[slip_id], "program_name": program_name})
+            location = response.headers.get("Location", "")
+            if response.status_code == 302 and location.endswith("/admin/view_registration_slips"):
+                outcome = "won"
+            elif response.status_code == 302 and "/edit_registration_slip/" in location:
+                outcome = "conflict"
+            else:
+                outcome = f"HTTP {response.status_code}"
+            with lock:
+                attempts.append((slip_id, program_name, outcome))
+
+    elapsed = run_threads(edit, args.threads)
+
+    failures = []
+    winners = defaultdict(list)
+    for slip_id, program_name, outcome in attempts:
+        if outcome == "won":
+            winners[slip_id].append(program_name)
+        elif outcome != "conflict":
+            failures.append(f"slip {slip_id}: unexpected {outcome}")
+
+    with app.app_context():
+        folder = app.config["REGISTRATION_SLIP_FOLDER"]
+        for slip in RegistrationSlip.query.filter(RegistrationSlip.id.in_(slips)):
+            won = winners.get(slip.id, [])
+            if len(won) != 1:
+                failures.append(f"slip {slip.id}: {len(won)} successful edits")
+                continue
+            if slip.program_name != won[0]:
+                failures.append(f"slip {slip.id}: lost update, stored {slip.program_name}, winner {won[0]}")
+            with open(os.path.join(folder, slip.pdf_filename), "rb") as f:
+                pdf = pdf_text(f.read())
+            if won[0].encode() not in pdf:
+                shown = sorted(set(name for name in (p for s, p, _ in attempts if s == slip.id)
+                                   if name.encode() in pdf))
+                failures.append(f"slip {slip.id}: PDF shows {shown or 'none'}, winner {won[0]}")
+    return len(attempts), elapsed, failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--payments", type=int, default=40)
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--admins", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    app = create_app(HammerConfig)
+    with app.app_context():
+        db.create_all()
+        payment_ids = seed(args.payments, args.admins)
+        admin_ids = {u.username: u.id for u in User.query.filter(User.username.like("hammer-admin-%"))}
+
+    attempts = []  # (payment_id, action, admin_id, status)
+    lock = threading.Lock()
+    start = threading.Barrier(args.threads)
+
+    def hammer(worker):
+        rng = random.Random(args.seed + worker)
+        username = f"hammer-admin-{worker % args.admins}"
+        client = app.test_client()
+        client.post("/admin/login", data={"username": username, "password": PASSWORD})
+        order = payment_ids[:]
+        rng.shuffle(order)
+        start.wait()
+        for payment_id in order:
+            action = rng.choice(("approve", "reject"))
+            response = client.post(f"/admin/review-queue/{payment_id}/{action}?version=1")
+            with lock:
+                attempts.append((payment_id, action, admin_ids[username], response.status_code))
+
+    elapsed = run_threads(hammer, args.threads)
+
+    failures = []
+    statuses = Counter(status for *_, status in attempts)
+    winners = defaultdict(list)
+    for payment_id, action, admin_id, status in attempts:
+        if status == 200:
+            winners[payment_id].append((action, admin_id))
+        elif status != 409:
+            failures.append(f"payment {payment_id}: unexpected HTTP {status}")
+
+    with app.app_context():
+        payments = {p.id: p for p in Payment.query.all()}
+        slips = Counter(student_id for (student_id,) in db.session.query(RegistrationSlip.student_id))
+        for payment_id in payment_ids:
+            won = winners.get(payment_id, [])
+            payment = payments[payment_id]
+            if len(won) != 1:
+                failures.append(f"payment {payment_id}: {len(won)} successful decisions")
+                continue
+            action, admin_id = won[0]
+            expected = "approved" if action == "approve" else "rejected"
+            if payment.status != expected or payment.reviewed_by != admin_id:
+                failures.append(f"payment {payment_id}: lost update, stored {payment.status}/{payment.reviewed_by}, "
+                                f"winner {expected}/{admin_id}")
+            wanted_slips = 1 if expected == "approved" else 0
+            if slips.get(payment.student_id, 0) != wanted_slips:
+                failures.append(f"student {payment.student_id}: {slips.get(payment.student_id, 0)} slips, "
+                                f"expected {wanted_slips}")
+
+    print(f"{len(attempts)} decision requests from {args.threads} threads on {len(payment_ids)} payments "
+          f"in {elapsed:.1f} s")
+    print("responses: " + ", ".join(f"{status}={count}" for status, count in sorted(statuses.items())))
+
+    edits, elapsed, edit_failures = hammer_slip_edits(app, args)
+    failures.extend(edit_failures)
+    print(f"{edits} slip edits from {args.threads} threads in {elapsed:.1f} s")
+    if failures:
+        print(f"FAILED ({len(failures)}):")
+        for failure in failures[:20]:
+            print("  " + failure)
+        sys.exit(1)
+    print("OK: one decision per payment, one edit per slip, no lost updates, no duplicate or stale slips")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+# benchmarks/chatbot_retrieval.py
+"""
+Chatbot retrieval benchmark: index build time, per-query latency and how
+many questions the regex patterns miss but retrieval answers.
+
+Runs against a throwaway SQLite database seeded with --messages answered
+questions, so the index is about the size it reaches in production:
+
+    python -m benchmarks.chatbot_retrieval --messages 5000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+WORK_DIR = tempfile.mkdtemp(prefix="cavendish_bench_")
+os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(WORK_DIR, "bench.db")
+os.environ["VAR_DIR"] = os.path.join(WORK_DIR, "var")  # side stores, not app/var
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app                          # noqa: E402
+from app.config import Config                       # noqa: E402
+from app.extensions import db                       # noqa: E402
+from benchmarks.factories import seed_database      # noqa: E402
+
+# Real questions from /chatbot/unanswered plus typical variations
+QUESTIONS = [
+    "how do i reegister", "paswwrord reset", "i forgot my pasword", "password",
+    "how long does registration approbval take", "what documents are needed for registration?",
+    "how to downlod my slip", "can i pay with mobile money", "when are exams", "hostel rooms available?",
+    "where is the library", "how do i contact the administration office?", "regstration deadline",
+    "upload proof of paymnet", "check my registraton status", "graduation requirments",
+    "money", "ping", "tell me a joke", "what is the weather today",
+]
+
+
+class BenchConfig(Config):
+    TESTING = True
+    MAIL_SUPPRESS_SEND = True
+    UPLOAD_FOLDER = os.path.join(WORK_DIR, "uploads")
+    REGISTRATION_SLIP_FOLDER = os.path.join(WORK_DIR, "registration_slips")
+    RATE_LIMIT_ENABLED = False
+    SLOW_QUERY_THRESHOLD_MS = 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--messages", type=int, default=5000, help="Answered questions to seed.")
+    parser.add_argument("--rounds", type=int, default=200, help="Passes over the question list.")
+    args = parser.parse_args()
+
+    app = create_app(BenchConfig)
+    with app.app_context():
+        db.create_all()
+        seed_database(students=10, programs=1, chatbot_messages=args.messages)
+
+    from app.routes.chatbot.chatbot_routes import chatbot
+
+    with app.test_request_context():
+        started = time.perf_counter()
+        chatbot._sync_index()
+        print(f"index: {len(chatbot.index)} documents built in {(time.perf_counter() - started) * 1000:.0f} ms")
+
+        threshold = app.config["CHATBOT_RETRIEVAL_THRESHOLD"]
+        regex_hits = retrieval_hits = 0
+        for question in QUESTIONS:
+            regex = chatbot._extract_context(question)
+            score, payload = chatbot.index.search(question)
+            retrieved = payload[0] if payload and score >= threshold else "-"
+            regex_hits += regex != "unknown"
+            retrieval_hits += regex == "unknown" and retrieved != "-"
+            print(f"  {question:<45} regex={regex:<26} retrieval={retrieved:<26} {score:.2f}")
+        print(f"regex answered {regex_hits}/{len(QUESTIONS)}, retrieval added {retrieval_hits}")
+
+        timings = []
+        for _ in range(args.rounds):
+            for question in QUESTIONS:
+                started = time.perf_counter()
+                chatbot.index.search(question)
+                timings.append(time.perf_counter() - started)
+        timings.sort()
+        print(f"search: p50 {timings[len(timings) // 2] * 1000:.3f} ms, "
+              f"p99 {timings[int(len(timings) * 0.99)] * 1000:.3f} ms over {len(timings)} queries")
+
+
+if __name__ == "__main__":
+    main()
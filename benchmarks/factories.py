@@ -0,0 +1,173 @@
+# benchmarks/factories.py
+"""
+Synthetic data for benchmarks: faculties, programs with a full course
+structure, students with login accounts, historic payments and chatbot
+messages.
+
+Rows are bulk-inserted and every account shares one password hash, so
+seeding thousands of students takes seconds rather than minutes:
+
+    from benchmarks.factories import seed_database
+    with app.app_context():
+        summary = seed_database(students=500)
+"""
+import random
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import insert, select
+from werkzeug.security import generate_password_hash
+
+from app.extensions import db
+from app.models import User, Student, Payment, ChatbotMessage
+from app.models_academics import (
+    Faculty, Program, Course, ProgramCourse, ProgramStructure, AcademicYear
+)
+
+PASSWORD = "bench-password"
+ADMIN_USERNAME = "bench-admin"
+SEMESTERS = ("SEM1", "SEM2")
+
+FACULTY_NAMES = (
+    "Faculty of Business", "Faculty of Science", "Faculty of Education",
+    "Faculty of Health Sciences", "Faculty of Law", "Faculty of Humanities",
+)
+
+CHATBOT_QUESTIONS = (
+    "how do i register for courses", "when is the registration deadline",
+    "how do i reset my password", "where do i upload my payment slip",
+    "how do i download my registration slip", "what are the tuition fees",
+    "how long does payment approval take", "can i change my courses",
+)
+
+
+def _insert(model, rows):
+    """Bulk insert and return the new primary keys in insertion order"""
+    if not rows:
+        return []
+    result = db.session.execute(insert(model).returning(model.id, sort_by_parameter_order=True), rows)
+    return [row[0] for row in result]
+
+
+def seed_database(students=200, programs=6, courses_per_semester=5, years=None,
+                  approved_payment_ratio=0.3, chatbot_messages=500, seed=42):
+    """
+    Fill an empty database and return what the load generator needs:
+
+        {'password', 'admin_username', 'students': [(student_number, program_id)], ...}
+    """
+    rng = random.Random(seed)
+    password_hash = generate_password_hash(PASSWORD)
+    now = datetime.now(timezone.utc)
+
+    # ---------------- Academic catalogue ----------------
+    faculty_ids = _insert(Faculty, [{"name": name} for name in FACULTY_NAMES])
+    _insert(AcademicYear, [{"name": "2025/2026", "is_active": True}])
+
+    program_rows = []
+    for i in range(programs):
+        program_rows.append({
+            "name": f"Bachelor of Synthetic Studies {i + 1}",
+            "short_name": f"BSS{i + 1}",
+            "duration_years": years or 4,
+            "faculty_id": faculty_ids[i % len(faculty_ids)],
+        })
+    program_ids = _insert(Program, program_rows)
+
+    structures, course_rows, links = [], [], []
+    for p_index, program_id in enumerate(program_ids):
+        for year_level in range(1, (years or 4) + 1):
+            for semester_type in SEMESTERS:
+                structures.append({
+                    "program_id": program_id,
+                    "year_level": year_level,
+                    "semester_type": semester_type,
+                    "is_active": True,
+                })
+                for c in range(courses_per_semester):
+                    course_rows.append({
+                        "code": f"P{p_index:02d}Y{year_level}{semester_type[-1]}C{c:02d}",
+                        "title": f"Synthetic Course {p_index}.{year_level}.{semester_type}.{c}",
+                        "credits": rng.choice((2, 3, 4)),
+                    })
+                    links.append((program_id, year_level, semester_type))
+    _insert(ProgramStructure, structures)
+    course_ids = _insert(Course, course_rows)
+    _insert(ProgramCourse, [
+        {
+            "program_id": program_id,
+            "course_id": course_id,
+            "year_level": year_level,
+            "semester_type": semester_type,
+            "is_mandatory": True,
+        }
+        for course_id, (program_id, year_level, semester_type) in zip(course_ids, links)
+    ])
+
+    # ---------------- Students and accounts ----------------
+    program_names = dict(db.session.execute(select(Program.id, Program.name)).all())
+    assignments = [rng.choice(program_ids) for _ in range(students)]
+    student_rows = [
+        {
+            "student_number": f"BEN{i:07d}",
+            "name": f"Bench Student {i}",
+            "email": f"bench{i}@example.com",
+            "phone": f"097{i:07d}",
+            "program": program_names[program_id][:50],
+            "year_of_study": 1,
+            "intake_year": 2025,
+        }
+        for i, program_id in enumerate(assignments)
+    ]
+    student_ids = _insert(Student, student_rows)
+
+    _insert(User, [
+        {
+            "username": row["student_number"],
+            "email": row["email"],
+            "password_hash": password_hash,
+            "role": "student",
+            "student_id": student_id,
+        }
+        for row, student_id in zip(student_rows, student_ids)
+    ] + [{
+        "username": ADMIN_USERNAME,
+        "email": "bench-admin@example.com",
+        "password_hash": password_hash,
+        "role": "admin",
+    }])
+
+    # ---------------- History ----------------
+    _insert(Payment, [
+        {
+            "slip_filename": f"historic_{student_id}.pdf",
+            "student_id": student_id,
+            "status": "approved",
+            "amount": 4500.0,
+            "method": "Bank",
+            "reference": f"HIST-{student_id}",
+            "submitted_date": now - timedelta(days=rng.randint(30, 365)),
+            "approved_date": now - timedelta(days=rng.randint(1, 29)),
+        }
+        for student_id in student_ids
+        if rng.random() < approved_payment_ratio
+    ])
+
+    _insert(ChatbotMessage, [
+        {
+            "question": f"{rng.choice(CHATBOT_QUESTIONS)} {i}",
+            "answer": "Synthetic answer.",
+            "category": "benchmark",
+            "is_known_response": rng.random() < 0.8,
+        }
+        for i in range(chatbot_messages)
+    ])
+
+    db.session.commit()
+
+    return {
+        "password": PASSWORD,
+        "admin_username": ADMIN_USERNAME,
+        "students": [(row["student_number"], program_id) for row, program_id in zip(student_rows, assignments)],
+        "programs": len(program_ids),
+        "courses": len(course_ids),
+    }
@@ -0,0 +1,225 @@
+# benchmarks/loader_profiles.py
+"""
+Rows and bytes fetched from the database per endpoint.
+
+Seeds a throwaway SQLite database with benchmarks.factories, registers
+--students students for year 1 / semester 1 of their program (a pending
+payment each, half of them approved), then requests the catalogue, slip
+and admin pages once per sample student and records, per request:
+
+- queries: SELECT statements executed
+- rows:    rows those SELECTs returned
+- bytes:   size of the values in those rows (text/blob length, 8 per
+           number) - roughly what crosses the driver boundary
+
+Every SELECT is re-run on a second cursor of the same connection to
+measure its result, so timings here mean nothing; compare the counts.
+
+    python -m benchmarks.loader_profiles --students 20
+    python -m benchmarks.loader_profiles --baseline benchmarks/results/<old>.json
+
+The JSON result is written to benchmarks/results/ for later comparison.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+from datetime import datetime
+
+WORK_DIR = tempfile.mkdtemp(prefix="cavendish_loading_")
+os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(WORK_DIR, "loading.db")
+os.environ["VAR_DIR"] = os.path.join(WORK_DIR, "var")  # side stores, not app/var
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from sqlalchemy import event                        # noqa: E402
+from sqlalchemy.engine import Engine                # noqa: E402
+
+from app import create_app                          # noqa: E402
+from app.config import Config                       # noqa: E402
+from app.extensions import db                       # noqa: E402
+from app.models import Student, Payment             # noqa: E402
+from app.models_academics import ProgramCourse      # noqa: E402
+from benchmarks.factories import seed_database      # noqa: E402
+
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+
+
+class LoadingConfig(Config):
+    TESTING = True
+    MAIL_SUPPRESS_SEND = True
+    PROPAGATE_EXCEPTIONS = False  # record view errors as 500s
+    UPLOAD_FOLDER = os.path.join(WORK_DIR, "uploads")
+    REGISTRATION_SLIP_FOLDER = os.path.join(WORK_DIR, "registration_slips")
+    RATE_LIMIT_ENABLED = False
+    SLOW_QUERY_THRESHOLD_MS = 0
+
+
+# ---------------- Measuring ----------------
+class FetchCounter:
+    """Counts SELECTs and the rows/bytes they return while .active is set"""
+
+    def __init__(self):
+        self._local = threading.local()
+        event.listen(Engine, "after_cursor_execute", self._after)
+
+    @property
+    def active(self):
+        return getattr(self._local, "totals", None)
+
+    def start(self):
+        self._local.totals = {"queries": 0, "rows": 0, "bytes": 0}
+
+    def stop(self):
+        totals, self._local.totals = self._local.totals, None
+        return totals
+
+    def _after(self, conn, cursor, statement, parameters, context, executemany):
+        totals = self.active
+        if totals is None or executemany or not statement.lstrip().upper().startswith(("SELECT", "WITH")):
+            return
+        probe = cursor.connection.cursor()
+        try:
+            rows = probe.execute(statement, parameters).fetchall()
+        finally:
+            probe.close()
+        totals["queries"] += 1
+        totals["rows"] += len(rows)
+        totals["bytes"] += sum(_size(value) for row in rows for value in row)
+
+
+def _size(value):
+    if value is None:
+        return 0
+    if isinstance(value, (bytes, bytearray)):
+        return len(value)
+    if isinstance(value, str):
+        return len(value.encode())
+    if isinstance(value, (int, float)):
+        return 8
+    return len(str(value))
+
+
+# ---------------- Setup ----------------
+def seed(students, programs):
+    seeded = seed_database(students=students, programs=programs, approved_payment_ratio=0, chatbot_messages=0)
+    from app.utils.registration import create_registration
+
+    sample = []
+    for i, (student_number, program_id) in enumerate(seeded["students"]):
+        student = Student.query.filter_by(student_number=student_number).one()
+        course_ids = [course_id for (course_id,) in db.session.query(ProgramCourse.course_id).filter_by(
+            program_id=program_id, year_level=1, semester_type="SEM1")]
+        create_registration(student.id, program_id, 1, "Semester 1", course_ids)
+        payment = Payment(slip_filename=f"loading-{student.id}.pdf", student_id=student.id, status="pending",
+                          amount=4500.0, reference=f"LOAD-{student.id}", submitted_date=datetime.utcnow())
+        db.session.add(payment)
+        db.session.commit()
+        sample.append({"student_id": student.id, "student_number": student_number, "program_id": program_id,
+                       "payment_id": payment.id, "course_ids": course_ids, "approve": i % 2 == 0})
+    return seeded, sample
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+# ---------------- Run ----------------
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--students", type=int, default=20)
+    parser.add_argument("--programs", type=int, default=3)
+    parser.add_argument("--baseline", help="Earlier JSON result to compare against.")
+    args = parser.parse_args()
+
+    app = create_app(LoadingConfig)
+    with app.app_context():
+        db.create_all()
+        seeded, sample = seed(args.students, args.programs)
+
+    counter = FetchCounter()
+    results = {}  # endpoint -> {requests, statuses, queries, rows, bytes}
+
+    def measure(endpoint, client, method, path, **kwargs):
+        counter.start()
+        response = getattr(client, method)(path, **kwargs)
+        totals = counter.stop()
+        entry = results.setdefault(endpoint, {"requests": 0, "statuses": {}, "queries": 0, "rows": 0, "bytes": 0})
+        entry["requests"] += 1
+        entry["statuses"][str(response.status_code)] = entry["statuses"].get(str(response.status_code), 0) + 1
+        for key in ("queries", "rows", "bytes"):
+            entry[key] += totals[key]
+
+    admin = app.test_client()
+    admin.post("/admin/login", data={"username": seeded["admin_username"], "password": seeded["password"]})
+
+    # Admin side first: approving is what makes slips and approved courses exist
+    for item in sample:
+        if item["approve"]:
+            measure("admin payment approve", admin, "get", f"/admin/payment/{item['payment_id']}/approve")
+        measure("admin student details", admin, "get", f"/admin/student/{item['student_id']}")
+    for program_id in sorted({item["program_id"] for item in sample}):
+        measure("admin program builder", admin, "get", f"/admin/program/{program_id}/builder")
+    measure("admin registration slips", admin, "get", "/admin/view_registration_slips")
+
+    semester = "Semester 1"
+    for item in sample:
+        student = app.test_client()
+        student.post("/student/login", data={"student_number": item["student_number"],
+                                             "password": seeded["password"]})
+        query = f"program_id={item['program_id']}&year=1&semester={semester.replace(' ', '%20')}"
+        measure("student dashboard", student, "get", "/student/dashboard")
+        measure("student available courses", student, "get", f"/student/get-available-courses?{query}")
+        measure("student approved courses", student, "get", f"/student/get-approved-courses?{query}")
+        measure("student duplicate registration", student, "post", "/student/submit-registration", json={
+            "program_id": item["program_id"], "year_level": 1, "semester_type": semester,
+            "courses": item["course_ids"]})
+        measure("student slip page", student, "get", "/student/registration_slip")
+        measure("student slip pdf", student, "get", "/student/registration_slip/download")
+        measure("student timetable pdf", student, "get", "/student/download_timetable")
+
+    for entry in results.values():
+        for key in ("queries", "rows", "bytes"):
+            entry[f"{key}_per_request"] = round(entry[key] / entry["requests"], 1)
+
+    commit = git_commit()
+    result = {
+        "commit": commit,
+        "timestamp": datetime.now().isoformat(),
+        "parameters": {"students": args.students, "programs": args.programs},
+        "endpoints": results,
+    }
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    print(f"{'endpoint':32} {'status':>10} {'queries':>8} {'rows':>8} {'bytes':>10}"
+          + (f"   {'rows vs base':>12} {'bytes vs base':>13}" if baseline else ""))
+    for endpoint, entry in sorted(results.items()):
+        statuses = ",".join(sorted(entry["statuses"]))
+        line = (f"{endpoint:32} {statuses:>10} {entry['queries_per_request']:>8} "
+                f"{entry['rows_per_request']:>8} {entry['bytes_per_request']:>10}")
+        old = (baseline or {}).get("endpoints", {}).get(endpoint)
+        if old:
+            line += (f"   {old['rows_per_request']:>5} -> {entry['rows_per_request']:<5}"
+                     f" {old['bytes_per_request']:>6} -> {entry['bytes_per_request']}")
+        print(line)
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    path = os.path.join(RESULTS_DIR, f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-loading-{commit or 'nogit'}.json")
+    with open(path, "w") as f:
+        json.dump(result, f, indent=2)
+    print(f"\nwritten to {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+# benchmarks/pdf_throughput.py
+"""
+PDFs-per-second benchmark for the three PDF generators.
+
+Runs against a throwaway SQLite database so it never touches the real one:
+
+    python -m benchmarks.pdf_throughput --iterations 50
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+WORK_DIR = tempfile.mkdtemp(prefix="cavendish_bench_")
+os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(WORK_DIR, "bench.db")
+os.environ["VAR_DIR"] = os.path.join(WORK_DIR, "var")  # side stores, not app/var
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app                                  # noqa: E402
+from app.config import Config                               # noqa: E402
+from app.extensions import db                               # noqa: E402
+from app.models import User, Student, Payment, RegistrationSlip   # noqa: E402
+from app.models_academics import (                          # noqa: E402
+    Faculty, Program, Course, AcademicYear, StudentRegistration, RegisteredCourse
+)
+
+
+class BenchConfig(Config):
+    TESTING = True
+    MAIL_SUPPRESS_SEND = True
+    UPLOAD_FOLDER = os.path.join(WORK_DIR, "uploads")
+    REGISTRATION_SLIP_FOLDER = os.path.join(WORK_DIR, "registration_slips")
+    RATE_LIMIT_ENABLED = False
+    SLOW_QUERY_THRESHOLD_MS = 0
+
+
+def seed():
+    """One student with an approved payment, six registered courses and a slip"""
+    faculty = Faculty(name="Faculty of Science")
+    year = AcademicYear(name="2025/2026", is_active=True)
+    db.session.add_all([faculty, year])
+    db.session.flush()
+
+    program = Program(name="BSc Computing", duration_years=4, faculty_id=faculty.id)
+    student = Student(student_number="CUN0000001", name="Bench Student",
+                      email="bench@example.com", phone="0970000000")
+    db.session.add_all([program, student])
+    db.session.flush()
+
+    user = User(username=student.student_number, email=student.email,
+                role="student", student_id=student.id)
+    user.set_password("bench")
+    registration = StudentRegistration(student_id=student.id, program_id=program.id,
+                                       academic_year_id=year.id, year_level=1,
+                                       semester_type="SEM1", payment_status="approved")
+    db.session.add_all([user, registration])
+    db.session.flush()
+
+    for i in range(6):
+        course = Course(code=f"BCH{100 + i}", title=f"Benchmark Course {i}", credits=3)
+        db.session.add(course)
+        db.session.flush()
+        db.session.add(RegisteredCourse(registration_id=registration.id, course_id=course.id))
+
+    db.session.add(Payment(slip_filename="bench.pdf", student_id=student.id, status="approved",
+                           amount=4500.0, reference="BENCH-REF", method="Bank"))
+    db.session.add(RegistrationSlip(slip_number="RS-BENCH", student_id=student.id,
+                                    program_name=program.name, faculty_name=faculty.name))
+    db.session.commit()
+    return student
+
+
+def rate(label, fn, iterations):
+    fn()  # warm-up (imports, font metrics, logo decode)
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<32} {iterations / elapsed:8.1f} PDFs/s  ({elapsed / iterations * 1000:6.1f} ms each)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--iterations", type=int, default=50)
+    args = parser.parse_args()
+
+    app = create_app(BenchConfig)
+    with app.app_context():
+        db.create_all()
+        student = seed()
+        student_id, student_number = student.id, student.student_number
+
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess["student_id"] = student_id
+        sess["student_number"] = student_number
+
+    def slip_download():
+        assert client.get("/student/registration_slip/download").status_code == 200
+
+    def timetable_download():
+        assert client.get("/student/download_timetable").status_code == 200
+
+    def official_slip():
+        from app.utils.helpers import generate_registration_slip_pdf
+        with app.app_context():
+            assert generate_registration_slip_pdf(RegistrationSlip.query.first())
+
+    rate("download_registration_slip", slip_download, args.iterations)
+    rate("download_timetable", timetable_download, args.iterations)
+    rate("generate_registration_slip_pdf", official_slip, args.iterations)
+
+
+if __name__ == "__main__":
+    main()
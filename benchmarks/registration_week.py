@@ -0,0 +1,321 @@
+# benchmarks/registration_week.py
+"""
+Registration-week load test.
+
+Seeds a throwaway SQLite database with benchmarks.factories, then replays
+the real journeys with a pool of concurrent clients:
+
+- student: login -> dashboard -> get-programs -> get-semesters ->
+  get-available-courses -> upload_payment_ajax -> submit-registration ->
+  registration slip download
+- admin:   login -> dashboard -> approve each uploaded payment
+
+Throughput and per-step latency percentiles are printed and written as
+JSON so runs can be compared between commits:
+
+    python -m benchmarks.registration_week --students 300 --concurrency 16
+    python -m benchmarks.registration_week --baseline benchmarks/results/<old>.json
+
+By default requests go through Flask's test client in this process. Pass
+--base-url to drive a running server instead; start it against the seeded
+database written by --seed-only (DATABASE_URL=sqlite:///<path>).
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import queue
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+WORK_DIR = tempfile.mkdtemp(prefix="cavendish_load_")
+DB_PATH = os.path.join(WORK_DIR, "load.db")
+os.environ.setdefault("DATABASE_URL", "sqlite:///" + DB_PATH)
+os.environ["VAR_DIR"] = os.path.join(WORK_DIR, "var")  # side stores, not app/var
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from app import create_app                          # noqa: E402
+from app.config import Config                       # noqa: E402
+from app.extensions import db                       # noqa: E402
+from benchmarks.factories import seed_database      # noqa: E402
+
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+PERCENTILES = (50, 90, 95, 99)
+
+# Payment slip body used for every upload (tiny but valid-looking PDF)
+SLIP_BYTES = b"%PDF-1.4\n1 0 obj<<>>endobj\ntrailer<<>>\n%%EOF\n"
+
+
+class LoadConfig(Config):
+    TESTING = True
+    MAIL_SUPPRESS_SEND = True
+    SLOW_QUERY_THRESHOLD_MS = 0
+    PROPAGATE_EXCEPTIONS = False  # count view errors as 500s, like a real server
+    UPLOAD_FOLDER = os.path.join(WORK_DIR, "uploads")
+    REGISTRATION_SLIP_FOLDER = os.path.join(WORK_DIR, "registration_slips")
+    RATE_LIMIT_ENABLED = False
+
+
+# ---------------- Clients ----------------
+class TestClientSession:
+    """Flask test client with the small API the journeys need"""
+
+    def __init__(self, app):
+        self.client = app.test_client()
+
+    def get(self, path):
+        response = self.client.get(path)
+        return response.status_code, response.get_json(silent=True), len(response.data)
+
+    def post(self, path, data=None, json=None, files=None):
+        if files:
+            data = dict(data or {})
+            data.update({name: (io.BytesIO(body), filename) for name, (filename, body) in files.items()})
+            response = self.client.post(path, data=data, content_type="multipart/form-data")
+        else:
+            response = self.client.post(path, data=data, json=json)
+        return response.status_code, response.get_json(silent=True), len(response.data)
+
+
+class HttpSession:
+    """requests.Session against a running server"""
+
+    def __init__(self, base_url):
+        import requests
+        self.base_url = base_url.rstrip("/")
+        self.session = requests.Session()
+
+    def _wrap(self, response):
+        try:
+            body = response.json()
+        except ValueError:
+            body = None
+        return response.status_code, body, len(response.content)
+
+    def get(self, path):
+        return self._wrap(self.session.get(self.base_url + path, allow_redirects=False))
+
+    def post(self, path, data=None, json=None, files=None):
+        return self._wrap(self.session.post(self.base_url + path, data=data, json=json,
+                                            files=files, allow_redirects=False))
+
+
+# ---------------- Recording ----------------
+class Recorder:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples = {}  # step -> [seconds]
+        self.errors = {}   # step -> count
+        self.statuses = {}  # step -> {status: count}
+        self.bytes = {}    # step -> total response bytes
+
+    def call(self, step, fn, *args, ok=(200, 302), **kwargs):
+        started = time.perf_counter()
+        try:
+            status, body, size = fn(*args, **kwargs)
+        except Exception as e:
+            status, body, size = None, {"exception": repr(e)}, 0
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            self.samples.setdefault(step, []).append(elapsed)
+            self.bytes[step] = self.bytes.get(step, 0) + size
+            by_status = self.statuses.setdefault(step, {})
+            by_status[str(status)] = by_status.get(str(status), 0) + 1
+            if status not in ok:
+                self.errors[step] = self.errors.get(step, 0) + 1
+        return status, body
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(pct / 100 * len(sorted_values) + 0.5) - 1))
+    return sorted_values[index]
+
+
+# ---------------- Journeys ----------------
+def student_journey(session, recorder, student_number, program_id, password, approvals):
+    recorder.call("login", session.post, "/student/login",
+                  data={"student_number": student_number, "password": password})
+    recorder.call("dashboard", session.get, "/student/dashboard")
+    recorder.call("get_programs", session.get, "/student/get-programs")
+
+    _, semesters = recorder.call("get_semesters", session.get, f"/student/get-semesters/{program_id}/1")
+    semester = ((semesters or {}).get("semesters") or ["Semester 1"])[0]
+
+    _, courses = recorder.call(
+        "get_available_courses", session.get,
+        f"/student/get-available-courses?program_id={program_id}&year=1&semester={semester.replace(' ', '%20')}"
+    )
+    course_ids = [c["id"] for c in (courses or {}).get("courses", [])]
+
+    _, uploaded = recorder.call(
+        "upload_payment_ajax", session.post, "/student/upload_payment_ajax",
+        files={"payment_slip": (f"{student_number}.pdf", SLIP_BYTES)}
+    )
+
+    recorder.call("submit_registration", session.post, "/student/submit-registration", json={
+        "program_id": program_id,
+        "year_level": 1,
+        "semester_type": semester,
+        "courses": course_ids,
+    })
+
+    # Reviewers pick the payment up once the application is in
+    if uploaded and uploaded.get("payment_id"):
+        approvals.put(uploaded["payment_id"])
+    recorder.call("slip_download", session.get, "/student/registration_slip/download")
+
+
+def admin_journey(session, recorder, username, password, approvals, students_done):
+    recorder.call("admin_login", session.post, "/admin/login",
+                  data={"username": username, "password": password})
+    recorder.call("admin_dashboard", session.get, "/admin/dashboard")
+
+    while True:
+        try:
+            payment_id = approvals.get(timeout=0.2)
+        except queue.Empty:
+            if students_done.is_set():
+                return
+            continue
+        recorder.call("admin_approve", session.get, f"/admin/payment/{payment_id}/approve")
+
+
+# ---------------- Runner ----------------
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def summarize(recorder, wall_time, args, commit):
+    steps = {}
+    total_requests = 0
+    for step, values in recorder.samples.items():
+        values = sorted(values)
+        total_requests += len(values)
+        steps[step] = {
+            "count": len(values),
+            "errors": recorder.errors.get(step, 0),
+            "statuses": recorder.statuses.get(step, {}),
+            "mean_ms": sum(values) / len(values) * 1000,
+            **{f"p{p}_ms": percentile(values, p) * 1000 for p in PERCENTILES},
+            "max_ms": values[-1] * 1000,
+            "bytes_per_request": recorder.bytes.get(step, 0) / len(values),
+        }
+
+    return {
+        "commit": commit,
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "target": args.base_url or "in-process",
+        "parameters": {
+            "students": args.students,
+            "concurrency": args.concurrency,
+            "admins": args.admins,
+        },
+        "wall_time_s": wall_time,
+        "requests": total_requests,
+        "errors": sum(recorder.errors.values()),
+        "throughput_rps": total_requests / wall_time if wall_time else 0.0,
+        "journeys_per_s": args.students / wall_time if wall_time else 0.0,
+        "steps": steps,
+    }
+
+
+def print_report(result, baseline=None):
+    print(f"\n{result['requests']} requests in {result['wall_time_s']:.2f}s "
+          f"-> {result['throughput_rps']:.1f} req/s, {result['journeys_per_s']:.1f} student journeys/s, "
+          f"{result['errors']} errors")
+    print(f"{'step':<24}{'count':>7}{'err':>5}{'p50':>9}{'p90':>9}{'p95':>9}{'p99':>9}{'max':>9}"
+          + ("   p95 vs baseline" if baseline else ""))
+    for step, s in result["steps"].items():
+        line = (f"{step:<24}{s['count']:>7}{s['errors']:>5}{s['p50_ms']:>9.1f}{s['p90_ms']:>9.1f}"
+                f"{s['p95_ms']:>9.1f}{s['p99_ms']:>9.1f}{s['max_ms']:>9.1f}")
+        old = (baseline or {}).get("steps", {}).get(step)
+        if old and old["p95_ms"]:
+            line += f"   {(s['p95_ms'] / old['p95_ms'] - 1) * 100:+6.1f}%"
+        print(line)
+    if baseline and baseline.get("throughput_rps"):
+        change = (result["throughput_rps"] / baseline["throughput_rps"] - 1) * 100
+        print(f"throughput vs baseline ({baseline.get('commit')}): {change:+.1f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay registration-week journeys and report latency.")
+    parser.add_argument("--students", type=int, default=200, help="Student journeys to run (one per student).")
+    parser.add_argument("--programs", type=int, default=6)
+    parser.add_argument("--concurrency", type=int, default=8, help="Concurrent student clients.")
+    parser.add_argument("--admins", type=int, default=2, help="Concurrent admin reviewers approving payments.")
+    parser.add_argument("--base-url", help="Drive a running server instead of the in-process test client.")
+    parser.add_argument("--seed-only", action="store_true", help="Seed the database, print its path and exit.")
+    parser.add_argument("--output", help="JSON result path (default: benchmarks/results/<time>-<commit>.json).")
+    parser.add_argument("--baseline", help="Earlier JSON result to compare against.")
+    args = parser.parse_args()
+
+    app = create_app(LoadConfig)
+    with app.app_context():
+        db.create_all()
+        seeded = seed_database(students=args.students, programs=args.programs)
+
+    if args.seed_only:
+        print(f"Seeded {args.students} students into {app.config['SQLALCHEMY_DATABASE_URI']}")
+        return
+
+    def new_session():
+        return HttpSession(args.base_url) if args.base_url else TestClientSession(app)
+
+    recorder = Recorder()
+    approvals = queue.Queue()
+    students_done = threading.Event()
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.admins) as admin_pool:
+        admin_futures = [
+            admin_pool.submit(admin_journey, new_session(), recorder, seeded["admin_username"],
+                              seeded["password"], approvals, students_done)
+            for _ in range(args.admins)
+        ]
+        with ThreadPoolExecutor(max_workers=args.concurrency) as student_pool:
+            futures = [
+                student_pool.submit(student_journey, new_session(), recorder, number, program_id,
+                                    seeded["password"], approvals)
+                for number, program_id in seeded["students"]
+            ]
+            for future in futures:
+                future.result()
+        students_done.set()
+        for future in admin_futures:
+            future.result()
+    wall_time = time.perf_counter() - started
+
+    commit = git_commit()
+    result = summarize(recorder, wall_time, args, commit)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    print_report(result, baseline)
+
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{commit or 'nogit'}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(result, f, indent=2)
+    print(f"Saved {output}")
+
+
+if __name__ == "__main__":
+    main()
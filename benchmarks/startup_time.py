@@ -0,0 +1,105 @@
+# benchmarks/startup_time.py
+"""
+Cold-start budget check for create_app().
+
+Each run starts a fresh interpreter with `python -X importtime`, imports
+the app package and builds an app against a throwaway SQLite database.
+The script fails (exit code 1) when the median import time goes over the
+budget, or when a module that should only load on first use shows up
+during startup:
+
+    python -m benchmarks.startup_time --budget-ms 1200 --runs 5
+"""
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Loaded on first use (PDF downloads, slip batches); never at startup
+LAZY_MODULES = ("reportlab", "openai", "httpx", "tenacity", "requests")
+
+STARTUP_CODE = "from app import create_app; create_app()"
+
+LINE_RE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def run_once(work_dir):
+    """Return [(module, self_us, cumulative_us, depth)] for one cold start"""
+    env = dict(os.environ)
+    env["DATABASE_URL"] = "sqlite:///" + os.path.join(work_dir, "startup.db")
+    env["VAR_DIR"] = os.path.join(work_dir, "var")
+    env["PYTHONDONTWRITEBYTECODE"] = "1"
+
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", STARTUP_CODE],
+        cwd=ROOT, env=env, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        sys.stderr.write(result.stderr)
+        raise SystemExit(f"create_app() failed with exit code {result.returncode}")
+
+    modules = []
+    for line in result.stderr.splitlines():
+        match = LINE_RE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            modules.append((name, int(self_us), int(cumulative_us), len(indent) // 2))
+    return modules
+
+
+def total_ms(modules):
+    """Top-level cumulative times add up to the whole import cost"""
+    return sum(cumulative for _, _, cumulative, depth in modules if depth == 0) / 1000
+
+
+def heaviest_packages(modules, limit):
+    """Self time summed per top-level package, largest first"""
+    packages = {}
+    for name, self_us, _, _ in modules:
+        root = name.split(".")[0]
+        packages[root] = packages.get(root, 0) + self_us
+    return sorted(packages.items(), key=lambda item: item[1], reverse=True)[:limit]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--budget-ms", type=float,
+                        default=float(os.environ.get("STARTUP_BUDGET_MS", 1200)),
+                        help="Fail when the median import time exceeds this (default 1200).")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--top", type=int, default=10, help="Packages to list in the report.")
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix="cavendish_startup_")
+    runs = [run_once(work_dir) for _ in range(args.runs)]
+    timings = [total_ms(modules) for modules in runs]
+    median = statistics.median(timings)
+
+    print(f"create_app() import time over {args.runs} runs: "
+          f"median {median:.0f} ms (min {min(timings):.0f}, max {max(timings):.0f})")
+    print("Heaviest packages (self time, last run):")
+    for package, self_us in heaviest_packages(runs[-1], args.top):
+        print(f"  {package:<24} {self_us / 1000:8.1f} ms")
+
+    failures = []
+    loaded = {name.split(".")[0] for name, _, _, _ in runs[-1]}
+    eager = sorted(loaded.intersection(LAZY_MODULES))
+    if eager:
+        failures.append(f"imported at startup but should load lazily: {', '.join(eager)}")
+    if median > args.budget_ms:
+        failures.append(f"median {median:.0f} ms is over the {args.budget_ms:.0f} ms budget")
+
+    for failure in failures:
+        print(f"❌ {failure}")
+    if failures:
+        sys.exit(1)
+    print(f"✅ Within the {args.budget_ms:.0f} ms startup budget")
+
+
+if __name__ == "__main__":
+    main()
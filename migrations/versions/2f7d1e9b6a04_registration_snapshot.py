@@ -0,0 +1,45 @@
+"""Immutable registration snapshots for slips
+
+Revision ID: 2f7d1e9b6a04
+Revises: e5b8c3a17f42
+Create Date: 2026-10-19 16:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '2f7d1e9b6a04'
+down_revision = 'e5b8c3a17f42'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('registration_snapshot',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('student_id', sa.Integer(), nullable=False),
+    sa.Column('registration_id', sa.Integer(), nullable=True),
+    sa.Column('payment_id', sa.Integer(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('data', sa.JSON(), nullable=False),
+    sa.ForeignKeyConstraint(['student_id'], ['student.id'], ),
+    sa.ForeignKeyConstraint(['registration_id'], ['student_registration.id'], ),
+    sa.ForeignKeyConstraint(['payment_id'], ['payment.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_registration_snapshot_student', 'registration_snapshot', ['student_id', 'id'], unique=False)
+
+    with op.batch_alter_table('registration_slip', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('snapshot_id', sa.Integer(), nullable=True))
+        batch_op.create_foreign_key('fk_registration_slip_snapshot', 'registration_snapshot', ['snapshot_id'], ['id'])
+
+
+def downgrade():
+    with op.batch_alter_table('registration_slip', schema=None) as batch_op:
+        batch_op.drop_constraint('fk_registration_slip_snapshot', type_='foreignkey')
+        batch_op.drop_column('snapshot_id')
+
+    op.drop_index('ix_registration_snapshot_student', table_name='registration_snapshot')
+    op.drop_table('registration_snapshot')
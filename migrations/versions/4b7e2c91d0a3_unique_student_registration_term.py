@@ -0,0 +1,71 @@
+"""Unique student registration per program, year and semester
+
+Revision ID: 4b7e2c91d0a3
+Revises: 66841a9d04f8
+Create Date: 2026-10-19 09:00:00.000000
+
+Concurrent submits could create the same registration twice. Before the
+index is created, each set of duplicates is merged into its lowest id:
+their registered courses move to it (without repeating a course), it
+keeps an approval any duplicate had, and the other rows are deleted.
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '4b7e2c91d0a3'
+down_revision = '66841a9d04f8'
+branch_labels = None
+depends_on = None
+
+# Lowest id with the same (student, program, year, semester) as table `t`.
+# NULL when a column is NULL, which the unique index doesn't cover either.
+KEEPER = """(
+    SELECT MIN(k.id) FROM student_registration k
+    WHERE k.student_id = {t}.student_id AND k.program_id = {t}.program_id
+      AND k.year_level = {t}.year_level AND k.semester_type = {t}.semester_type
+)"""
+
+DUPLICATE_IDS = f"SELECT r.id FROM student_registration r WHERE r.id <> {KEEPER.format(t='r')}"
+MERGED_IDS = f"SELECT {KEEPER.format(t='r')} FROM student_registration r WHERE r.id <> {KEEPER.format(t='r')}"
+
+
+def upgrade():
+    # Approval usually landed on the newest duplicate (the latest one is approved)
+    op.execute(f"""
+        UPDATE student_registration SET payment_status = 'approved'
+        WHERE id IN ({MERGED_IDS})
+          AND (payment_status IS NULL OR payment_status <> 'approved')
+          AND EXISTS (
+              SELECT 1 FROM student_registration d
+              WHERE d.payment_status = 'approved' AND {KEEPER.format(t='d')} = student_registration.id
+          )
+    """)
+    op.execute(f"""
+        UPDATE registered_course SET registration_id = (
+            SELECT {KEEPER.format(t='r')} FROM student_registration r
+            WHERE r.id = registered_course.registration_id
+        )
+        WHERE registration_id IN ({DUPLICATE_IDS})
+    """)
+    op.execute(f"""
+        DELETE FROM registered_course
+        WHERE registration_id IN ({MERGED_IDS})
+          AND id NOT IN (
+              SELECT MIN(c.id) FROM registered_course c
+              WHERE c.registration_id IN ({MERGED_IDS})
+              GROUP BY c.registration_id, c.course_id
+          )
+    """)
+    op.execute(f"DELETE FROM student_registration WHERE id IN ({DUPLICATE_IDS})")
+
+    op.create_index(
+        'uq_student_registration_term',
+        'student_registration',
+        ['student_id', 'program_id', 'year_level', 'semester_type'],
+        unique=True
+    )
+
+
+def downgrade():
+    op.drop_index('uq_student_registration_term', table_name='student_registration')
@@ -0,0 +1,42 @@
+"""Per-student status summary for the dashboard
+
+Revision ID: 7c41a9e0d2b5
+Revises: 2f7d1e9b6a04
+Create Date: 2026-10-19 17:00:00.000000
+
+Existing students get their row on first dashboard visit, or all at once
+with `flask students rebuild-status`.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7c41a9e0d2b5'
+down_revision = '2f7d1e9b6a04'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('student_status',
+    sa.Column('student_id', sa.Integer(), nullable=False),
+    sa.Column('registration_id', sa.Integer(), nullable=True),
+    sa.Column('program_name', sa.String(length=100), nullable=True),
+    sa.Column('year_level', sa.Integer(), nullable=True),
+    sa.Column('semester_type', sa.String(length=50), nullable=True),
+    sa.Column('registration_status', sa.String(length=20), nullable=True),
+    sa.Column('total_credits', sa.Integer(), nullable=False),
+    sa.Column('payment_state', sa.String(length=20), nullable=False),
+    sa.Column('payment_count', sa.Integer(), nullable=False),
+    sa.Column('pending_since', sa.DateTime(), nullable=True),
+    sa.Column('approved_at', sa.DateTime(), nullable=True),
+    sa.Column('slip_id', sa.Integer(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['student_id'], ['student.id'], ),
+    sa.PrimaryKeyConstraint('student_id')
+    )
+
+
+def downgrade():
+    op.drop_table('student_status')
@@ -0,0 +1,36 @@
+"""Payment review queue lease columns
+
+Revision ID: 9d3a6f0c52e8
+Revises: 4b7e2c91d0a3
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9d3a6f0c52e8'
+down_revision = '4b7e2c91d0a3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('payment', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('claimed_by', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('claimed_until', sa.DateTime(), nullable=True))
+        batch_op.add_column(sa.Column('reviewed_by', sa.Integer(), nullable=True))
+        batch_op.create_foreign_key('fk_payment_claimed_by_user', 'user', ['claimed_by'], ['id'])
+        batch_op.create_foreign_key('fk_payment_reviewed_by_user', 'user', ['reviewed_by'], ['id'])
+        batch_op.create_index('ix_payment_review_queue', ['status', 'claimed_until'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('payment', schema=None) as batch_op:
+        batch_op.drop_index('ix_payment_review_queue')
+        batch_op.drop_constraint('fk_payment_reviewed_by_user', type_='foreignkey')
+        batch_op.drop_constraint('fk_payment_claimed_by_user', type_='foreignkey')
+        batch_op.drop_column('reviewed_by')
+        batch_op.drop_column('claimed_until')
+        batch_op.drop_column('claimed_by')
@@ -0,0 +1,30 @@
+"""Version columns for optimistic locking
+
+Revision ID: e5b8c3a17f42
+Revises: 9d3a6f0c52e8
+Create Date: 2026-10-19 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5b8c3a17f42'
+down_revision = '9d3a6f0c52e8'
+branch_labels = None
+depends_on = None
+
+TABLES = ('payment', 'student_registration', 'registration_slip')
+
+
+def upgrade():
+    for table in TABLES:
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.add_column(sa.Column('version_id', sa.Integer(), nullable=False, server_default='1'))
+
+
+def downgrade():
+    for table in reversed(TABLES):
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.drop_column('version_id')